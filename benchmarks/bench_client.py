@@ -0,0 +1,336 @@
+"""Throughput and latency benchmark of TectonClient, AsyncTectonClient and the request/response helpers against a
+stand-in feature server.
+
+Each scenario runs for a fixed duration and reports requests per second, p50 and p99 latency and the client's CPU time
+per request. With --transport inprocess the stand-in answers through an httpx transport, which isolates the client's
+hot path; with --transport loopback it is a real HTTP server in a child process.
+
+Save the results of a commit with --output and compare a later run against them with --baseline; the run fails if
+the CPU per request or the throughput of a scenario regressed by more than --threshold percent.
+
+Usage: python benchmarks/bench_client.py [--transport inprocess|loopback] [--scenarios a,b] [--duration S]
+    [--latency constant:0] [--features N] [--error-rate R] [--output results.json] [--baseline results.json]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import httpx
+
+from tecton_client import (
+    AsyncTectonClient,
+    ConnectionOptions,
+    GetFeaturesRequestData,
+    LatencyHistogram,
+    TectonClient,
+)
+from tecton_client._internal.data_types import GetFeaturesResponse
+from tecton_client._internal.utils import build_get_features_request, get_features_cache_key
+
+# the stand-in feature server is the one the tests use
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests"))
+from stand_in_server import LoopbackServer, StandInConfig, StandInServer  # noqa: E402
+
+FEATURE_SERVICE = "fraud_detection_feature_service:v2"
+WORKSPACE = "prod"
+USER_IDS = [f"user_{i}" for i in range(1000)]
+# every request in flight gets a connection of its own, which is kept open for the next one
+UNBOUNDED_CONNECTIONS = ConnectionOptions(max_connections=None, max_keepalive_connections=None)
+# the metrics compared with the baseline, and whether higher is better
+COMPARED_METRICS = {"req_per_s": True, "cpu_us_per_req": False}
+
+
+class Result:
+    def __init__(self):
+        self.latencies = LatencyHistogram()
+        self.errors = 0
+        self.requests = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+
+    def to_dict(self, rows_per_request: int = 1) -> Dict[str, float]:
+        requests = max(self.requests, 1)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "req_per_s": self.requests / self.wall_seconds if self.wall_seconds else 0.0,
+            "rows_per_s": self.requests * rows_per_request / self.wall_seconds if self.wall_seconds else 0.0,
+            "p50_ms": self.latencies.percentile(50) * 1e3,
+            "p99_ms": self.latencies.percentile(99) * 1e3,
+            "cpu_us_per_req": self.cpu_seconds / requests * 1e6,
+        }
+
+
+def run_sync(call: Callable[[int], None], threads: int, duration: float) -> Result:
+    """Calls call(i) from threads threads until duration seconds have passed"""
+    result = Result()
+    lock = threading.Lock()
+    stop = time.perf_counter() + duration
+
+    def worker(offset: int) -> None:
+        i, errors = offset, 0
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            try:
+                call(i)
+            except Exception:
+                errors += 1
+            result.latencies.record(time.perf_counter() - start)
+            i += threads
+        with lock:
+            result.errors += errors
+            result.requests += (i - offset) // threads
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    if threads == 1:
+        worker(0)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(worker, range(threads)))
+    result.wall_seconds = time.perf_counter() - wall_start
+    result.cpu_seconds = time.process_time() - cpu_start
+    return result
+
+
+async def run_async(call: Callable[[int], "asyncio.Future"], concurrency: int, duration: float) -> Result:
+    """Awaits call(i) from concurrency tasks until duration seconds have passed"""
+    result = Result()
+    stop = time.perf_counter() + duration
+
+    async def worker(offset: int) -> None:
+        i = offset
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            try:
+                await call(i)
+            except Exception:
+                result.errors += 1
+            result.latencies.record(time.perf_counter() - start)
+            result.requests += 1
+            i += concurrency
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+    result.wall_seconds = time.perf_counter() - wall_start
+    result.cpu_seconds = time.process_time() - cpu_start
+    return result
+
+
+class Benchmark:
+    def __init__(self, args: argparse.Namespace, server: StandInServer, url: Optional[str]):
+        self.args = args
+        self.server = server
+        self.url = url
+
+    def sync_client(self) -> TectonClient:
+        if self.url is not None:
+            # sync_batch sends the micro-batches of each call from the client's executor, so the requests in flight
+            # are not bounded by the threads of the benchmark
+            return TectonClient(
+                url=self.url,
+                api_key="fake-api-key",
+                default_workspace_name=WORKSPACE,
+                connection_options=UNBOUNDED_CONNECTIONS,
+            )
+        client = httpx.Client(transport=self.server.transport())
+        return TectonClient(
+            url="https://fake.tecton.ai", api_key="fake-api-key", default_workspace_name=WORKSPACE, client=client
+        )
+
+    def async_client(self) -> AsyncTectonClient:
+        if self.url is not None:
+            return AsyncTectonClient(
+                url=self.url,
+                api_key="fake-api-key",
+                default_workspace_name=WORKSPACE,
+                connection_options=UNBOUNDED_CONNECTIONS,
+            )
+        client = httpx.AsyncClient(transport=self.server.async_transport())
+        return AsyncTectonClient(
+            url="https://fake.tecton.ai", api_key="fake-api-key", default_workspace_name=WORKSPACE, client=client
+        )
+
+    def helpers(self) -> Result:
+        body = json.loads(self.server.response_body)
+
+        def call(i: int) -> None:
+            join_key_map = {"user_id": USER_IDS[i % len(USER_IDS)], "merchant": "merchant_123"}
+            build_get_features_request(
+                feature_service_id=None,
+                feature_service_name=FEATURE_SERVICE,
+                join_key_map=join_key_map,
+                request_context_map={"amount": 500.0},
+                workspace_name=WORKSPACE,
+            )
+            get_features_cache_key(
+                workspace_name=WORKSPACE,
+                feature_service_name=FEATURE_SERVICE,
+                feature_service_id=None,
+                join_key_map=join_key_map,
+                request_context_map={"amount": 500.0},
+            )
+            GetFeaturesResponse.from_response(body)
+
+        return run_sync(call, 1, self.args.duration)
+
+    def sync_get_features(self) -> Result:
+        client = self.sync_client()
+
+        def call(i: int) -> None:
+            client.get_features(
+                feature_service_name=FEATURE_SERVICE,
+                join_key_map={"user_id": USER_IDS[i % len(USER_IDS)], "merchant": "merchant_123"},
+                request_context_map={"amount": 500.0},
+            )
+
+        return run_sync(call, self.args.threads, self.args.duration)
+
+    def sync_prepared(self) -> Result:
+        prepared = self.sync_client().prepare(feature_service_name=FEATURE_SERVICE)
+
+        def call(i: int) -> None:
+            prepared.get({"user_id": USER_IDS[i % len(USER_IDS)], "merchant": "merchant_123"}, {"amount": 500.0})
+
+        return run_sync(call, self.args.threads, self.args.duration)
+
+    def sync_batch(self) -> Result:
+        client = self.sync_client()
+        rows = [GetFeaturesRequestData({"user_id": user_id}) for user_id in USER_IDS[: self.args.batch_size]]
+
+        def call(i: int) -> None:
+            client.get_features_batch(feature_service_name=FEATURE_SERVICE, request_data=rows)
+
+        return run_sync(call, self.args.threads, self.args.duration)
+
+    def async_get_features(self) -> Result:
+        async def run() -> Result:
+            client = self.async_client()
+
+            def call(i: int):
+                return client.get_features(
+                    feature_service_name=FEATURE_SERVICE,
+                    join_key_map={"user_id": USER_IDS[i % len(USER_IDS)], "merchant": "merchant_123"},
+                    request_context_map={"amount": 500.0},
+                )
+
+            return await run_async(call, self.args.concurrency, self.args.duration)
+
+        return asyncio.run(run())
+
+    def async_prepared(self) -> Result:
+        async def run() -> Result:
+            prepared = self.async_client().prepare(feature_service_name=FEATURE_SERVICE)
+
+            def call(i: int):
+                return prepared.get({"user_id": USER_IDS[i % len(USER_IDS)], "merchant": "merchant_123"})
+
+            return await run_async(call, self.args.concurrency, self.args.duration)
+
+        return asyncio.run(run())
+
+
+SCENARIOS = ("helpers", "sync_get_features", "sync_prepared", "sync_batch", "async_get_features", "async_prepared")
+
+
+def get_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, dict], baseline: dict, threshold: float) -> bool:
+    """Print the change of each compared metric against the baseline and return whether none regressed"""
+    ok = True
+    print(f"\ncompared with {baseline.get('commit')}:")
+    for scenario, metrics in results.items():
+        before = baseline["results"].get(scenario)
+        if before is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if not before[metric]:
+                continue
+            change = (metrics[metric] - before[metric]) / before[metric] * 100
+            regressed = (-change if higher_is_better else change) > threshold
+            ok = ok and not regressed
+            flag = "  REGRESSION" if regressed else ""
+            values = f"{before[metric]:>12.1f} -> {metrics[metric]:>12.1f}"
+            print(f"  {scenario:<22}{metric:<16}{values} ({change:+.1f}%){flag}")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transport", choices=("inprocess", "loopback"), default="inprocess")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per scenario")
+    parser.add_argument("--threads", type=int, default=1, help="threads of the sync scenarios")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent calls of the async scenarios")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--latency", default="constant:0", help="the stand-in's latency distribution")
+    parser.add_argument("--features", type=int, default=50)
+    parser.add_argument("--value-size", type=int, default=16)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="write the results to this json file")
+    parser.add_argument("--baseline", help="compare with the results in this json file")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change which counts as a regression")
+    args = parser.parse_args()
+
+    config = StandInConfig(
+        latency=args.latency, num_features=args.features, value_size=args.value_size, error_rate=args.error_rate
+    )
+    scenarios = args.scenarios.split(",")
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios {sorted(unknown)}")
+
+    server = StandInServer(config)
+    print(f"transport {args.transport}, latency {args.latency}, response body {len(server.response_body)} bytes")
+    print(f"{'scenario':<22}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'cpu us/req':>12}{'errors':>8}")
+    results = {}
+    with contextlib.ExitStack() as stack:
+        url = stack.enter_context(LoopbackServer(config)).url if args.transport == "loopback" else None
+        benchmark = Benchmark(args, server, url)
+        for scenario in scenarios:
+            result = getattr(benchmark, scenario)()
+            metrics = result.to_dict(args.batch_size if scenario == "sync_batch" else 1)
+            results[scenario] = metrics
+            print(
+                f"{scenario:<22}{metrics['req_per_s']:>10.0f}{metrics['p50_ms']:>10.3f}{metrics['p99_ms']:>10.3f}"
+                f"{metrics['cpu_us_per_req']:>12.1f}{metrics['errors']:>8}"
+            )
+
+    report = {
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "arguments": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("arguments", {}).get("transport") != args.transport:
+            print("warning: the baseline was run with another transport")
+        if not compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
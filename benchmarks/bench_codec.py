@@ -0,0 +1,101 @@
+"""Micro-benchmark of the per-call CPU cost of the json codecs used by the clients.
+
+Compares the stdlib path the clients used before codecs (httpx `json=` encoding and `Response.json()`) with each
+installed codec encoding the body once to bytes and decoding `Response.content`.
+
+Usage: python benchmarks/bench_codec.py [--iterations N] [--features N]
+"""
+
+import argparse
+import time
+
+import httpx
+
+from tecton_client import TectonClient
+from tecton_client._internal.codec import JsonCodec, MsgspecCodec, OrjsonCodec, msgspec, orjson
+from tecton_client._internal.utils import build_get_features_request
+
+
+def make_response_body(codec: JsonCodec, num_features: int) -> bytes:
+    features = [
+        [str(i), None, 1.5 * i] if i % 3 == 0 else (str(i) if i % 3 == 1 else 0.25 * i) for i in range(num_features)
+    ]
+    metadata = {
+        "features": [
+            {"name": f"fv_{i // 10}.feature_{i}", "dataType": {"type": "array", "elementType": {"type": "float64"}}}
+            for i in range(num_features)
+        ]
+    }
+    return codec.encode({"result": {"features": features}, "metadata": metadata})
+
+
+def cpu_per_call_us(fn, iterations: int) -> float:
+    for _ in range(min(iterations // 10, 1000)):
+        fn()
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--features", type=int, default=50)
+    args = parser.parse_args()
+
+    request = build_get_features_request(
+        feature_service_id=None,
+        feature_service_name="fraud_detection_feature_service:v2",
+        join_key_map={"user_id": "user_4407104885", "merchant": "merchant_123"},
+        request_context_map={"amount": 500.0},
+        workspace_name="prod",
+    )
+    body = make_response_body(JsonCodec(), args.features)
+    response = httpx.Response(200, content=body)
+    response.read()
+
+    codecs = [JsonCodec()]
+    if orjson is not None:
+        codecs.append(OrjsonCodec())
+    if msgspec is not None:
+        codecs.append(MsgspecCodec())
+
+    print(f"request body {len(JsonCodec().encode(request))} bytes, response body {len(body)} bytes")
+    print(f"{'path':<24}{'encode+decode us/call':>24}")
+
+    def baseline():
+        httpx.Request("POST", "https://fake.tecton.ai", json=request)
+        response.json()
+
+    print(f"{'httpx json= (before)':<24}{cpu_per_call_us(baseline, args.iterations):>24.1f}")
+    for codec in codecs:
+
+        def encode_decode(codec=codec):
+            httpx.Request("POST", "https://fake.tecton.ai", content=codec.encode(request))
+            codec.decode(response.content)
+
+        print(f"{codec.name:<24}{cpu_per_call_us(encode_decode, args.iterations):>24.1f}")
+
+    print(f"\n{'codec':<24}{'get_features us/call':>24}")
+    for codec in codecs:
+        client = TectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="prod",
+            client=httpx.Client(transport=httpx.MockTransport(lambda _: httpx.Response(200, content=body))),
+            codec=codec,
+        )
+
+        def get_features(client=client):
+            client.get_features(
+                feature_service_name="fraud_detection_feature_service:v2",
+                join_key_map={"user_id": "user_4407104885", "merchant": "merchant_123"},
+                request_context_map={"amount": 500.0},
+            )
+
+        print(f"{codec.name:<24}{cpu_per_call_us(get_features, args.iterations // 4):>24.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,66 @@
 from tecton_client._internal.async_tecton_client import AsyncTectonClient
-from tecton_client._internal.data_types import GetFeaturesResponse, MetadataOptions, RequestOptions
+from tecton_client._internal.cache import CacheStats, FeatureCache
+from tecton_client._internal.codec import JsonCodec
+from tecton_client._internal.columnar import features_to_matrix, features_to_numpy
+from tecton_client._internal.compression import CompressionOptions, CompressionStats
+from tecton_client._internal.concurrency_limit import AdaptiveConcurrency
+from tecton_client._internal.connections import ConnectionOptions
+from tecton_client._internal.data_types import (
+    GetFeaturesBatchResponse,
+    GetFeaturesRequestData,
+    GetFeaturesResponse,
+    MetadataOptions,
+    RequestOptions,
+)
+from tecton_client._internal.dataframes import features_to_arrow, features_to_pandas
+from tecton_client._internal.deadline import Deadline
+from tecton_client._internal.hedging import HedgingPolicy, HedgingStats
+from tecton_client._internal.instrumentation import LatencyHistogram, LatencyHistograms, RequestTimings
+from tecton_client._internal.load_balancer import EndpointStats, LoadBalancingPolicy
+from tecton_client._internal.micro_batcher import MicroBatchingOptions, MicroBatchStats
+from tecton_client._internal.prepared_request import AsyncPreparedFeatureRequest, PreparedFeatureRequest
+from tecton_client._internal.request_limiter import RequestLimits, RequestLimitStats
+from tecton_client._internal.retry import RetryBudget, RetryPolicy
+from tecton_client._internal.shared_cache import SharedFeatureCache
+from tecton_client._internal.stale_store import StaleFallbackStats, StaleFallbackStore
 from tecton_client._internal.tecton_client import TectonClient
 
-__all__ = (TectonClient, AsyncTectonClient, GetFeaturesResponse, MetadataOptions, RequestOptions)
+__all__ = (
+    TectonClient,
+    AsyncTectonClient,
+    GetFeaturesResponse,
+    GetFeaturesRequestData,
+    GetFeaturesBatchResponse,
+    MetadataOptions,
+    RequestOptions,
+    FeatureCache,
+    CacheStats,
+    features_to_numpy,
+    features_to_matrix,
+    JsonCodec,
+    PreparedFeatureRequest,
+    AsyncPreparedFeatureRequest,
+    MicroBatchingOptions,
+    MicroBatchStats,
+    RetryPolicy,
+    RetryBudget,
+    HedgingPolicy,
+    HedgingStats,
+    Deadline,
+    RequestLimits,
+    RequestLimitStats,
+    AdaptiveConcurrency,
+    RequestTimings,
+    LatencyHistogram,
+    LatencyHistograms,
+    LoadBalancingPolicy,
+    EndpointStats,
+    ConnectionOptions,
+    features_to_pandas,
+    features_to_arrow,
+    CompressionOptions,
+    CompressionStats,
+    StaleFallbackStore,
+    StaleFallbackStats,
+    SharedFeatureCache,
+)
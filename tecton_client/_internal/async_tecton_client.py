@@ -1,56 +1,500 @@
-from typing import Any, Dict, Optional, Union
-from urllib.parse import urljoin
+import asyncio
+import functools
+import logging
+import time
+from collections import deque
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 import httpx
 from httpx import HTTPStatusError
 
+from tecton_client._internal.cache import FeatureCache
+from tecton_client._internal.codec import JsonCodec, get_codec
+from tecton_client._internal.compression import Compression, CompressionOptions, CompressionStats
+from tecton_client._internal.connections import (
+    ConnectionOptions,
+    aopen_connections,
+    build_http_client,
+    get_http_clients,
+    get_warm_up_url,
+    rebuild_http_clients,
+    register_after_fork,
+    unregister_after_fork,
+)
 from tecton_client._internal.data_types import (
+    BARE_METADATA_OPTIONS,
+    GetFeaturesBatchResponse,
     GetFeatureServiceMetadataResponse,
+    GetFeaturesRequestData,
     GetFeaturesResponse,
     MetadataOptions,
     RequestOptions,
 )
+from tecton_client._internal.dataframes import features_to_frame, get_request_data
+from tecton_client._internal.deadline import Deadline, get_fallback_response, wait_with_deadline
+from tecton_client._internal.hedging import Hedger, HedgingPolicy, HedgingStats
+from tecton_client._internal.instrumentation import (
+    NetworkTracer,
+    RequestHook,
+    RequestTimings,
+    emit_request_timings,
+)
+from tecton_client._internal.load_balancer import (
+    EndpointStats,
+    LoadBalancingPolicy,
+    get_api_urls,
+    get_urls,
+    make_load_balancer,
+)
+from tecton_client._internal.metadata_registry import (
+    DEFAULT_METADATA_REFRESH_INTERVAL_SECONDS,
+    REGISTRY_METADATA_OPTIONS,
+    FeatureServiceMetadataRegistry,
+)
+from tecton_client._internal.micro_batcher import MicroBatcher, MicroBatchingOptions, MicroBatchStats
+from tecton_client._internal.prepared_request import AsyncPreparedFeatureRequest
+from tecton_client._internal.request_limiter import (
+    AsyncRequestLimiter,
+    RequestLimiters,
+    RequestLimits,
+    RequestLimitStats,
+)
+from tecton_client._internal.retry import RetryPolicy
+from tecton_client._internal.shared_cache import SharedFeatureCache
+from tecton_client._internal.single_flight import SingleFlight
+from tecton_client._internal.stale_store import FALLBACK_ERRORS, StaleFallbackStore
 from tecton_client._internal.utils import (
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MICRO_BATCH_SIZE,
+    as_async_iterator,
     build_get_feature_service_metadata_request,
+    build_get_features_batch_request,
     build_get_features_request,
     get_default_headers,
+    get_features_cache_key,
+    get_features_request_key,
+    get_micro_batch_key,
+    split_into_micro_batches,
     validate_request_args,
 )
-from tecton_client.exceptions import convert_exception
+from tecton_client.exceptions import DeadlineExceededError, TectonHttpException, convert_exception
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
 
 
 class AsyncTectonClient:
-    """A lightweight http client for interacting with features in Tecton. For the full sdk, use tecton-sdk"""
+    """A lightweight http client for interacting with features in Tecton. For the full sdk, use tecton-sdk
+
+    aclose the client, or use it as an async context manager, to cancel its background tasks and close its
+    connections. A client is safe to create before a pre-fork server forks its workers: each forked process drops the
+    parent's in-flight requests and tasks, and gets new connection pools if the client builds its own httpx client.
+    """
 
     def __init__(
-        self, url: str, api_key: str, default_workspace_name: Optional[str] = None, client: httpx.AsyncClient = None
+        self,
+        url: Union[str, Sequence[str]],
+        api_key: str,
+        default_workspace_name: Optional[str] = None,
+        client: httpx.AsyncClient = None,
+        cache: Union[None, FeatureCache, SharedFeatureCache] = None,
+        codec: Union[str, JsonCodec] = "auto",
+        coalesce_requests: bool = False,
+        micro_batching: Optional[MicroBatchingOptions] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        hedging_policy: Optional[HedgingPolicy] = None,
+        request_limits: Optional[RequestLimits] = None,
+        request_limits_by_feature_service: Optional[Dict[str, RequestLimits]] = None,
+        bare_responses: bool = False,
+        load_balancing: Optional[LoadBalancingPolicy] = None,
+        connection_options: Optional[ConnectionOptions] = None,
+        compression: Optional[CompressionOptions] = None,
+        stale_store: Optional[StaleFallbackStore] = None,
     ):
         """Constructor for the client
 
         Args:
-            url: base url to your tecton cluster. Ex: http://explore.tecton.ai
+            url: base url to your tecton cluster. Ex: http://explore.tecton.ai. Several urls of the same cluster, e.g.
+                of regional or zonal endpoints, spread the requests over them as configured by load_balancing.
             api_key: See https://docs.tecton.ai/docs/ for how to create an api key.
             default_workspace_name: The workspace from which the features will be retrieved.
                 Can be over-ridden by individual function calls.
             client: An httpx.Client, allowing you to provide finer-grained customization on the request behavior,
                 such as default timeout or connection settings. See https://www.python-httpx.org/ for more info.
+            cache: A FeatureCache, or a SharedFeatureCache shared by the processes of a host, used to serve repeated
+                get_features requests without calling the feature server.
+                Individual requests can bypass it with RequestOptions(read_from_cache=False, write_to_cache=False).
+            codec: The json codec used to encode requests and decode responses: "auto" (default) for msgspec or
+                orjson when installed and the stdlib otherwise, "json", "orjson", "msgspec" or a JsonCodec.
+            coalesce_requests: Whether concurrent get_features calls for the same request share a single request to
+                the feature server, and its response or exception. See deduplicated_requests.
+            micro_batching: If set, concurrent get_features calls for the same feature service and options are
+                gathered into requests to the batch api, as configured by the MicroBatchingOptions. See
+                micro_batch_stats.
+            retry_policy: A RetryPolicy for retrying requests which fail with a retryable status code or transport
+                error. By default requests are not retried.
+            hedging_policy: If set, a get_features request which is not answered within the HedgingPolicy's delay is
+                sent a second time, and the first response wins. See hedging_stats.
+            request_limits: RequestLimits on the number of concurrent get_features requests and their rate, shared by
+                all feature services without their own limits. See request_limit_stats.
+            request_limits_by_feature_service: RequestLimits for the requests to individual feature services, by
+                feature service name or id.
+            bare_responses: Whether responses keep only the features. Requests without metadata_options then ask the
+                feature server for no metadata, and the metadata in the metadata registry is not attached either.
+            load_balancing: The LoadBalancingPolicy of a client with several urls; by default requests go to the
+                endpoint with the lowest latency and load (EWMA), and failing endpoints are ejected for a while. Each
+                endpoint gets its own connection pool unless a client is given. See endpoint_stats.
+            connection_options: ConnectionOptions for the connection pools, e.g. to enable HTTP/2 or to raise the pool
+                limits, when no client is given. See also warm_up.
+            compression: CompressionOptions for compressing large request bodies and negotiating the encoding of
+                responses. By default request bodies are not compressed and responses are decoded by httpx. See
+                compression_stats.
+            stale_store: A StaleFallbackStore which keeps the last good get_features responses, served with is_stale
+                set while the feature server fails or the timeout budget runs out, and refreshed in the background.
         """
+        if client is not None and connection_options is not None:
+            msg = "connection_options only apply when the client builds its own httpx client, not with client"
+            raise ValueError(msg)
         self.url = url
         self.default_workspace_name = default_workspace_name
         self._api_key = api_key
-        self._base_url = urljoin(url, "/api/v1/")
-        self._paths = {
-            "get_features": urljoin(self._base_url, "feature-service/get-features"),
-            "get_feature_service_metadata": urljoin(self._base_url, "feature-service/metadata"),
-        }
+        urls = get_urls(url)
+        self._paths = get_api_urls(urls[0])
 
         headers = get_default_headers(api_key)
-        if client is None:
-            self._client = httpx.AsyncClient(headers=headers)
-        else:
-            self._client = client
+        if client is not None:
             # add the headers to the existing client headers
-            self._client.headers.update(headers)
+            client.headers.update(headers)
+        new_http_client = build_http_client(httpx.AsyncClient, headers, connection_options)
+        self._load_balancer = make_load_balancer(urls, new_http_client, client, load_balancing)
+        if client is not None:
+            self._client = client
+        elif self._load_balancer is not None:
+            self._client = self._load_balancer.endpoints[0].client
+        else:
+            self._client = new_http_client()
+        # only the httpx clients built by the client are closed by it, and rebuilt after fork
+        self._new_http_client = new_http_client if client is None else None
+
+        self._cache = cache
+        self._codec = get_codec(codec)
+        self._decoders = {
+            "get_features": self._codec.decode_features_response,
+            "get_features_batch": self._codec.decode_features_response,
+            "get_feature_service_metadata": self._codec.decode,
+        }
+        self._bare_responses = bare_responses
+        self._compression = Compression(compression) if compression is not None else None
+        self._stale_store = stale_store
+        # strong references to the background refreshes of stale responses, which the event loop only holds weakly
+        self._refresh_tasks: Set[asyncio.Task] = set()
+        self._retry_policy = retry_policy
+        self._hedger = Hedger(hedging_policy) if hedging_policy is not None else None
+        self._single_flight = SingleFlight() if coalesce_requests else None
+        self._micro_batcher = MicroBatcher(micro_batching) if micro_batching is not None else None
+        self._limiters = None
+        if request_limits is not None or request_limits_by_feature_service:
+            self._limiters = RequestLimiters(request_limits, request_limits_by_feature_service, AsyncRequestLimiter)
+        self.metadata_registry = FeatureServiceMetadataRegistry()
+        self._metadata_refresh_task: Optional[asyncio.Task] = None
+        self._request_hooks: Tuple[RequestHook, ...] = ()
+        register_after_fork(self)
+
+    async def aclose(self) -> None:
+        """Cancel the background tasks of the client and close the connections of the httpx clients it built. An
+        httpx client passed to the constructor is left open for its owner to close."""
+        unregister_after_fork(self)
+        self.stop_metadata_refresh()
+        for task in list(self._refresh_tasks):
+            task.cancel()
+        if self._new_http_client is not None:
+            for http_client in get_http_clients(self._client, self._load_balancer):
+                await http_client.aclose()
+
+    async def __aenter__(self) -> "AsyncTectonClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    def _after_fork(self) -> None:
+        # the pooled connections are sockets shared with the parent process, so they are dropped without closing them.
+        # An httpx client passed to the constructor is its owner's to replace.
+        if self._new_http_client is not None:
+            self._client = rebuild_http_clients(self._new_http_client, self._load_balancer)
+        # the requests in flight in the parent hold limiter slots and count as outstanding, and refreshes block the
+        # refreshes of their keys, but none of them finish in the child
+        if self._limiters is not None:
+            self._limiters.reset_after_fork()
+        if self._load_balancer is not None:
+            self._load_balancer.reset_after_fork()
+        if self._stale_store is not None:
+            self._stale_store.reset_after_fork()
+        # tasks and in-flight requests belong to the event loop of the parent process, which doesn't run in the child
+        self._refresh_tasks = set()
+        self._metadata_refresh_task = None
+        if self._single_flight is not None:
+            self._single_flight = SingleFlight()
+        if self._micro_batcher is not None:
+            self._micro_batcher = MicroBatcher(self._micro_batcher.options)
+
+    @property
+    def deduplicated_requests(self) -> int:
+        """The number of get_features calls which shared the request of a concurrent identical call"""
+        return self._single_flight.deduplicated if self._single_flight is not None else 0
+
+    @property
+    def micro_batch_stats(self) -> MicroBatchStats:
+        """The number of batches sent by micro-batching, and the distribution of their sizes"""
+        return self._micro_batcher.stats if self._micro_batcher is not None else MicroBatchStats()
+
+    @property
+    def hedging_stats(self) -> HedgingStats:
+        """The number of get_features requests sent, how many were hedged and how many hedges won"""
+        return self._hedger.stats if self._hedger is not None else HedgingStats()
+
+    @property
+    def request_limit_stats(self) -> Dict[Optional[str], RequestLimitStats]:
+        """The queue depth, wait times and number of rejections of the request limiters, by feature service name or
+        id, with None for the limiter shared by the feature services without their own limits"""
+        return self._limiters.stats if self._limiters is not None else {}
+
+    @property
+    def compression_stats(self) -> Optional[CompressionStats]:
+        """The bytes of the request and response bodies as encoded json and on the wire, for a client with
+        CompressionOptions"""
+        return self._compression.stats if self._compression is not None else None
+
+    @property
+    def endpoint_stats(self) -> List[EndpointStats]:
+        """The outstanding requests, latency and health of each endpoint of a client with several urls"""
+        return self._load_balancer.stats if self._load_balancer is not None else []
+
+    def _get_limiter(self, feature_service: Optional[str]) -> Optional[AsyncRequestLimiter]:
+        return self._limiters.get(feature_service) if self._limiters is not None else None
+
+    def add_request_hook(self, hook: RequestHook) -> None:
+        """Call hook with the RequestTimings of every call to the feature server, and of get_features calls served
+        from the cache, e.g. a LatencyHistograms. Calls which share a coalesced or micro-batched request are recorded
+        once, by that request. Hooks are called on the event loop, so they must not block."""
+        self._request_hooks = (*self._request_hooks, hook)
+
+    def remove_request_hook(self, hook: RequestHook) -> None:
+        self._request_hooks = tuple(h for h in self._request_hooks if h != hook)
+
+    def _start_timings(self, path: str, feature_service: Optional[str]) -> Optional[RequestTimings]:
+        # instrumentation costs nothing but this check when there are no hooks
+        return RequestTimings(path, feature_service) if self._request_hooks else None
+
+    async def _post(
+        self,
+        path: str,
+        request_data: dict,
+        deadline: Optional[Deadline] = None,
+        limiter: Optional[AsyncRequestLimiter] = None,
+    ) -> dict:
+        return await self._send(path, self._codec.encode(request_data), deadline, limiter)
+
+    async def _post_and_parse(
+        self,
+        path: str,
+        request_data: dict,
+        parse: Callable[[dict], T],
+        deadline: Optional[Deadline] = None,
+        limiter: Optional[AsyncRequestLimiter] = None,
+        timings: Optional[RequestTimings] = None,
+    ) -> T:
+        if timings is None:
+            return parse(await self._post(path, request_data, deadline, limiter))
+        start = time.perf_counter()
+        content = self._codec.encode(request_data)
+        timings.encode_seconds = time.perf_counter() - start
+        return await self._send_and_parse(path, content, parse, deadline, limiter, timings)
+
+    async def _send_and_parse(
+        self,
+        path: str,
+        content: bytes,
+        parse: Callable[[dict], T],
+        deadline: Optional[Deadline] = None,
+        limiter: Optional[AsyncRequestLimiter] = None,
+        timings: Optional[RequestTimings] = None,
+    ) -> T:
+        if timings is None:
+            return parse(await self._send(path, content, deadline, limiter))
+        try:
+            data = await self._send(path, content, deadline, limiter, timings)
+            start = time.perf_counter()
+            result = parse(data)
+            timings.parse_seconds = time.perf_counter() - start
+            return result
+        except BaseException as exc:
+            timings.error = exc
+            raise
+        finally:
+            emit_request_timings(self._request_hooks, timings)
+
+    async def _send(
+        self,
+        path: str,
+        content: bytes,
+        deadline: Optional[Deadline] = None,
+        limiter: Optional[AsyncRequestLimiter] = None,
+        timings: Optional[RequestTimings] = None,
+    ) -> dict:
+        retry_policy = self._retry_policy
+        if retry_policy is None:
+            return await self._send_attempt(path, content, deadline, limiter, timings)
+
+        retry_policy.budget.record_request()
+        start = time.monotonic()
+        attempt = 1
+        while True:
+            try:
+                return await self._send_attempt(path, content, deadline, limiter, timings)
+            except (TectonHttpException, httpx.TransportError) as exc:
+                remaining = deadline.remaining() if deadline is not None else None
+                delay = retry_policy.get_retry_delay(exc, attempt, time.monotonic() - start, remaining)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _send_attempt(
+        self,
+        path: str,
+        content: bytes,
+        deadline: Optional[Deadline],
+        limiter: Optional[AsyncRequestLimiter],
+        timings: Optional[RequestTimings] = None,
+    ) -> dict:
+        if self._hedger is not None and path == "get_features":
+            return await self._hedger.run(functools.partial(self._send_once, path, content, deadline, limiter, timings))
+        return await self._send_once(path, content, deadline, limiter, timings)
+
+    async def _post_once(
+        self,
+        http_client: httpx.AsyncClient,
+        url: str,
+        content: bytes,
+        deadline: Optional[Deadline],
+        timeout: Optional[httpx.Timeout],
+        timings: Optional[RequestTimings],
+    ) -> httpx.Response:
+        kwargs = {}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        compression = self._compression
+        body, headers = (content, None) if compression is None else compression.encode_request(content)
+        if timings is not None:
+            timings.request_bytes = len(content)
+            timings.request_wire_bytes = len(body)
+            tracer = NetworkTracer(timings)
+            kwargs["extensions"] = {"trace": tracer.atrace}
+        try:
+            if compression is None:
+                resp = await http_client.post(url, content=content, **kwargs)
+            else:
+                request = http_client.build_request("POST", url, content=body, headers=headers, **kwargs)
+                resp = await http_client.send(request, stream=True)
+                try:
+                    # the compressed body is decompressed as a whole, see CompressionOptions; transports which hand
+                    # over whole responses, e.g. mock transports, have decoded them already
+                    raw = None if resp.is_stream_consumed else b"".join([chunk async for chunk in resp.aiter_raw()])
+                finally:
+                    await resp.aclose()
+            if timings is not None:
+                timings.response_wire_bytes = resp.num_bytes_downloaded
+            return resp if compression is None else compression.decode_response(resp, raw)
+        except httpx.TimeoutException as exc:
+            if deadline is None or not deadline.expired:
+                raise
+            msg = "the timeout budget ran out before the response was received"
+            raise DeadlineExceededError(msg) from exc
+        finally:
+            if timings is not None:
+                tracer.finish()
+
+    async def _send_once(
+        self,
+        path: str,
+        content: bytes,
+        deadline: Optional[Deadline] = None,
+        limiter: Optional[AsyncRequestLimiter] = None,
+        timings: Optional[RequestTimings] = None,
+    ) -> dict:
+        if limiter is not None:
+            async with limiter.limit(deadline):
+                return await self._send_once(path, content, deadline, timings=timings)
+        timeout = deadline.timeout(self._client.timeout) if deadline is not None else None
+        balancer = self._load_balancer
+        if balancer is None:
+            resp = await self._post_once(self._client, self._paths[path], content, deadline, timeout, timings)
+        else:
+            endpoint = balancer.pick()
+            start = time.monotonic()
+            try:
+                resp = await self._post_once(endpoint.client, endpoint.urls[path], content, deadline, timeout, timings)
+            except httpx.TransportError:
+                balancer.on_failure(endpoint, time.monotonic() - start)
+                raise
+            except BaseException:
+                # a request cut short by the caller's timeout budget says nothing about the health of the endpoint
+                balancer.on_cancel(endpoint)
+                raise
+            if resp.status_code >= 500:
+                balancer.on_failure(endpoint, time.monotonic() - start)
+            else:
+                balancer.on_success(endpoint, time.monotonic() - start)
+        if timings is not None:
+            timings.status_code = resp.status_code
+            timings.response_bytes = len(resp.content)
+        try:
+            resp.raise_for_status()
+        except HTTPStatusError as exc:
+            raise convert_exception(exc) from exc
+
+        if timings is None:
+            return self._decoders[path](resp.content)
+        start = time.perf_counter()
+        data = self._decoders[path](resp.content)
+        timings.decode_seconds += time.perf_counter() - start
+        return data
+
+    def _refresh_stale(self, cache_key: bytes, refresh: Callable[[], Awaitable[GetFeaturesResponse]]) -> None:
+        """Retrieve the features of a stale response again in the background, unless that is already underway"""
+        store = self._stale_store
+        if not store.start_refresh(cache_key):
+            return
+
+        async def run() -> None:
+            try:
+                await refresh()
+            except Exception as exc:
+                logger.debug("Failed to refresh a stale response: %s", exc)
+            finally:
+                store.finish_refresh(cache_key)
+
+        task = asyncio.ensure_future(run())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
 
     async def get_features(
         self,
@@ -63,28 +507,363 @@ class AsyncTectonClient:
         workspace_name: Optional[str] = None,
         request_options: Optional[RequestOptions] = None,
         allow_partial_results: bool = False,
+        timeout_budget: Union[None, float, Deadline] = None,
+        fallback: Optional[GetFeaturesResponse] = None,
     ) -> GetFeaturesResponse:
+        """Retrieve the features of a feature service for one set of join keys and request context.
+
+        timeout_budget is the time in seconds the call may take, or a Deadline shared with other calls. It caps the
+        connect, write, read and pool timeouts of every request and stops retries which could not complete in time.
+        If the budget runs out, the response is served from the client's cache if it has one for the request (even
+        if read_from_cache is False), else fallback is returned if given, else DeadlineExceededError is raised.
+
+        With a stale_store, a call which runs out of the budget or fails with a ServiceUnavailableError, a
+        GatewayTimeoutError or a transport error returns the last good response for the request instead, with
+        is_stale set, and retrieves the features again in the background.
+        """
+        timings = self._start_timings("get_features", feature_service_name or feature_service_id)
+        deadline = Deadline.from_budget(timeout_budget)
         validate_request_args(feature_service_id, feature_service_name, workspace_name, self.default_workspace_name)
         if not workspace_name:
             workspace_name = self.default_workspace_name
-        request_data = build_get_features_request(
-            feature_service_id=feature_service_id,
+        refresh_args = dict(
             feature_service_name=feature_service_name,
+            feature_service_id=feature_service_id,
             join_key_map=join_key_map,
             request_context_map=request_context_map,
+            metadata_options=metadata_options,
+            workspace_name=workspace_name,
+            request_options=request_options,
+        )
+
+        cache_key = None
+        if self._cache is not None or self._single_flight is not None or self._stale_store is not None:
+            cache_key = get_features_cache_key(
+                workspace_name=workspace_name,
+                feature_service_name=feature_service_name,
+                feature_service_id=feature_service_id,
+                join_key_map=join_key_map,
+                request_context_map=request_context_map,
+                metadata_options=metadata_options,
+            )
+        if self._cache is not None and (request_options is None or request_options.read_from_cache):
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                if timings is not None:
+                    timings.cache_hit = True
+                    emit_request_timings(self._request_hooks, timings)
+                return cached
+
+        features_metadata = None
+        if metadata_options is None and self._bare_responses:
+            metadata_options = BARE_METADATA_OPTIONS
+        elif metadata_options is None:
+            features_metadata = self.metadata_registry.get_features_metadata(
+                (workspace_name, feature_service_name, feature_service_id)
+            )
+            if features_metadata is not None:
+                # the names and data types are already known, so the feature server does not need to send them
+                metadata_options = REGISTRY_METADATA_OPTIONS
+
+        request_args = dict(
+            feature_service_id=feature_service_id,
+            feature_service_name=feature_service_name,
             workspace_name=workspace_name,
             metadata_options=metadata_options,
             allow_partial_results=allow_partial_results,
             request_options=request_options,
         )
-        resp = await self._client.post(url=self._paths["get_features"], json=request_data)
+        # a coalesced request is shared with callers with other budgets, so only the callers' waits are bounded
+        request_deadline = deadline if self._single_flight is None else None
+
+        async def fetch() -> GetFeaturesResponse:
+            if self._micro_batcher is not None:
+                response = await self._micro_batcher.submit(
+                    get_micro_batch_key(**request_args),
+                    GetFeaturesRequestData(join_key_map, request_context_map),
+                    functools.partial(self._get_features_micro_batch, **request_args),
+                )
+            else:
+                request_data = build_get_features_request(
+                    join_key_map=join_key_map, request_context_map=request_context_map, **request_args
+                )
+                if timings is not None:
+                    timings.build_seconds = time.perf_counter() - timings.started_at
+                response = await self._post_and_parse(
+                    "get_features",
+                    request_data,
+                    GetFeaturesResponse.get_parser(metadata_options),
+                    request_deadline,
+                    self._get_limiter(feature_service_name or feature_service_id),
+                    timings,
+                )
+            if features_metadata is not None:
+                response.metadata = features_metadata
+
+            # partial results may be missing features, so they are never cached
+            if not allow_partial_results:
+                if self._cache is not None and (request_options is None or request_options.write_to_cache):
+                    self._cache.put(cache_key, response, feature_service_name or feature_service_id)
+                if self._stale_store is not None:
+                    self._stale_store.put(cache_key, response)
+            return response
 
+        if self._single_flight is None:
+            call = fetch()
+        else:
+            request_key = get_features_request_key(cache_key, request_options, allow_partial_results)
+            call = self._single_flight.do(request_key, fetch)
         try:
-            resp.raise_for_status()
-        except HTTPStatusError as exc:
-            raise convert_exception(exc) from exc
+            return await wait_with_deadline(call, deadline)
+        except FALLBACK_ERRORS as exc:
+            response = get_fallback_response(exc, self._cache, self._stale_store, cache_key, fallback)
+            if response is None:
+                raise
+            if response.is_stale:
+                self._refresh_stale(cache_key, functools.partial(self.get_features, **refresh_args))
+            return response
+
+    def prepare(
+        self,
+        *,
+        feature_service_name: Optional[str] = None,
+        feature_service_id: Optional[str] = None,
+        metadata_options: Optional[MetadataOptions] = None,
+        workspace_name: Optional[str] = None,
+        request_options: Optional[RequestOptions] = None,
+        allow_partial_results: bool = False,
+    ) -> AsyncPreparedFeatureRequest:
+        """Prepare a reusable get_features request for a fixed feature service and options.
+
+        The arguments are validated and the static parts of the request body are encoded once; the returned object's
+        get(join_key_map, request_context_map) only encodes what changes between calls. Prepare the request after
+        warming up the metadata registry for it to use the registry's metadata.
+        """
+        return AsyncPreparedFeatureRequest(
+            self,
+            feature_service_name=feature_service_name,
+            feature_service_id=feature_service_id,
+            metadata_options=metadata_options,
+            workspace_name=workspace_name,
+            request_options=request_options,
+            allow_partial_results=allow_partial_results,
+        )
+
+    async def _get_features_micro_batch(
+        self, rows: Sequence[GetFeaturesRequestData], deadline: Optional[Deadline] = None, **request_args
+    ) -> List[GetFeaturesResponse]:
+        feature_service = request_args["feature_service_name"] or request_args["feature_service_id"]
+        timings = self._start_timings("get_features_batch", feature_service)
+        batch_request = build_get_features_batch_request(request_data=rows, **request_args)
+        if timings is not None:
+            timings.build_seconds = time.perf_counter() - timings.started_at
+        return await wait_with_deadline(
+            self._post_and_parse(
+                "get_features_batch",
+                batch_request,
+                GetFeaturesResponse.get_parser(request_args["metadata_options"], batch=True),
+                deadline,
+                self._get_limiter(feature_service),
+                timings,
+            ),
+            deadline,
+        )
+
+    async def get_features_batch(
+        self,
+        *,
+        request_data: Sequence[GetFeaturesRequestData],
+        feature_service_name: Optional[str] = None,
+        feature_service_id: Optional[str] = None,
+        metadata_options: Optional[MetadataOptions] = None,
+        workspace_name: Optional[str] = None,
+        request_options: Optional[RequestOptions] = None,
+        allow_partial_results: bool = False,
+        micro_batch_size: int = DEFAULT_MICRO_BATCH_SIZE,
+        timeout_budget: Union[None, float, Deadline] = None,
+    ) -> GetFeaturesBatchResponse:
+        """Retrieve features for many rows of join keys and request context using the batch api.
+
+        The rows are split into micro-batches of at most micro_batch_size rows which are sent concurrently. The
+        responses are returned in the same order as request_data. If allow_partial_results is set, a micro-batch
+        which fails with a TectonHttpException, or runs out of the timeout_budget, does not fail the whole call; its
+        rows get the exception in GetFeaturesBatchResponse.errors instead.
+        """
+        deadline = Deadline.from_budget(timeout_budget)
+        validate_request_args(feature_service_id, feature_service_name, workspace_name, self.default_workspace_name)
+        if not workspace_name:
+            workspace_name = self.default_workspace_name
+        if metadata_options is None and self._bare_responses:
+            metadata_options = BARE_METADATA_OPTIONS
+        micro_batches = split_into_micro_batches(request_data, micro_batch_size)
+
+        results = await asyncio.gather(
+            *(
+                self._get_features_micro_batch(
+                    rows,
+                    deadline,
+                    feature_service_id=feature_service_id,
+                    feature_service_name=feature_service_name,
+                    workspace_name=workspace_name,
+                    metadata_options=metadata_options,
+                    allow_partial_results=allow_partial_results,
+                    request_options=request_options,
+                )
+                for rows in micro_batches
+            ),
+            return_exceptions=True,
+        )
+
+        responses: List[Optional[GetFeaturesResponse]] = []
+        errors: List[Optional[Exception]] = []
+        for rows, result in zip(micro_batches, results):
+            if isinstance(result, (TectonHttpException, DeadlineExceededError)) and allow_partial_results:
+                responses.extend([None] * len(rows))
+                errors.extend([result] * len(rows))
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                responses.extend(result)
+                errors.extend([None] * len(result))
+        return GetFeaturesBatchResponse(responses=responses, errors=errors)
+
+    async def iter_features(
+        self,
+        request_data: Union[Iterable[GetFeaturesRequestData], AsyncIterable[GetFeaturesRequestData]],
+        *,
+        feature_service_name: Optional[str] = None,
+        feature_service_id: Optional[str] = None,
+        metadata_options: Optional[MetadataOptions] = None,
+        workspace_name: Optional[str] = None,
+        request_options: Optional[RequestOptions] = None,
+        allow_partial_results: bool = False,
+        max_in_flight: int = DEFAULT_MAX_CONCURRENCY,
+        ordered: bool = True,
+        return_errors: bool = False,
+        timeout_budget: Union[None, float, Deadline] = None,
+    ) -> AsyncIterator[Tuple[GetFeaturesRequestData, Union[GetFeaturesResponse, Exception]]]:
+        """Stream the features of the rows of a possibly unbounded iterable or async iterable, with one get_features
+        request per row. Use with async for.
+
+        The rows are consumed lazily: a row is only taken from request_data when fewer than max_in_flight requests
+        are in flight, so memory use does not depend on the number of rows. Yields (row, response) pairs in the order
+        of request_data, or as the requests complete if ordered is False. If return_errors is set, a row which fails
+        with a TectonHttpException or runs out of the timeout_budget, which is shared by all rows, is yielded with the
+        exception instead of a response; otherwise the exception is raised. Closing the iterator early cancels the
+        requests in flight.
+        """
+        if max_in_flight < 1:
+            msg = "max_in_flight must be at least 1"
+            raise ValueError(msg)
+        deadline = Deadline.from_budget(timeout_budget)
+
+        async def get_row(row: GetFeaturesRequestData) -> Union[GetFeaturesResponse, Exception]:
+            try:
+                return await self.get_features(
+                    feature_service_name=feature_service_name,
+                    feature_service_id=feature_service_id,
+                    join_key_map=row.join_key_map,
+                    request_context_map=row.request_context_map,
+                    metadata_options=metadata_options,
+                    workspace_name=workspace_name,
+                    request_options=request_options,
+                    allow_partial_results=allow_partial_results,
+                    timeout_budget=deadline,
+                )
+            except (TectonHttpException, DeadlineExceededError) as exc:
+                if not return_errors:
+                    raise
+                return exc
+
+        rows = as_async_iterator(request_data)
+        exhausted = False
+        # the tasks of the requests in flight, in the order of the rows
+        in_flight: Deque[Tuple[GetFeaturesRequestData, asyncio.Task]] = deque()
+        try:
+            while True:
+                while not exhausted and len(in_flight) < max_in_flight:
+                    try:
+                        row = await rows.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                    else:
+                        in_flight.append((row, asyncio.ensure_future(get_row(row))))
+                if not in_flight:
+                    return
+                if ordered:
+                    row, task = in_flight.popleft()
+                else:
+                    await asyncio.wait([task for _, task in in_flight], return_when=asyncio.FIRST_COMPLETED)
+                    index = next(i for i, (_, task) in enumerate(in_flight) if task.done())
+                    row, task = in_flight[index]
+                    del in_flight[index]
+                yield row, await task
+        finally:
+            for _, task in in_flight:
+                task.cancel()
+
+    async def get_features_dataframe(
+        self,
+        *,
+        data: Any,
+        feature_service_name: Optional[str] = None,
+        feature_service_id: Optional[str] = None,
+        workspace_name: Optional[str] = None,
+        request_options: Optional[RequestOptions] = None,
+        allow_partial_results: bool = False,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        null_failed_rows: bool = False,
+        timeout_budget: Union[None, float, Deadline] = None,
+    ) -> Any:
+        """Retrieve the features of every row of a pandas DataFrame or pyarrow Table of join keys and request context.
+
+        The columns named after the join keys and request context keys of the feature service are the request data of
+        each row; other columns are ignored. Each row is looked up with a get_features call, with at most
+        max_concurrency of them in flight. Returns the features as a DataFrame with the index of data, or as an Arrow
+        table, with one column per feature named and typed after the feature service metadata (see features_to_pandas
+        and features_to_arrow). The metadata is taken from the metadata registry, or retrieved first. If
+        null_failed_rows is set, the rows whose request fails with a TectonHttpException or runs out of the
+        timeout_budget are null instead of failing the call.
+
+        Requires numpy and pandas or pyarrow: `pip install tecton-client[pandas]` or `tecton-client[pyarrow]`.
+        """
+        if max_concurrency < 1:
+            msg = "max_concurrency must be at least 1"
+            raise ValueError(msg)
+        deadline = Deadline.from_budget(timeout_budget)
+        validate_request_args(feature_service_id, feature_service_name, workspace_name, self.default_workspace_name)
+        if not workspace_name:
+            workspace_name = self.default_workspace_name
+        metadata = self.metadata_registry.get((workspace_name, feature_service_name, feature_service_id))
+        if metadata is None:
+            metadata = await self.get_feature_service_metadata(
+                feature_service_name=feature_service_name,
+                feature_service_id=feature_service_id,
+                workspace_name=workspace_name,
+                timeout_budget=deadline,
+            )
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def get_row(row: GetFeaturesRequestData) -> Optional[GetFeaturesResponse]:
+            async with semaphore:
+                try:
+                    return await self.get_features(
+                        feature_service_name=feature_service_name,
+                        feature_service_id=feature_service_id,
+                        join_key_map=row.join_key_map,
+                        request_context_map=row.request_context_map,
+                        workspace_name=workspace_name,
+                        request_options=request_options,
+                        allow_partial_results=allow_partial_results,
+                        timeout_budget=deadline,
+                    )
+                except (TectonHttpException, DeadlineExceededError):
+                    if not null_failed_rows:
+                        raise
+                    return None
 
-        return GetFeaturesResponse.from_response(resp.json())
+        responses = await asyncio.gather(*(get_row(row) for row in get_request_data(data, metadata)))
+        return features_to_frame(data, responses, metadata)
 
     async def get_feature_service_metadata(
         self,
@@ -92,7 +871,14 @@ class AsyncTectonClient:
         feature_service_name: Optional[str] = None,
         feature_service_id: Optional[str] = None,
         workspace_name: Optional[str] = None,
+        timeout_budget: Union[None, float, Deadline] = None,
     ) -> GetFeatureServiceMetadataResponse:
+        """Retrieve the metadata of a feature service and remember it in the metadata registry.
+
+        If the timeout_budget runs out, the metadata already in the registry is returned if there is any.
+        """
+        timings = self._start_timings("get_feature_service_metadata", feature_service_name or feature_service_id)
+        deadline = Deadline.from_budget(timeout_budget)
         validate_request_args(feature_service_id, feature_service_name, workspace_name, self.default_workspace_name)
         if not workspace_name:
             workspace_name = self.default_workspace_name
@@ -101,10 +887,89 @@ class AsyncTectonClient:
             feature_service_name=feature_service_name,
             workspace_name=workspace_name,
         )
-        resp = self._client.post(url=self._paths["get_feature_service_metadata"], json=request_data)
+        registry_key = (workspace_name, feature_service_name, feature_service_id)
+        if timings is not None:
+            timings.build_seconds = time.perf_counter() - timings.started_at
         try:
-            resp.raise_for_status()
-        except HTTPStatusError as exc:
-            raise convert_exception(exc) from exc
+            metadata = await wait_with_deadline(
+                self._post_and_parse(
+                    "get_feature_service_metadata",
+                    request_data,
+                    GetFeatureServiceMetadataResponse.from_response,
+                    deadline,
+                    timings=timings,
+                ),
+                deadline,
+            )
+        except DeadlineExceededError:
+            metadata = self.metadata_registry.get(registry_key)
+            if metadata is None:
+                raise
+            return metadata
+        self.metadata_registry.put(registry_key, metadata)
+        return metadata
+
+    async def warm_up(self, connections: int = 1) -> int:
+        """Open connections to the feature server ahead of the first requests, e.g. at startup, so that they don't
+        pay for the TCP and TLS handshakes. Returns the number of connections opened.
+
+        Sends connections concurrent requests to every endpoint, so that each opens a connection of its own which is
+        then kept in the pool, up to ConnectionOptions.max_keepalive_connections and for keepalive_expiry_seconds. With
+        HTTP/2 a single connection per endpoint carries all requests. The requests are HEAD requests to the base url
+        of each endpoint, e.g. https://explore.tecton.ai/, whose response status is ignored; transports which open no
+        connections, e.g. mock transports, report 0.
+        """
+        if connections < 1:
+            msg = "connections must be at least 1"
+            raise ValueError(msg)
+        if self._load_balancer is not None:
+            targets = [(e.client, get_warm_up_url(e.url)) for e in self._load_balancer.endpoints]
+        else:
+            targets = [(self._client, get_warm_up_url(self._paths["get_features"]))]
+        return await aopen_connections(targets, connections)
+
+    async def warm_up_metadata(
+        self, feature_service_names: Sequence[str], workspace_name: Optional[str] = None
+    ) -> None:
+        """Retrieve and remember the metadata of feature services, e.g. at startup.
+
+        get_features requests for these feature services without explicit metadata_options then take the feature
+        names and data types from the client instead of the feature server.
+        """
+        await asyncio.gather(
+            *(
+                self.get_feature_service_metadata(feature_service_name=name, workspace_name=workspace_name)
+                for name in feature_service_names
+            )
+        )
+
+    async def refresh_metadata(self) -> None:
+        """Re-retrieve the metadata of every feature service in the metadata registry"""
+        for workspace_name, feature_service_name, feature_service_id in self.metadata_registry.keys():
+            try:
+                await self.get_feature_service_metadata(
+                    feature_service_name=feature_service_name,
+                    feature_service_id=feature_service_id,
+                    workspace_name=workspace_name,
+                )
+            except (TectonHttpException, httpx.HTTPError):
+                # keep serving the metadata we already have until the next refresh
+                logger.warning(
+                    "Failed to refresh metadata for feature service %s", feature_service_name or feature_service_id
+                )
+
+    def start_metadata_refresh(self, interval_seconds: float = DEFAULT_METADATA_REFRESH_INTERVAL_SECONDS) -> None:
+        """Refresh the metadata registry every interval_seconds in a background task of the running event loop"""
+        self.stop_metadata_refresh()
+
+        async def refresh_loop():
+            while True:
+                await asyncio.sleep(interval_seconds)
+                await self.refresh_metadata()
+
+        self._metadata_refresh_task = asyncio.get_running_loop().create_task(refresh_loop())
 
-        return GetFeatureServiceMetadataResponse.from_response(resp.json())
+    def stop_metadata_refresh(self) -> None:
+        if self._metadata_refresh_task is not None:
+            self._metadata_refresh_task.cancel()
+            self._metadata_refresh_task = None
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, Optional, Tuple
+
+from tecton_client._internal.data_types import GetFeaturesResponse
+
+DEFAULT_CACHE_MAX_SIZE = 10_000
+DEFAULT_CACHE_TTL_SECONDS = 60.0
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    size: int = 0
+
+
+class FeatureCache:
+    """An in-process LRU cache of GetFeaturesResponses, used by the clients in front of get_features.
+
+    Entries are keyed on the workspace, feature service and a canonical hash of the join keys, request context and
+    metadata options of the request. The cache is safe to share between threads and between clients.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_CACHE_MAX_SIZE,
+        default_ttl_seconds: float = DEFAULT_CACHE_TTL_SECONDS,
+        ttl_seconds_by_feature_service: Optional[Dict[str, float]] = None,
+    ):
+        """Constructor for the cache
+
+        Args:
+            max_size: The maximum number of responses to keep. The least recently used response is evicted first.
+            default_ttl_seconds: How long a response is served from the cache after it was retrieved.
+            ttl_seconds_by_feature_service: Overrides of default_ttl_seconds, keyed by feature service name or id.
+                A ttl of 0 disables caching for that feature service.
+        """
+        if max_size < 1:
+            msg = "max_size must be at least 1"
+            raise ValueError(msg)
+        self.max_size = max_size
+        self.default_ttl_seconds = default_ttl_seconds
+        self.ttl_seconds_by_feature_service = dict(ttl_seconds_by_feature_service or {})
+        # key -> (expiry time, response), ordered from least to most recently used
+        self._entries: "OrderedDict[Hashable, Tuple[float, GetFeaturesResponse]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    def get_ttl_seconds(self, feature_service: str) -> float:
+        return self.ttl_seconds_by_feature_service.get(feature_service, self.default_ttl_seconds)
+
+    def get(self, key: Hashable) -> Optional[GetFeaturesResponse]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            expires_at, response = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._stats.expirations += 1
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return response
+
+    def put(self, key: Hashable, response: GetFeaturesResponse, feature_service: str) -> None:
+        ttl_seconds = self.get_ttl_seconds(feature_service)
+        if ttl_seconds <= 0:
+            return
+        expires_at = time.monotonic() + ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self) -> CacheStats:
+        """A snapshot of the hit, miss and eviction counters"""
+        with self._lock:
+            return CacheStats(
+                hits=self._stats.hits,
+                misses=self._stats.misses,
+                evictions=self._stats.evictions,
+                expirations=self._stats.expirations,
+                size=len(self._entries),
+            )
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,118 @@
+import json
+from typing import Any, Callable, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+class LazyJson:
+    """A json value which is decoded on first access of value"""
+
+    __slots__ = ("_data", "_decode", "_value")
+
+    def __init__(self, data: bytes, decode: Callable[[bytes], Any]):
+        self._data = data
+        self._decode = decode
+        self._value = _UNDECODED
+
+    @property
+    def value(self) -> Any:
+        if self._value is _UNDECODED:
+            self._value = self._decode(self._data)
+            self._data = None
+        return self._value
+
+
+_UNDECODED = object()
+
+
+class JsonCodec:
+    """Encodes request bodies to json bytes and decodes json response bodies, using the json module of the stdlib.
+
+    Subclass this to plug in another json library.
+    """
+
+    name = "json"
+
+    def encode(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf8")
+
+    def decode(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+    def decode_features_response(self, data: bytes) -> Any:
+        """Decode a get-features or get-features-batch response body. Codecs which can skip over json values without
+        decoding them may return the metadata as a LazyJson."""
+        return self.decode(data)
+
+
+class OrjsonCodec(JsonCodec):
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            msg = "orjson is not installed. Install it with `pip install tecton-client[fast-json]`"
+            raise ImportError(msg)
+        self.encode = orjson.dumps
+        self.decode = self.decode_features_response = orjson.loads
+
+
+class MsgspecCodec(JsonCodec):
+    name = "msgspec"
+
+    def __init__(self):
+        if msgspec is None:
+            msg = "msgspec is not installed. Install it with `pip install tecton-client[fast-json]`"
+            raise ImportError(msg)
+        self.encode = msgspec.json.Encoder().encode
+        self.decode = msgspec.json.Decoder().decode
+        self._decode_features_response = msgspec.json.Decoder(_FeaturesResponseBody).decode
+
+    def decode_features_response(self, data: bytes) -> Any:
+        # the metadata is kept as raw json, most callers never read it
+        body = self._decode_features_response(data)
+        metadata = LazyJson(body.metadata, self.decode) if body.metadata else None
+        return {"result": body.result, "metadata": metadata}
+
+
+if msgspec is not None:
+
+    class _FeaturesResponseBody(msgspec.Struct):
+        result: Any
+        metadata: msgspec.Raw = msgspec.Raw()
+
+
+_CODECS = {
+    JsonCodec.name: JsonCodec,
+    OrjsonCodec.name: OrjsonCodec,
+    MsgspecCodec.name: MsgspecCodec,
+}
+
+
+def get_codec(codec: Union[str, JsonCodec] = "auto") -> JsonCodec:
+    """Resolve the codec setting of a client.
+
+    Args:
+        codec: A JsonCodec instance, the name of one of the built-in codecs ("json", "orjson" or "msgspec"), or
+            "auto" to use the fastest installed library: msgspec, then orjson, then the stdlib. msgspec comes first
+            as it is the only one which skips over the metadata of get-features responses, decoding it lazily.
+    """
+    if isinstance(codec, JsonCodec):
+        return codec
+    if codec == "auto":
+        if msgspec is not None:
+            return MsgspecCodec()
+        if orjson is not None:
+            return OrjsonCodec()
+        return JsonCodec()
+    if codec not in _CODECS:
+        msg = f"unknown codec {codec}, must be one of auto, {', '.join(_CODECS)} or a JsonCodec"
+        raise ValueError(msg)
+    return _CODECS[codec]()
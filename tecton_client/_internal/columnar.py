@@ -0,0 +1,159 @@
+from itertools import chain
+from typing import Dict, List, Optional, Sequence, Union
+
+from tecton_client._internal.data_types import (
+    GetFeatureServiceMetadataResponse,
+    GetFeaturesResponse,
+    decode_feature_value,
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_SCALAR_TYPES = ("int64", "float64", "float32", "boolean", "string")
+_NUMERIC_TYPES = ("int64", "float64", "float32", "boolean")
+
+
+def _require_numpy():
+    if np is None:
+        msg = "numpy is required for columnar decoding. Install it with `pip install tecton-client[numpy]`"
+        raise ImportError(msg)
+
+
+def _numpy_dtype(type_name: str):
+    return {
+        "int64": np.int64,
+        "float64": np.float64,
+        "float32": np.float32,
+        "boolean": np.bool_,
+        "string": object,
+    }[type_name]
+
+
+def _get_features_metadata(
+    responses: Sequence[Optional[GetFeaturesResponse]],
+    metadata: Optional[Union[dict, GetFeatureServiceMetadataResponse]],
+) -> List[dict]:
+    if isinstance(metadata, GetFeatureServiceMetadataResponse):
+        metadata = metadata.to_features_metadata()
+    if metadata is None:
+        metadata = next((r.metadata for r in responses if r is not None and r.metadata), None)
+    features_metadata = (metadata or {}).get("features")
+    if not features_metadata or "name" not in features_metadata[0]:
+        msg = (
+            "feature names are not available. Pass the feature service metadata, request the features with "
+            "MetadataOptions(include_names=True, include_data_types=True) or warm up the client's metadata registry"
+        )
+        raise ValueError(msg)
+    return features_metadata
+
+
+def _object_array(values) -> "np.ndarray":
+    # np.array would try to build a multi-dimensional array out of array-valued features
+    return np.fromiter(values, dtype=object, count=len(values))
+
+
+def _decode_scalars(values: "np.ndarray", type_name: str) -> "np.ma.MaskedArray":
+    mask = np.equal(values, None)
+    if type_name == "string":
+        return np.ma.MaskedArray(values, mask=mask)
+    # int64 values are encoded as strings by the feature server, astype parses them in a single pass
+    filled = np.where(mask, 0, values) if mask.any() else values
+    return np.ma.MaskedArray(filled.astype(_numpy_dtype(type_name)), mask=mask)
+
+
+def _decode_arrays(values: "np.ndarray", element_type: str) -> "np.ma.MaskedArray":
+    # pads the arrays of every row to the length of the longest one, masking the padding and null elements
+    num_rows = len(values)
+    lengths = np.fromiter((0 if v is None else len(v) for v in values), dtype=np.int64, count=num_rows)
+    max_length = int(lengths.max()) if num_rows else 0
+    flat = _object_array(list(chain.from_iterable(v for v in values if v)))
+    decoded = _decode_scalars(flat, element_type)
+
+    rows = np.repeat(np.arange(num_rows), lengths)
+    offsets = np.cumsum(lengths) - lengths
+    columns = np.arange(len(flat)) - np.repeat(offsets, lengths)
+
+    data = np.zeros((num_rows, max_length), dtype=decoded.dtype)
+    mask = np.ones((num_rows, max_length), dtype=bool)
+    data[rows, columns] = decoded.data
+    mask[rows, columns] = np.ma.getmaskarray(decoded)
+    return np.ma.MaskedArray(data, mask=mask)
+
+
+def features_to_numpy(
+    responses: Union[GetFeaturesResponse, Sequence[Optional[GetFeaturesResponse]]],
+    metadata: Optional[Union[dict, GetFeatureServiceMetadataResponse]] = None,
+) -> Dict[str, "np.ma.MaskedArray"]:
+    """Decode the feature values of one or many responses into one masked numpy array per feature.
+
+    Each array has one row per response. Null values, and the rows of responses which are None (e.g. failed rows of a
+    batch request with allow_partial_results), are masked. int64 features are parsed into int64 arrays. Array features
+    of scalars become 2-d arrays padded to the longest array, with the padding masked. Other feature types are kept as
+    object arrays of decoded python values.
+
+    Args:
+        responses: A GetFeaturesResponse or a sequence of them for the same feature service.
+        metadata: The feature names and data types, as GetFeaturesResponse.metadata or a
+            GetFeatureServiceMetadataResponse. Defaults to the metadata of the responses.
+    """
+    _require_numpy()
+    if isinstance(responses, GetFeaturesResponse):
+        responses = [responses]
+    features_metadata = _get_features_metadata(responses, metadata)
+    num_features = len(features_metadata)
+
+    missing_row = [None] * num_features
+    rows = [missing_row if r is None else r.result.features for r in responses]
+    columns = zip(*rows) if rows else [()] * num_features
+
+    decoded = {}
+    for feature, column in zip(features_metadata, columns):
+        values = _object_array(column)
+        data_type = feature.get("dataType") or {}
+        type_name = data_type.get("type")
+        element_type = (data_type.get("elementType") or {}).get("type")
+        if type_name in _SCALAR_TYPES:
+            decoded[feature["name"]] = _decode_scalars(values, type_name)
+        elif type_name == "array" and element_type in _SCALAR_TYPES:
+            decoded[feature["name"]] = _decode_arrays(values, element_type)
+        else:
+            objects = _object_array([decode_feature_value(v, data_type) for v in values])
+            decoded[feature["name"]] = np.ma.MaskedArray(objects, mask=np.equal(objects, None))
+    return decoded
+
+
+def features_to_matrix(
+    responses: Union[GetFeaturesResponse, Sequence[Optional[GetFeaturesResponse]]],
+    metadata: Optional[Union[dict, GetFeatureServiceMetadataResponse]] = None,
+    dtype=None,
+) -> "np.ndarray":
+    """Decode the feature values of one or many responses into a 2-d float matrix, e.g. as input for a model.
+
+    The matrix has one row per response and one column per feature, in the order of the feature service. Nulls are
+    NaN. Only int64, float and boolean features are supported.
+
+    Args:
+        responses: A GetFeaturesResponse or a sequence of them for the same feature service.
+        metadata: The feature names and data types, as GetFeaturesResponse.metadata or a
+            GetFeatureServiceMetadataResponse. Defaults to the metadata of the responses.
+        dtype: The float dtype of the matrix. Defaults to float64.
+    """
+    _require_numpy()
+    if isinstance(responses, GetFeaturesResponse):
+        responses = [responses]
+    features_metadata = _get_features_metadata(responses, metadata)
+    for feature in features_metadata:
+        type_name = (feature.get("dataType") or {}).get("type")
+        if type_name not in _NUMERIC_TYPES:
+            msg = f"feature {feature['name']} of type {type_name} cannot be converted to a float matrix"
+            raise ValueError(msg)
+
+    dtype = dtype or np.float64
+    columns = features_to_numpy(responses, {"features": features_metadata})
+    matrix = np.empty((len(responses), len(features_metadata)), dtype=dtype)
+    for i, column in enumerate(columns.values()):
+        matrix[:, i] = column.astype(dtype).filled(np.nan)
+    return matrix
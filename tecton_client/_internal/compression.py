@@ -0,0 +1,154 @@
+import gzip
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+import httpx
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+REQUEST_ENCODINGS = ("gzip", "zstd")
+RESPONSE_ENCODINGS = ("gzip", "deflate", "zstd", "identity")
+
+
+def _require_zstandard():
+    if zstandard is None:
+        msg = "zstd compression requires the zstandard package. Install it with `pip install tecton-client[zstd]`"
+        raise ImportError(msg)
+
+
+class CompressionOptions:
+    def __init__(
+        self,
+        request_encoding: Optional[str] = "gzip",
+        request_threshold_bytes: int = 16384,
+        level: Optional[int] = None,
+        accept_encodings: Sequence[str] = ("gzip",),
+    ):
+        """How a client compresses request bodies and which response encodings it asks the feature server for.
+
+        Responses are decompressed in one pass over the whole compressed body, without the intermediate chunks of
+        streaming decompression, so that a large response is only held once in its decoded form. See
+        compression_stats for the bytes on the wire and decoded.
+
+        Args:
+            request_encoding: "gzip" (default), "zstd" or None to never compress request bodies. zstd requires the
+                zstandard package: `pip install tecton-client[zstd]`.
+            request_threshold_bytes: The size of the json encoded request above which it is compressed. Small
+                bodies fit in a single packet either way and are cheaper to send as they are.
+            level: The compression level of request bodies. Defaults to 6 for gzip and 3 for zstd.
+            accept_encodings: The response encodings accepted from the feature server, in order of preference, out of
+                "gzip", "deflate", "zstd" and "identity". An empty sequence asks for uncompressed responses.
+        """
+        if request_encoding is not None and request_encoding not in REQUEST_ENCODINGS:
+            msg = f"unknown request_encoding {request_encoding}, must be one of {', '.join(REQUEST_ENCODINGS)}"
+            raise ValueError(msg)
+        unknown = [encoding for encoding in accept_encodings if encoding not in RESPONSE_ENCODINGS]
+        if unknown:
+            msg = f"unknown accept_encodings {', '.join(unknown)}, must be out of {', '.join(RESPONSE_ENCODINGS)}"
+            raise ValueError(msg)
+        if request_encoding == "zstd" or "zstd" in accept_encodings:
+            _require_zstandard()
+        self.request_encoding = request_encoding
+        self.request_threshold_bytes = request_threshold_bytes
+        self.level = level
+        self.accept_encodings = tuple(accept_encodings)
+
+
+@dataclass
+class CompressionStats:
+    """The bytes sent and received by a client with CompressionOptions, as encoded json and on the wire"""
+
+    requests: int = 0
+    compressed_requests: int = 0
+    request_bytes: int = 0
+    request_wire_bytes: int = 0
+    response_bytes: int = 0
+    response_wire_bytes: int = 0
+
+
+def _decompress(body: bytes, encoding: str) -> bytes:
+    if encoding == "zstd" and zstandard is not None:
+        try:
+            # a decompressobj also handles frames which don't record their decompressed size
+            return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+        except zstandard.ZstdError as exc:
+            msg = f"failed to decode the zstd encoded response: {exc}"
+            raise httpx.DecodingError(msg) from exc
+    if encoding not in ("gzip", "deflate"):
+        msg = f"unsupported response encoding {encoding}"
+        raise httpx.DecodingError(msg)
+    try:
+        if encoding == "gzip":
+            return zlib.decompress(body, wbits=zlib.MAX_WBITS | 16)
+        # servers send deflate both with and without the zlib header
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            return zlib.decompress(body, wbits=-zlib.MAX_WBITS)
+    except zlib.error as exc:
+        msg = f"failed to decode the {encoding} encoded response: {exc}"
+        raise httpx.DecodingError(msg) from exc
+
+
+class Compression:
+    """Applies the CompressionOptions of a client to its requests and responses and counts their bytes"""
+
+    def __init__(self, options: CompressionOptions):
+        self.options = options
+        self.accept_encoding = ", ".join(options.accept_encodings) if options.accept_encodings else "identity"
+        self._stats = CompressionStats()
+        self._lock = threading.Lock()
+
+    def encode_request(self, content: bytes) -> Tuple[bytes, Dict[str, str]]:
+        """The body and headers of a request with the given json encoded content"""
+        options = self.options
+        headers = {"Accept-Encoding": self.accept_encoding}
+        body = content
+        if options.request_encoding is not None and len(content) > options.request_threshold_bytes:
+            if options.request_encoding == "gzip":
+                body = gzip.compress(content, compresslevel=6 if options.level is None else options.level, mtime=0)
+            else:
+                body = zstandard.ZstdCompressor(level=3 if options.level is None else options.level).compress(content)
+            headers["Content-Encoding"] = options.request_encoding
+        with self._lock:
+            self._stats.requests += 1
+            if body is not content:
+                self._stats.compressed_requests += 1
+            self._stats.request_bytes += len(content)
+            self._stats.request_wire_bytes += len(body)
+        return body, headers
+
+    def decode_response(self, resp: httpx.Response, body: Optional[bytes]) -> httpx.Response:
+        """The response with the raw body received for resp decompressed, or resp itself if its body was already
+        read and decoded, i.e. body is None"""
+        if body is None:
+            content = resp.content
+        else:
+            encodings = [e.strip() for e in resp.headers.get("Content-Encoding", "").split(",") if e.strip()]
+            content = body
+            # the encodings are listed in the order they were applied
+            for encoding in reversed(encodings):
+                if encoding != "identity":
+                    content = _decompress(content, encoding)
+        with self._lock:
+            self._stats.response_bytes += len(content)
+            self._stats.response_wire_bytes += resp.num_bytes_downloaded
+        if body is None:
+            return resp
+        # the new response holds the decompressed body, whose length and encoding the original headers don't describe
+        headers = [
+            (name, value)
+            for name, value in resp.headers.multi_items()
+            if name not in ("content-encoding", "content-length")
+        ]
+        return httpx.Response(resp.status_code, headers=headers, content=content, request=resp.request)
+
+    @property
+    def stats(self) -> CompressionStats:
+        with self._lock:
+            return CompressionStats(**vars(self._stats))
@@ -0,0 +1,114 @@
+import math
+import threading
+import time
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+# the weight of the newest latency in the moving average compared against the baseline
+_LATENCY_SMOOTHING = 0.2
+
+
+class AdaptiveConcurrency:
+    def __init__(
+        self,
+        initial_limit: int = 20,
+        min_limit: int = 1,
+        max_limit: int = 1000,
+        backoff_ratio: float = 0.8,
+        latency_tolerance: float = 2.0,
+        window_size: int = 500,
+    ):
+        """Options for a concurrency limit which adapts to the capacity of the feature server (AIMD).
+
+        The limit grows by one for each limit's worth of successful requests while latency stays flat, and is
+        multiplied by backoff_ratio when the feature server answers with a 429, 503 or 504, when a request times out,
+        or when latency rises.
+
+        Args:
+            initial_limit: The limit before any requests have completed.
+            min_limit: The lower bound of the limit.
+            max_limit: The upper bound of the limit.
+            backoff_ratio: The factor the limit is multiplied with when the feature server is overloaded.
+            latency_tolerance: How many times the baseline latency, the lowest of the last window_size requests, the
+                average latency may rise to before the limit is cut.
+            window_size: The number of recent requests the baseline latency is taken from.
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            msg = "the limits must satisfy 1 <= min_limit <= initial_limit <= max_limit"
+            raise ValueError(msg)
+        if not 0 < backoff_ratio < 1:
+            msg = "backoff_ratio must be between 0 and 1"
+            raise ValueError(msg)
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.window_size = window_size
+
+
+class FixedConcurrencyLimit:
+    """A concurrency limit which ignores how requests went"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+
+    def on_success(self, sent_at: float, latency_seconds: float, in_flight: int) -> None:
+        pass
+
+    def on_overload(self, sent_at: float) -> None:
+        pass
+
+
+class AimdConcurrencyLimit:
+    """A concurrency limit with additive increase and multiplicative decrease, configured by AdaptiveConcurrency"""
+
+    def __init__(self, options: AdaptiveConcurrency):
+        self.options = options
+        self._limit = float(options.initial_limit)
+        # the sliding window minimum of the latencies: (sample number, latency) with increasing latencies
+        self._window: Deque[Tuple[int, float]] = deque()
+        self._samples = 0
+        self._average_latency: Optional[float] = None
+        self._last_decrease = -math.inf
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def _record_latency(self, latency_seconds: float) -> float:
+        """Add a latency sample and return the baseline latency"""
+        self._samples += 1
+        while self._window and self._window[-1][1] >= latency_seconds:
+            self._window.pop()
+        self._window.append((self._samples, latency_seconds))
+        if self._window[0][0] <= self._samples - self.options.window_size:
+            self._window.popleft()
+        if self._average_latency is None:
+            self._average_latency = latency_seconds
+        else:
+            self._average_latency += _LATENCY_SMOOTHING * (latency_seconds - self._average_latency)
+        return self._window[0][1]
+
+    def _decrease(self, sent_at: float) -> None:
+        # requests sent before the last decrease were sent at the old limit, so they don't cut it again
+        if sent_at < self._last_decrease:
+            return
+        self._last_decrease = time.monotonic()
+        self._limit = max(self.options.min_limit, self._limit * self.options.backoff_ratio)
+
+    def on_success(self, sent_at: float, latency_seconds: float, in_flight: int) -> None:
+        """Update the limit after a request sent at sent_at succeeded, with in_flight requests still in flight"""
+        with self._lock:
+            baseline = self._record_latency(latency_seconds)
+            if self._average_latency > self.options.latency_tolerance * baseline:
+                self._decrease(sent_at)
+            elif in_flight + 1 >= self._limit / 2:
+                # only grow while the limit is being used, so that it doesn't run away while traffic is low
+                self._limit = min(self.options.max_limit, self._limit + 1 / self._limit)
+
+    def on_overload(self, sent_at: float) -> None:
+        """Update the limit after the feature server was overloaded by a request sent at sent_at"""
+        with self._lock:
+            self._decrease(sent_at)
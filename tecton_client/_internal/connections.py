@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, TypeVar
+from urllib.parse import urljoin
+
+import httpx
+
+from tecton_client._internal.load_balancer import LoadBalancer
+
+logger = logging.getLogger(__name__)
+
+C = TypeVar("C", httpx.Client, httpx.AsyncClient)
+
+# how long a warm-up request holds its connection waiting for the others to get theirs
+WARM_UP_WAIT_SECONDS = 10.0
+
+
+class ConnectionOptions:
+    def __init__(
+        self,
+        http2: bool = False,
+        max_connections: Optional[int] = 100,
+        max_keepalive_connections: Optional[int] = 20,
+        keepalive_expiry_seconds: Optional[float] = 5.0,
+        timeout_seconds: Optional[float] = 5.0,
+        warm_up_connections_after_fork: int = 0,
+    ):
+        """Options for the connection pools of a client which builds its own httpx client.
+
+        Args:
+            http2: Whether to use HTTP/2, which multiplexes concurrent requests over a single connection per
+                endpoint. Requires the h2 package: `pip install tecton-client[http2]`.
+            max_connections: The maximum number of connections per pool, None for no limit. Requests beyond it wait
+                for a connection to be released.
+            max_keepalive_connections: The maximum number of idle connections kept open per pool.
+            keepalive_expiry_seconds: How long idle connections are kept open. Raise it above the interval between
+                requests for connections opened by warm_up to survive until they are used.
+            timeout_seconds: The default connect, read, write and pool timeout of requests.
+            warm_up_connections_after_fork: The number of connections per endpoint a TectonClient opens in the
+                background, as warm_up does, in each process forked from the one it was created in, e.g. the workers
+                of a pre-fork server. An AsyncTectonClient has no event loop to do so at fork time; await its
+                warm_up when the worker starts instead.
+        """
+        self.http2 = http2
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry_seconds = keepalive_expiry_seconds
+        self.timeout_seconds = timeout_seconds
+        self.warm_up_connections_after_fork = warm_up_connections_after_fork
+
+
+def build_http_client(
+    client_class: Type[C], headers: Dict[str, str], options: Optional[ConnectionOptions]
+) -> Callable[[], C]:
+    """A factory of the httpx clients of a client which was not given one"""
+    if options is None:
+        return lambda: client_class(headers=headers)
+    if options.http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            msg = "http2 requires the h2 package. Install it with `pip install tecton-client[http2]`"
+            raise ImportError(msg) from None
+    limits = httpx.Limits(
+        max_connections=options.max_connections,
+        max_keepalive_connections=options.max_keepalive_connections,
+        keepalive_expiry=options.keepalive_expiry_seconds,
+    )
+    return lambda: client_class(
+        headers=headers, http2=options.http2, limits=limits, timeout=httpx.Timeout(options.timeout_seconds)
+    )
+
+
+def rebuild_http_clients(new_http_client: Callable[[], C], load_balancer: Optional[LoadBalancer[C]]) -> C:
+    """Give every endpoint of load_balancer a new httpx client, and return the one of the first endpoint, or a new
+    client for a client without a load balancer"""
+    if load_balancer is None:
+        return new_http_client()
+    for endpoint in load_balancer.endpoints:
+        endpoint.client = new_http_client()
+    return load_balancer.endpoints[0].client
+
+
+def get_http_clients(client: C, load_balancer: Optional[LoadBalancer[C]]) -> List[C]:
+    if load_balancer is None:
+        return [client]
+    # the endpoints share a client passed to the constructor of a client
+    return list({id(endpoint.client): endpoint.client for endpoint in load_balancer.endpoints}.values())
+
+
+# the clients which reset their state in forked processes, until they are closed or garbage collected
+_fork_safe_clients: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+
+def register_after_fork(client: Any) -> None:
+    """Have client._after_fork() called in every process forked from the current one.
+
+    The pooled connections of a client are sockets which a forked process shares with its parent, and its background
+    threads don't exist in the forked process.
+    """
+    _fork_safe_clients.add(client)
+
+
+def unregister_after_fork(client: Any) -> None:
+    _fork_safe_clients.discard(client)
+
+
+def _after_fork_in_child() -> None:
+    for client in list(_fork_safe_clients):
+        try:
+            client._after_fork()
+        except Exception:
+            logger.exception("Failed to reset a %s after fork", client.__class__.__name__)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+class ConnectionCounter:
+    """Counts the connections opened by the requests it traces"""
+
+    def __init__(self):
+        self.opened = 0
+        self._lock = threading.Lock()
+
+    def trace(self, event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.opened += 1
+
+    async def atrace(self, event_name: str, info: dict) -> None:
+        self.trace(event_name, info)
+
+
+def get_warm_up_url(url: str) -> str:
+    """The url warm-up requests are sent to for a url of a Tecton cluster: the root of the cluster"""
+    return urljoin(url, "/")
+
+
+def open_connections(targets: List[Tuple[httpx.Client, str]], connections: int) -> int:
+    """Open connections to every (client, url) target with HEAD requests and return the number of connections opened.
+
+    A HEAD request has no body and its response is empty, so the server does no work for it whatever its status.
+    """
+    requests = [target for target in targets for _ in range(connections)]
+    counter = ConnectionCounter()
+    all_open = threading.Barrier(len(requests))
+
+    def open_connection(http_client: httpx.Client, url: str) -> None:
+        try:
+            with http_client.stream("HEAD", url, extensions={"trace": counter.trace}) as resp:
+                # each request holds on to its connection until all of them have one, so that none reuses another's
+                try:
+                    all_open.wait(WARM_UP_WAIT_SECONDS)
+                except threading.BrokenBarrierError:
+                    pass
+                # connections are only returned to the pool once the response was read
+                resp.read()
+        except httpx.HTTPError as exc:
+            all_open.abort()
+            logger.warning("Failed to open a connection to %s: %s", url, exc)
+
+    with ThreadPoolExecutor(max_workers=len(requests)) as executor:
+        for http_client, url in requests:
+            executor.submit(open_connection, http_client, url)
+    return counter.opened
+
+
+async def aopen_connections(targets: List[Tuple[httpx.AsyncClient, str]], connections: int) -> int:
+    """Open connections to every (client, url) target with HEAD requests and return the number of connections opened"""
+    requests = [target for target in targets for _ in range(connections)]
+    counter = ConnectionCounter()
+    all_open = asyncio.Event()
+    waiting = len(requests)
+
+    def arrived() -> None:
+        nonlocal waiting
+        waiting -= 1
+        if not waiting:
+            all_open.set()
+
+    async def open_connection(http_client: httpx.AsyncClient, url: str) -> None:
+        opened = False
+        try:
+            async with http_client.stream("HEAD", url, extensions={"trace": counter.atrace}) as resp:
+                # each request holds on to its connection until all of them have one, so that none reuses another's
+                opened = True
+                arrived()
+                try:
+                    await asyncio.wait_for(all_open.wait(), WARM_UP_WAIT_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                # connections are only returned to the pool once the response was read
+                await resp.aread()
+        except httpx.HTTPError as exc:
+            if not opened:
+                arrived()
+            logger.warning("Failed to open a connection to %s: %s", url, exc)
+
+    await asyncio.gather(*(open_connection(http_client, url) for http_client, url in requests))
+    return counter.opened
@@ -1,39 +1,204 @@
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
+
+from tecton_client._internal.codec import LazyJson
+
+
+def decode_feature_value(value: Any, data_type: Optional[dict]) -> Any:
+    """Decode a json feature value into its python type, e.g. int64 values which are encoded as strings"""
+    if value is None or not data_type:
+        return value
+    type_name = data_type.get("type")
+    if type_name == "int64":
+        return int(value)
+    if type_name == "array":
+        element_type = data_type.get("elementType")
+        return [decode_feature_value(element, element_type) for element in value]
+    if type_name == "map":
+        key_type, value_type = data_type.get("keyType"), data_type.get("valueType")
+        return {decode_feature_value(k, key_type): decode_feature_value(v, value_type) for k, v in value.items()}
+    if type_name == "struct":
+        fields = data_type.get("fields") or []
+        return {field["name"]: decode_feature_value(v, field.get("dataType")) for field, v in zip(fields, value)}
+    return value
 
 
-@dataclass
 class GetFeaturesResult:
-    features: list
+    __slots__ = ("features",)
+
+    def __init__(self, features: list):
+        self.features = features
+
+    def __repr__(self) -> str:
+        return f"GetFeaturesResult(features={self.features!r})"
+
+    def __eq__(self, other) -> bool:
+        return other.__class__ is GetFeaturesResult and self.features == other.features
 
 
-@dataclass
 class GetFeaturesResponse:
-    result: GetFeaturesResult
-    metadata: Optional[Dict] = None
+    """The features of one get_features call, and their metadata if it was requested.
+
+    The metadata is decoded on first access when the codec can skip over it, which only msgspec can (`pip install
+    tecton-client[fast-json]`). is_stale is set on responses served from a StaleFallbackStore while the feature server
+    was failing.
+    """
+
+    __slots__ = ("result", "_metadata", "is_stale")
+
+    def __init__(self, result: GetFeaturesResult, metadata: Optional[Dict] = None, is_stale: bool = False):
+        self.result = result
+        self._metadata = metadata
+        self.is_stale = is_stale
+
+    @property
+    def metadata(self) -> Optional[Dict]:
+        metadata = self._metadata
+        if metadata.__class__ is LazyJson:
+            metadata = self._metadata = metadata.value
+        return metadata
+
+    @metadata.setter
+    def metadata(self, metadata: Optional[Dict]) -> None:
+        self._metadata = metadata
+
+    def __repr__(self) -> str:
+        stale = ", is_stale=True" if self.is_stale else ""
+        return f"GetFeaturesResponse(result={self.result!r}, metadata={self.metadata!r}{stale})"
+
+    def __eq__(self, other) -> bool:
+        return (
+            other.__class__ is GetFeaturesResponse
+            and self.result == other.result
+            and self.metadata == other.metadata
+            and self.is_stale == other.is_stale
+        )
+
+    def __reduce__(self):
+        return GetFeaturesResponse, (self.result, self.metadata, self.is_stale)
 
     @classmethod
     def from_response(cls, resp: dict) -> "GetFeaturesResponse":
-        return GetFeaturesResponse(result=GetFeaturesResult(**resp["result"]), metadata=resp.get("metadata"))
+        return GetFeaturesResponse(GetFeaturesResult(resp["result"]["features"]), resp.get("metadata"))
+
+    @classmethod
+    def from_batch_response(cls, resp: dict) -> List["GetFeaturesResponse"]:
+        """Split the json response of the get-features-batch api into one GetFeaturesResponse per request row"""
+        # the rows share the metadata, which is decoded at most once
+        metadata = resp.get("metadata")
+        return [GetFeaturesResponse(GetFeaturesResult(result["features"]), metadata) for result in resp["result"]]
+
+    @classmethod
+    def from_bare_response(cls, resp: dict) -> "GetFeaturesResponse":
+        """Like from_response, but drops any metadata the feature server sent, for clients with bare_responses"""
+        return GetFeaturesResponse(GetFeaturesResult(resp["result"]["features"]))
+
+    @classmethod
+    def from_bare_batch_response(cls, resp: dict) -> List["GetFeaturesResponse"]:
+        """Like from_batch_response, but drops any metadata the feature server sent, for clients with bare_responses"""
+        return [GetFeaturesResponse(GetFeaturesResult(result["features"])) for result in resp["result"]]
+
+    @classmethod
+    def get_parser(cls, metadata_options: Optional["MetadataOptions"], batch: bool = False):
+        """The parser of the responses to requests with metadata_options, which are BARE_METADATA_OPTIONS exactly for
+        the requests of clients with bare_responses"""
+        if metadata_options is BARE_METADATA_OPTIONS:
+            return cls.from_bare_batch_response if batch else cls.from_bare_response
+        return cls.from_batch_response if batch else cls.from_response
+
+    def get_features_dict(self) -> Dict[str, Any]:
+        """The feature values keyed by feature name and decoded to their python types.
+
+        Requires the feature names in the response metadata, either from MetadataOptions(include_names=True) or from
+        metadata that was pre-warmed on the client.
+        """
+        features_metadata = (self.metadata or {}).get("features")
+        if not features_metadata or "name" not in features_metadata[0]:
+            msg = "feature names are not available in the response metadata"
+            raise ValueError(msg)
+        return {
+            feature["name"]: decode_feature_value(value, feature.get("dataType"))
+            for feature, value in zip(features_metadata, self.result.features)
+        }
 
 
 @dataclass
+class GetFeaturesRequestData:
+    """The join keys and request context for a single row of a batch request"""
+
+    join_key_map: Optional[Dict[str, Optional[Union[int, str]]]] = None
+    request_context_map: Optional[Dict[str, Any]] = None
+
+    def to_request(self) -> Dict[str, dict]:
+        """Format for inclusion in GetFeaturesBatchRequest"""
+        return {
+            "joinKeyMap": self.join_key_map or {},
+            "requestContextMap": self.request_context_map or {},
+        }
+
+
+@dataclass
+class GetFeaturesBatchResponse:
+    """Results of a batch request, aligned with the order of the request rows.
+
+    When allow_partial_results is set, rows of a micro-batch that failed have a None response and the exception raised
+    for that micro-batch in errors. Otherwise errors is all None. The same goes for the rows of get_features_many with
+    return_errors set.
+    """
+
+    responses: List[Optional[GetFeaturesResponse]]
+    errors: List[Optional[Exception]]
+
+
 class GetFeatureServiceMetadataResponse:
-    feature_service_type: str
-    input_join_keys: List[dict]
-    input_request_context_keys: List[dict]
-    feature_values: List[dict]
+    """The metadata of a feature service"""
+
+    __slots__ = ("feature_service_type", "input_join_keys", "input_request_context_keys", "feature_values")
+
+    def __init__(
+        self,
+        feature_service_type: str,
+        input_join_keys: List[dict],
+        input_request_context_keys: List[dict],
+        feature_values: List[dict],
+    ):
+        self.feature_service_type = feature_service_type
+        self.input_join_keys = input_join_keys
+        self.input_request_context_keys = input_request_context_keys
+        self.feature_values = feature_values
 
     @classmethod
     def from_response(cls, resp: dict):
         """Constructor to create a GetFeatureServiceMetadataResponse from the json resonse of api"""
-        return GetFeatureServiceMetadataResponse(
+        return cls(
             feature_service_type=resp["featureServiceType"],
             input_join_keys=resp["inputJoinKeys"],
             input_request_context_keys=resp["inputRequestContextKeys"],
             feature_values=resp["featureValues"],
         )
 
+    def __repr__(self) -> str:
+        return (
+            f"GetFeatureServiceMetadataResponse(feature_service_type={self.feature_service_type!r}, "
+            f"input_join_keys={self.input_join_keys!r}, "
+            f"input_request_context_keys={self.input_request_context_keys!r}, "
+            f"feature_values={self.feature_values!r})"
+        )
+
+    def __eq__(self, other) -> bool:
+        return other.__class__ is GetFeatureServiceMetadataResponse and (
+            self.feature_service_type,
+            self.input_join_keys,
+            self.input_request_context_keys,
+            self.feature_values,
+        ) == (other.feature_service_type, other.input_join_keys, other.input_request_context_keys, other.feature_values)
+
+    def to_features_metadata(self) -> Dict[str, List[dict]]:
+        """The names and data types of the features, in the format of GetFeaturesResponse.metadata"""
+        return {
+            "features": [{"name": value["name"], "dataType": value.get("dataType")} for value in self.feature_values]
+        }
+
 
 class MetadataOptions:
     def __init__(
@@ -61,6 +226,10 @@ class MetadataOptions:
         }
 
 
+# used for the requests of clients with bare_responses, which keep only the features
+BARE_METADATA_OPTIONS = MetadataOptions(include_names=False, include_data_types=False)
+
+
 class RequestOptions:
     def __init__(self, read_from_cache: bool = True, write_to_cache: bool = True):
         self.read_from_cache = read_from_cache
@@ -0,0 +1,198 @@
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from tecton_client._internal.columnar import (
+    _SCALAR_TYPES,
+    _decode_scalars,
+    _get_features_metadata,
+    _object_array,
+    _require_numpy,
+)
+from tecton_client._internal.data_types import (
+    GetFeatureServiceMetadataResponse,
+    GetFeaturesRequestData,
+    GetFeaturesResponse,
+    decode_feature_value,
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+def _require_pandas():
+    if pd is None:
+        msg = "pandas is required for DataFrame output. Install it with `pip install tecton-client[pandas]`"
+        raise ImportError(msg)
+
+
+def _require_pyarrow():
+    if pa is None:
+        msg = "pyarrow is required for Arrow table output. Install it with `pip install tecton-client[pyarrow]`"
+        raise ImportError(msg)
+
+
+def _arrow_type(type_name: str) -> "pa.DataType":
+    return {
+        "int64": pa.int64(),
+        "float64": pa.float64(),
+        "float32": pa.float32(),
+        "boolean": pa.bool_(),
+        "string": pa.string(),
+    }[type_name]
+
+
+def _feature_columns(
+    responses: Sequence[Optional[GetFeaturesResponse]], features_metadata: List[dict]
+) -> Dict[str, Union["np.ma.MaskedArray", List[Any]]]:
+    """One masked array per scalar feature and one list of decoded python values per other feature"""
+    missing_row = [None] * len(features_metadata)
+    rows = [missing_row if r is None else r.result.features for r in responses]
+    columns = zip(*rows) if rows else [()] * len(features_metadata)
+
+    decoded = {}
+    for feature, column in zip(features_metadata, columns):
+        data_type = feature.get("dataType") or {}
+        type_name = data_type.get("type")
+        if type_name in _SCALAR_TYPES:
+            decoded[feature["name"]] = _decode_scalars(_object_array(column), type_name)
+        else:
+            decoded[feature["name"]] = [decode_feature_value(v, data_type) for v in column]
+    return decoded
+
+
+def features_to_pandas(
+    responses: Union[GetFeaturesResponse, Sequence[Optional[GetFeaturesResponse]]],
+    metadata: Optional[Union[dict, GetFeatureServiceMetadataResponse]] = None,
+    index: Optional["pd.Index"] = None,
+) -> "pd.DataFrame":
+    """Decode the feature values of one or many responses into a pandas DataFrame with one column per feature.
+
+    The DataFrame has one row per response; the rows of responses which are None are null. int64, boolean and string
+    features become nullable Int64, boolean and string columns, and float features float columns with NaN for nulls.
+    Other feature types are object columns of decoded python values.
+
+    Args:
+        responses: A GetFeaturesResponse or a sequence of them for the same feature service.
+        metadata: The feature names and data types, as GetFeaturesResponse.metadata or a
+            GetFeatureServiceMetadataResponse. Defaults to the metadata of the responses.
+        index: The index of the DataFrame, e.g. the index of the DataFrame of join keys. Defaults to a RangeIndex.
+    """
+    _require_numpy()
+    _require_pandas()
+    if isinstance(responses, GetFeaturesResponse):
+        responses = [responses]
+    features_metadata = _get_features_metadata(responses, metadata)
+    data = {}
+    for name, column in _feature_columns(responses, features_metadata).items():
+        if not isinstance(column, np.ma.MaskedArray):
+            data[name] = pd.array(column, dtype=object)
+        elif column.dtype == np.int64:
+            data[name] = pd.arrays.IntegerArray(column.data, np.ma.getmaskarray(column))
+        elif column.dtype == np.bool_:
+            data[name] = pd.arrays.BooleanArray(column.data, np.ma.getmaskarray(column))
+        elif column.dtype == object:
+            data[name] = pd.array(column.data, dtype="string")
+        else:
+            data[name] = column.filled(np.nan)
+    return pd.DataFrame(data, index=index)
+
+
+def features_to_arrow(
+    responses: Union[GetFeaturesResponse, Sequence[Optional[GetFeaturesResponse]]],
+    metadata: Optional[Union[dict, GetFeatureServiceMetadataResponse]] = None,
+) -> "pa.Table":
+    """Decode the feature values of one or many responses into an Arrow table with one column per feature.
+
+    The table has one row per response; the rows of responses which are None are null. Scalar features get the
+    matching Arrow type and arrays of scalars list types. The types of other features are inferred from their decoded
+    python values.
+
+    Args:
+        responses: A GetFeaturesResponse or a sequence of them for the same feature service.
+        metadata: The feature names and data types, as GetFeaturesResponse.metadata or a
+            GetFeatureServiceMetadataResponse. Defaults to the metadata of the responses.
+    """
+    _require_numpy()
+    _require_pyarrow()
+    if isinstance(responses, GetFeaturesResponse):
+        responses = [responses]
+    features_metadata = _get_features_metadata(responses, metadata)
+    columns = _feature_columns(responses, features_metadata)
+    arrays = []
+    for feature in features_metadata:
+        column = columns[feature["name"]]
+        data_type = feature.get("dataType") or {}
+        element_type = (data_type.get("elementType") or {}).get("type")
+        if isinstance(column, np.ma.MaskedArray):
+            arrays.append(pa.array(column.data, mask=np.ma.getmaskarray(column), type=_arrow_type(data_type["type"])))
+        elif data_type.get("type") == "array" and element_type in _SCALAR_TYPES:
+            arrays.append(pa.array(column, type=pa.list_(_arrow_type(element_type))))
+        else:
+            arrays.append(pa.array(column))
+    return pa.Table.from_arrays(arrays, names=[feature["name"] for feature in features_metadata])
+
+
+def _is_arrow_table(data: Any) -> bool:
+    return pa is not None and isinstance(data, pa.Table)
+
+
+def _is_dataframe(data: Any) -> bool:
+    return pd is not None and isinstance(data, pd.DataFrame)
+
+
+def _column_values(data: Any, name: str) -> List[Any]:
+    if _is_arrow_table(data):
+        return data.column(name).to_pylist()
+    column = data[name]
+    # tolist turns numpy scalars into python values, which every codec can encode; NaN and NaT become None
+    return column.astype(object).where(column.notna(), None).tolist()
+
+
+def get_request_data(data: Any, metadata: GetFeatureServiceMetadataResponse) -> List[GetFeaturesRequestData]:
+    """The request data of each row of a DataFrame or Arrow table, from the columns named after the join keys and
+    request context keys of the feature service"""
+    if not _is_dataframe(data) and not _is_arrow_table(data):
+        msg = f"data must be a pandas DataFrame or a pyarrow Table, not {type(data).__name__}"
+        raise TypeError(msg)
+    column_names = set(data.column_names if _is_arrow_table(data) else data.columns)
+    join_keys = [key["name"] for key in metadata.input_join_keys if key["name"] in column_names]
+    request_context_keys = [key["name"] for key in metadata.input_request_context_keys if key["name"] in column_names]
+    if not join_keys and not request_context_keys:
+        msg = "data has none of the join key or request context columns of the feature service"
+        raise ValueError(msg)
+
+    # the rows are built from whole columns, which is much faster than iterating over the rows of the input
+    join_key_columns = [_column_values(data, key) for key in join_keys]
+    request_context_columns = [_column_values(data, key) for key in request_context_keys]
+    num_rows = len(data)
+    join_key_rows = zip(*join_key_columns) if join_keys else [()] * num_rows
+    request_context_rows = zip(*request_context_columns) if request_context_keys else [()] * num_rows
+    return [
+        GetFeaturesRequestData(
+            join_key_map=dict(zip(join_keys, join_key_values)) if join_keys else None,
+            request_context_map=dict(zip(request_context_keys, request_context_values))
+            if request_context_keys
+            else None,
+        )
+        for join_key_values, request_context_values in zip(join_key_rows, request_context_rows)
+    ]
+
+
+def features_to_frame(
+    data: Any, responses: Sequence[Optional[GetFeaturesResponse]], metadata: GetFeatureServiceMetadataResponse
+) -> Any:
+    """The features of the rows of data in a DataFrame or Arrow table, whichever data is"""
+    if _is_arrow_table(data):
+        return features_to_arrow(responses, metadata)
+    return features_to_pandas(responses, metadata, index=data.index)
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from typing import Awaitable, Optional, TypeVar, Union
+
+import httpx
+
+from tecton_client._internal.cache import FeatureCache
+from tecton_client._internal.data_types import GetFeaturesResponse
+from tecton_client._internal.shared_cache import SharedFeatureCache
+from tecton_client._internal.stale_store import StaleFallbackStore
+from tecton_client.exceptions import DeadlineExceededError
+
+T = TypeVar("T")
+
+# timers may fire marginally before the time they were set for
+_CLOCK_TOLERANCE_SECONDS = 0.001
+
+
+class Deadline:
+    """The point in time by which a call must complete.
+
+    A Deadline can be passed as the timeout_budget of several calls, e.g. all feature lookups made while serving one
+    request, so that they share a single latency budget.
+    """
+
+    def __init__(self, timeout_seconds: float):
+        """Constructor for the deadline
+
+        Args:
+            timeout_seconds: The time from now until the deadline.
+        """
+        self.expires_at = time.monotonic() + timeout_seconds
+
+    @classmethod
+    def from_budget(cls, timeout_budget: Union[None, float, "Deadline"]) -> Optional["Deadline"]:
+        if timeout_budget is None or isinstance(timeout_budget, Deadline):
+            return timeout_budget
+        return cls(timeout_budget)
+
+    def remaining(self) -> float:
+        """The seconds left until the deadline, or 0 if it has passed"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at - _CLOCK_TOLERANCE_SECONDS
+
+    def timeout(self, client_timeout: httpx.Timeout) -> httpx.Timeout:
+        """The httpx timeouts of a request sent now: the client's timeouts, capped at the time left"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            msg = "the timeout budget ran out before the request was sent"
+            raise DeadlineExceededError(msg)
+
+        def cap(seconds: Optional[float]) -> float:
+            return remaining if seconds is None else min(seconds, remaining)
+
+        return httpx.Timeout(
+            connect=cap(client_timeout.connect),
+            read=cap(client_timeout.read),
+            write=cap(client_timeout.write),
+            pool=cap(client_timeout.pool),
+        )
+
+
+async def wait_with_deadline(aw: Awaitable[T], deadline: Optional[Deadline]) -> T:
+    """Await aw, cancelling it and raising DeadlineExceededError if the deadline passes first"""
+    if deadline is None:
+        return await aw
+    try:
+        return await asyncio.wait_for(aw, deadline.remaining())
+    except DeadlineExceededError:
+        raise
+    except asyncio.TimeoutError as exc:
+        msg = "the timeout budget ran out before the response was received"
+        raise DeadlineExceededError(msg) from exc
+
+
+def get_fallback_response(
+    exc: Exception,
+    cache: Union[None, FeatureCache, SharedFeatureCache],
+    stale_store: Optional[StaleFallbackStore],
+    cache_key: Optional[bytes],
+    fallback: Optional[GetFeaturesResponse],
+) -> Optional[GetFeaturesResponse]:
+    """The response served in place of raising exc, one of FALLBACK_ERRORS, from a get_features call: if the timeout
+    budget ran out a cached one, else a stale one from the stale_store, else fallback if the timeout budget ran out"""
+    deadline_exceeded = isinstance(exc, DeadlineExceededError)
+    if deadline_exceeded and cache is not None and cache_key is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+    if stale_store is not None and cache_key is not None:
+        stale = stale_store.get(cache_key)
+        if stale is not None:
+            return stale
+    return fallback if deadline_exceeded else None
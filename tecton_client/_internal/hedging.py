@@ -0,0 +1,141 @@
+import asyncio
+import bisect
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class HedgingPolicy:
+    def __init__(
+        self,
+        delay_seconds: Optional[float] = None,
+        percentile: float = 95.0,
+        min_delay_seconds: float = 0.001,
+        min_samples: int = 20,
+        window_size: int = 1000,
+        max_hedge_rate: float = 0.05,
+    ):
+        """Options for hedging slow get_features requests with a second, identical request
+
+        Args:
+            delay_seconds: A fixed time after which an unanswered request is hedged. If None, the delay is the given
+                percentile of recently observed latencies.
+            percentile: The latency percentile used as the delay when delay_seconds is None.
+            min_delay_seconds: The lower bound of the percentile-based delay.
+            min_samples: The number of latencies observed before percentile-based hedging starts.
+            window_size: The number of recent latencies the percentile is computed over.
+            max_hedge_rate: The maximum fraction of requests which are hedged, so that hedging cannot add more than
+                this much load to the feature server.
+        """
+        self.delay_seconds = delay_seconds
+        self.percentile = percentile
+        self.min_delay_seconds = min_delay_seconds
+        self.min_samples = min_samples
+        self.window_size = window_size
+        self.max_hedge_rate = max_hedge_rate
+
+
+@dataclass
+class HedgingStats:
+    requests: int = 0
+    hedges: int = 0
+    # hedges which answered before the original request
+    hedge_wins: int = 0
+
+
+class LatencyTracker:
+    """Tracks the latencies of the most recent requests for percentile queries"""
+
+    def __init__(self, window_size: int):
+        self._window = deque(maxlen=window_size)
+        self._sorted = []
+
+    def record(self, seconds: float) -> None:
+        if len(self._window) == self._window.maxlen:
+            evicted = self._window[0]
+            del self._sorted[bisect.bisect_left(self._sorted, evicted)]
+        self._window.append(seconds)
+        bisect.insort(self._sorted, seconds)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        if not self._sorted:
+            return None
+        index = min(len(self._sorted) - 1, int(len(self._sorted) * percentile / 100))
+        return self._sorted[index]
+
+    def __len__(self) -> int:
+        return len(self._window)
+
+
+class Hedger:
+    """Runs requests with a hedge: a second identical request if the first is slow, whichever answers first wins.
+
+    Must only be used from a single event loop.
+    """
+
+    def __init__(self, policy: HedgingPolicy):
+        self.policy = policy
+        self.latencies = LatencyTracker(policy.window_size)
+        self._stats = HedgingStats()
+        # hedges are paid for with tokens that every request deposits at max_hedge_rate
+        self._hedge_tokens = 1.0
+
+    def get_delay(self) -> Optional[float]:
+        """How long to wait for a request before hedging it, or None to not hedge"""
+        if self.policy.delay_seconds is not None:
+            return self.policy.delay_seconds
+        if len(self.latencies) < self.policy.min_samples:
+            return None
+        return max(self.policy.min_delay_seconds, self.latencies.percentile(self.policy.percentile))
+
+    async def _timed(self, fn: Callable[[], Awaitable[T]]) -> T:
+        start = time.monotonic()
+        result = await fn()
+        self.latencies.record(time.monotonic() - start)
+        return result
+
+    async def run(self, fn: Callable[[], Awaitable[T]]) -> T:
+        self._stats.requests += 1
+        self._hedge_tokens = min(1.0, self._hedge_tokens + self.policy.max_hedge_rate)
+        delay = self.get_delay()
+        if delay is None:
+            return await self._timed(fn)
+
+        primary = asyncio.ensure_future(self._timed(fn))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or self._hedge_tokens < 1:
+                return await primary
+
+            self._hedge_tokens -= 1
+            self._stats.hedges += 1
+            hedge = asyncio.ensure_future(self._timed(fn))
+            tasks.add(hedge)
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # the first successful response wins. If one request fails, the other one may still succeed
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._stats.hedge_wins += 1
+                        return task.result()
+                    if error is None or task is primary:
+                        error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    # mark the exception of a request which failed after the other one won as retrieved
+                    task.exception()
+
+    @property
+    def stats(self) -> HedgingStats:
+        return HedgingStats(requests=self._stats.requests, hedges=self._stats.hedges, hedge_wins=self._stats.hedge_wins)
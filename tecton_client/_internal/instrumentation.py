@@ -0,0 +1,208 @@
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+PHASES = ("build", "encode", "pool_wait", "connect", "network", "decode", "parse", "total")
+
+_CONNECT_STARTED = frozenset({"connection.connect_tcp.started", "connection.start_tls.started"})
+_CONNECT_ENDED = frozenset(
+    {
+        "connection.connect_tcp.complete",
+        "connection.connect_tcp.failed",
+        "connection.start_tls.complete",
+        "connection.start_tls.failed",
+    }
+)
+
+
+@dataclass
+class RequestTimings:
+    """The timing breakdown of one call to the feature server, passed to the request hooks of a client.
+
+    The phases are: building the request (incl. validation and cache lookup), encoding it, waiting for a connection
+    from the pool, connecting, the network round trip, decoding the response body, and parsing it into the response
+    type. Retried and hedged calls add up the pool wait, connect and network times of all their attempts.
+    """
+
+    # "get_features", "get_features_batch" or "get_feature_service_metadata"
+    path: str
+    feature_service: Optional[str] = None
+    cache_hit: bool = False
+    status_code: Optional[int] = None
+    # the size of the request and response bodies as json and as sent on the wire, which differ when compressed
+    request_bytes: int = 0
+    response_bytes: int = 0
+    request_wire_bytes: int = 0
+    response_wire_bytes: int = 0
+    attempts: int = 0
+    error: Optional[BaseException] = None
+    build_seconds: float = 0.0
+    encode_seconds: float = 0.0
+    pool_wait_seconds: float = 0.0
+    connect_seconds: float = 0.0
+    network_seconds: float = 0.0
+    decode_seconds: float = 0.0
+    parse_seconds: float = 0.0
+    total_seconds: float = 0.0
+    started_at: float = field(default_factory=time.perf_counter, repr=False)
+
+    def phases(self) -> Dict[str, float]:
+        """The seconds spent in each phase, by phase name"""
+        return {phase: getattr(self, f"{phase}_seconds") for phase in PHASES}
+
+
+RequestHook = Callable[[RequestTimings], Any]
+
+
+class NetworkTracer:
+    """Splits the time of one http request into pool wait, connect and network time using httpcore's trace events.
+
+    Transports which emit no trace events, e.g. mock transports, report all of the time as network time.
+    """
+
+    __slots__ = ("_timings", "_start", "_first_event", "_connect_started", "_connect_seconds")
+
+    def __init__(self, timings: RequestTimings):
+        self._timings = timings
+        self._start = time.perf_counter()
+        self._first_event = None
+        self._connect_started = None
+        self._connect_seconds = 0.0
+
+    def trace(self, event_name: str, info: dict) -> None:
+        now = time.perf_counter()
+        if self._first_event is None:
+            # the pool hands out a connection, or opens a new one, right before its first event
+            self._first_event = now
+        if event_name in _CONNECT_STARTED:
+            self._connect_started = now
+        elif event_name in _CONNECT_ENDED and self._connect_started is not None:
+            self._connect_seconds += now - self._connect_started
+            self._connect_started = None
+
+    async def atrace(self, event_name: str, info: dict) -> None:
+        self.trace(event_name, info)
+
+    def finish(self) -> None:
+        elapsed = time.perf_counter() - self._start
+        pool_wait = self._first_event - self._start if self._first_event is not None else 0.0
+        self._timings.attempts += 1
+        self._timings.pool_wait_seconds += pool_wait
+        self._timings.connect_seconds += self._connect_seconds
+        self._timings.network_seconds += elapsed - pool_wait - self._connect_seconds
+
+
+def emit_request_timings(hooks: Sequence[RequestHook], timings: RequestTimings) -> None:
+    timings.total_seconds = time.perf_counter() - timings.started_at
+    for hook in hooks:
+        try:
+            hook(timings)
+        except Exception:
+            # instrumentation must never fail a request
+            logger.exception("Request hook %r failed", hook)
+
+
+class LatencyHistogram:
+    """A histogram of latencies with a bounded relative error, in the style of HdrHistogram.
+
+    Latencies are counted in microsecond buckets which are exact below 2 ** (precision_bits + 1) microseconds and
+    then grow with the value, so that every bucket is narrower than 1 / 2 ** precision_bits of its values.
+    """
+
+    def __init__(self, precision_bits: int = 7):
+        self.precision_bits = precision_bits
+        self._sub_buckets = 1 << precision_bits
+        self._counts: List[int] = []
+        self.count = 0
+        self.total_seconds = 0.0
+        self.min_seconds = math.inf
+        self.max_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _index(self, micros: int) -> int:
+        shift = max(0, micros.bit_length() - self.precision_bits - 1)
+        return shift * self._sub_buckets + (micros >> shift)
+
+    def _value(self, index: int) -> float:
+        """The midpoint in seconds of the bucket with the given index"""
+        if index < 2 * self._sub_buckets:
+            return index / 1e6
+        shift = index // self._sub_buckets - 1
+        lowest = (index - shift * self._sub_buckets) << shift
+        return (lowest + ((1 << shift) - 1) / 2) / 1e6
+
+    def record(self, seconds: float) -> None:
+        index = self._index(max(0, int(seconds * 1e6)))
+        with self._lock:
+            if index >= len(self._counts):
+                self._counts.extend([0] * (index + 1 - len(self._counts)))
+            self._counts[index] += 1
+            self.count += 1
+            self.total_seconds += seconds
+            self.min_seconds = min(self.min_seconds, seconds)
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.count if self.count else 0.0
+
+    def percentile(self, percentile: float) -> float:
+        """The latency in seconds below which the given percentage of the recorded latencies fall"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * percentile / 100))
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank:
+                return min(max(self._value(index), self.min_seconds), self.max_seconds)
+        return self.max_seconds
+
+    def snapshot(self) -> "LatencyHistogram":
+        """A copy of the histogram which is not affected by later records"""
+        copy = LatencyHistogram(self.precision_bits)
+        with self._lock:
+            copy._counts = list(self._counts)
+            copy.count = self.count
+            copy.total_seconds = self.total_seconds
+            copy.min_seconds = self.min_seconds
+            copy.max_seconds = self.max_seconds
+        return copy
+
+
+class LatencyHistograms:
+    """A request hook which keeps a LatencyHistogram for every path and phase of the calls to the feature server.
+
+    Calls served from the cache are not recorded. Register it with client.add_request_hook(histograms).
+    """
+
+    def __init__(self, precision_bits: int = 7):
+        self.precision_bits = precision_bits
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, timings: RequestTimings) -> None:
+        if timings.cache_hit:
+            return
+        for phase, seconds in timings.phases().items():
+            key = (timings.path, phase)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                with self._lock:
+                    histogram = self._histograms.setdefault(key, LatencyHistogram(self.precision_bits))
+            histogram.record(seconds)
+
+    def snapshot(self) -> Dict[Tuple[str, str], LatencyHistogram]:
+        """Copies of the histograms, by (path, phase)"""
+        with self._lock:
+            histograms = dict(self._histograms)
+        return {key: histogram.snapshot() for key, histogram in histograms.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
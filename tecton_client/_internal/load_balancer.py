@@ -0,0 +1,206 @@
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Generic, List, Optional, Sequence, TypeVar
+from urllib.parse import urljoin
+
+C = TypeVar("C")
+
+STRATEGIES = ("ewma", "least_outstanding")
+
+
+def get_api_urls(url: str) -> Dict[str, str]:
+    """The urls of the feature server apis, by path name, for the base url of a Tecton cluster"""
+    base_url = urljoin(url, "/api/v1/")
+    return {
+        "get_features": urljoin(base_url, "feature-service/get-features"),
+        "get_features_batch": urljoin(base_url, "feature-service/get-features-batch"),
+        "get_feature_service_metadata": urljoin(base_url, "feature-service/metadata"),
+    }
+
+
+class LoadBalancingPolicy:
+    def __init__(
+        self,
+        strategy: str = "ewma",
+        consecutive_failures: int = 5,
+        ejection_seconds: float = 30.0,
+        max_ejection_seconds: float = 300.0,
+        max_ejected_fraction: float = 0.5,
+        decay_seconds: float = 10.0,
+    ):
+        """How a client with several urls spreads its requests over the endpoints.
+
+        Each request goes to the better of two randomly picked endpoints which are not ejected. With the "ewma"
+        strategy the better one has the lower product of its moving average latency and its outstanding requests, with
+        "least_outstanding" it has fewer outstanding requests. An endpoint which fails consecutive_failures requests in
+        a row, with a 5xx, a timeout or a transport error, is ejected for ejection_seconds times the number of times it
+        was ejected, up to max_ejection_seconds.
+
+        Args:
+            strategy: "ewma" (default) or "least_outstanding".
+            consecutive_failures: The number of failed requests in a row after which an endpoint is ejected.
+            ejection_seconds: How long an endpoint is ejected the first time.
+            max_ejection_seconds: The upper bound of how long an endpoint is ejected.
+            max_ejected_fraction: The largest fraction of the endpoints which may be ejected at the same time.
+            decay_seconds: The time over which the latency of a request loses most of its weight in the moving
+                average.
+        """
+        if strategy not in STRATEGIES:
+            msg = f"unknown strategy {strategy}, must be one of {', '.join(STRATEGIES)}"
+            raise ValueError(msg)
+        if consecutive_failures < 1:
+            msg = "consecutive_failures must be at least 1"
+            raise ValueError(msg)
+        self.strategy = strategy
+        self.consecutive_failures = consecutive_failures
+        self.ejection_seconds = ejection_seconds
+        self.max_ejection_seconds = max_ejection_seconds
+        self.max_ejected_fraction = max_ejected_fraction
+        self.decay_seconds = decay_seconds
+
+
+@dataclass
+class EndpointStats:
+    url: str
+    outstanding: int = 0
+    ewma_latency_seconds: float = 0.0
+    requests: int = 0
+    failures: int = 0
+    ejections: int = 0
+    ejected: bool = False
+
+
+class Endpoint(Generic[C]):
+    """One base url of a load balanced client, with its http client and passive health"""
+
+    def __init__(self, url: str, client: C):
+        self.url = url
+        self.urls = get_api_urls(url)
+        self.client = client
+        self.outstanding = 0
+        self.ewma_latency = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self._latency_samples = 0
+        self._last_update = 0.0
+
+    def _record_latency(self, now: float, latency_seconds: float, decay_seconds: float) -> None:
+        # an exponentially weighted moving average over time, so that the weight of a sample does not depend on the
+        # request rate
+        weight = math.exp(-(now - self._last_update) / decay_seconds) if self._latency_samples else 0.0
+        self._latency_samples += 1
+        self.ewma_latency = weight * self.ewma_latency + (1 - weight) * latency_seconds
+        self._last_update = now
+
+    def stats(self, now: float) -> EndpointStats:
+        return EndpointStats(
+            url=self.url,
+            outstanding=self.outstanding,
+            ewma_latency_seconds=self.ewma_latency,
+            requests=self.requests,
+            failures=self.failures,
+            ejections=self.ejections,
+            ejected=self.ejected_until > now,
+        )
+
+
+class LoadBalancer(Generic[C]):
+    """Picks the endpoint of each request and tracks the health of the endpoints, as configured by a
+    LoadBalancingPolicy"""
+
+    def __init__(self, endpoints: Sequence[Endpoint[C]], policy: LoadBalancingPolicy):
+        self.endpoints = list(endpoints)
+        self.policy = policy
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    def reset_after_fork(self) -> None:
+        """Forget the requests the parent process had outstanding, which the forked process never completes"""
+        self._lock = threading.Lock()
+        for endpoint in self.endpoints:
+            endpoint.outstanding = 0
+
+    def _cost(self, endpoint: Endpoint[C]) -> float:
+        if self.policy.strategy == "least_outstanding":
+            return endpoint.outstanding
+        if not endpoint._latency_samples:
+            # an endpoint without latency samples yet is tried with one request at a time
+            return math.inf if endpoint.outstanding else 0.0
+        return endpoint.ewma_latency * (endpoint.outstanding + 1)
+
+    def pick(self) -> Endpoint[C]:
+        """Pick the endpoint of a request, count it as outstanding and return it"""
+        with self._lock:
+            now = time.monotonic()
+            healthy = [endpoint for endpoint in self.endpoints if endpoint.ejected_until <= now]
+            if not healthy:
+                # with every endpoint ejected, the one which comes back first is the least bad choice
+                healthy = [min(self.endpoints, key=lambda endpoint: endpoint.ejected_until)]
+            if len(healthy) > 1:
+                # the power of two choices spreads the load nearly as well as comparing all endpoints, without
+                # sending every request to the same endpoint between updates; the random order also breaks ties
+                healthy = self._random.sample(healthy, 2)
+            endpoint = min(healthy, key=self._cost)
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def on_success(self, endpoint: Endpoint[C], latency_seconds: float) -> None:
+        with self._lock:
+            endpoint.outstanding -= 1
+            endpoint.consecutive_failures = 0
+            endpoint._record_latency(time.monotonic(), latency_seconds, self.policy.decay_seconds)
+
+    def on_failure(self, endpoint: Endpoint[C], latency_seconds: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            endpoint.outstanding -= 1
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            # failures count as slow responses, so that an endpoint which fails fast does not attract more requests
+            endpoint._record_latency(now, max(latency_seconds, 2 * endpoint.ewma_latency), self.policy.decay_seconds)
+            if endpoint.consecutive_failures >= self.policy.consecutive_failures and endpoint.ejected_until <= now:
+                self._eject(endpoint, now)
+
+    def on_cancel(self, endpoint: Endpoint[C]) -> None:
+        with self._lock:
+            endpoint.outstanding -= 1
+
+    def _eject(self, endpoint: Endpoint[C], now: float) -> None:
+        ejected = sum(1 for other in self.endpoints if other.ejected_until > now)
+        if ejected + 1 > self.policy.max_ejected_fraction * len(self.endpoints):
+            return
+        endpoint.ejections += 1
+        endpoint.consecutive_failures = 0
+        ejection_seconds = min(self.policy.ejection_seconds * endpoint.ejections, self.policy.max_ejection_seconds)
+        endpoint.ejected_until = now + ejection_seconds
+
+    @property
+    def stats(self) -> List[EndpointStats]:
+        with self._lock:
+            now = time.monotonic()
+            return [endpoint.stats(now) for endpoint in self.endpoints]
+
+
+def get_urls(url) -> List[str]:
+    urls = [url] if isinstance(url, str) else list(url)
+    if not urls:
+        msg = "at least one url is required"
+        raise ValueError(msg)
+    return urls
+
+
+def make_load_balancer(
+    urls: List[str], client_factory, shared_client: Optional[C], policy: Optional[LoadBalancingPolicy]
+) -> Optional[LoadBalancer[C]]:
+    """The load balancer of a client with several urls, or None for a single url"""
+    if len(urls) == 1:
+        return None
+    endpoints = [Endpoint(url, shared_client if shared_client is not None else client_factory()) for url in urls]
+    return LoadBalancer(endpoints, policy or LoadBalancingPolicy())
@@ -0,0 +1,49 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from tecton_client._internal.data_types import GetFeatureServiceMetadataResponse, MetadataOptions
+
+DEFAULT_METADATA_REFRESH_INTERVAL_SECONDS = 300.0
+
+# used for get_features requests whose feature names and data types are filled in from the registry
+REGISTRY_METADATA_OPTIONS = MetadataOptions(include_names=False, include_data_types=False)
+
+# (workspace_name, feature_service_name, feature_service_id), with exactly one of name or id set
+MetadataKey = Tuple[str, Optional[str], Optional[str]]
+
+
+class FeatureServiceMetadataRegistry:
+    """Remembers the metadata of feature services so it does not need to be requested with every get_features call.
+
+    Entries are keyed on the workspace and the feature service name or id used to look them up.
+    """
+
+    def __init__(self):
+        self._metadata: Dict[MetadataKey, GetFeatureServiceMetadataResponse] = {}
+        self._features_metadata: Dict[MetadataKey, Dict[str, List[dict]]] = {}
+        self._lock = threading.Lock()
+
+    def put(self, key: MetadataKey, metadata: GetFeatureServiceMetadataResponse) -> None:
+        features_metadata = metadata.to_features_metadata()
+        with self._lock:
+            self._metadata[key] = metadata
+            self._features_metadata[key] = features_metadata
+
+    def get(self, key: MetadataKey) -> Optional[GetFeatureServiceMetadataResponse]:
+        return self._metadata.get(key)
+
+    def get_features_metadata(self, key: MetadataKey) -> Optional[Dict[str, List[dict]]]:
+        """The feature names and data types in the format of GetFeaturesResponse.metadata"""
+        return self._features_metadata.get(key)
+
+    def keys(self) -> List[MetadataKey]:
+        with self._lock:
+            return list(self._metadata)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._metadata.clear()
+            self._features_metadata.clear()
+
+    def __len__(self) -> int:
+        return len(self._metadata)
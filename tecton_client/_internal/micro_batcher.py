@@ -0,0 +1,117 @@
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+from tecton_client._internal.utils import DEFAULT_MICRO_BATCH_SIZE
+
+Row = TypeVar("Row")
+Result = TypeVar("Result")
+
+DEFAULT_MICRO_BATCH_WINDOW_MS = 2.0
+
+
+class MicroBatchingOptions:
+    def __init__(self, window_ms: float = DEFAULT_MICRO_BATCH_WINDOW_MS, max_rows: int = DEFAULT_MICRO_BATCH_SIZE):
+        """Options for gathering concurrent get_features calls into batch requests
+
+        Args:
+            window_ms: How long the first call of a batch waits for other calls to join it.
+            max_rows: The maximum number of rows in a batch. A batch is sent as soon as it is full.
+        """
+        if max_rows < 1:
+            msg = "max_rows must be at least 1"
+            raise ValueError(msg)
+        self.window_ms = window_ms
+        self.max_rows = max_rows
+
+
+@dataclass
+class MicroBatchStats:
+    batches: int = 0
+    rows: int = 0
+    # batch size -> number of batches of that size
+    batch_sizes: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.rows / self.batches if self.batches else 0.0
+
+
+class _PendingBatch(Generic[Row, Result]):
+    def __init__(self, send: Callable[[List[Row]], Awaitable[List[Result]]]):
+        self.send = send
+        self.rows: List[Row] = []
+        self.futures: List["asyncio.Future[Result]"] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher(Generic[Row, Result]):
+    """Gathers rows submitted concurrently under the same key into batches, sent once full or after a time window.
+
+    Must only be used from a single event loop.
+    """
+
+    def __init__(self, options: MicroBatchingOptions):
+        self.options = options
+        self._pending: Dict[Hashable, _PendingBatch[Row, Result]] = {}
+        self._batch_sizes: Counter = Counter()
+        self._in_flight = set()
+
+    async def submit(self, key: Hashable, row: Row, send: Callable[[List[Row]], Awaitable[List[Result]]]) -> Result:
+        """Add a row to the pending batch for key and wait for its result.
+
+        Args:
+            key: Rows are only batched together with rows of the same key.
+            row: The row to add.
+            send: Sends a batch of rows and returns one result per row, in order. The send of the call which starts a
+                batch is used for the whole batch.
+        """
+        loop = asyncio.get_running_loop()
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _PendingBatch(send)
+            batch.timer = loop.call_later(self.options.window_ms / 1000, self._flush, key, batch)
+        future = loop.create_future()
+        batch.rows.append(row)
+        batch.futures.append(future)
+        if len(batch.rows) >= self.options.max_rows:
+            self._flush(key, batch)
+        return await future
+
+    def _flush(self, key: Hashable, batch: _PendingBatch) -> None:
+        if self._pending.get(key) is not batch:
+            return
+        del self._pending[key]
+        batch.timer.cancel()
+        self._batch_sizes[len(batch.rows)] += 1
+        task = asyncio.ensure_future(self._send(batch))
+        # keep a reference so that the task isn't garbage collected while it runs
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    @staticmethod
+    async def _send(batch: _PendingBatch) -> None:
+        try:
+            results = await batch.send(batch.rows)
+        except asyncio.CancelledError:
+            for future in batch.futures:
+                future.cancel()
+            raise
+        except Exception as exc:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(exc)
+        else:
+            for future, result in zip(batch.futures, results):
+                # callers which were cancelled while waiting have a done future
+                if not future.done():
+                    future.set_result(result)
+
+    @property
+    def stats(self) -> MicroBatchStats:
+        return MicroBatchStats(
+            batches=sum(self._batch_sizes.values()),
+            rows=sum(size * count for size, count in self._batch_sizes.items()),
+            batch_sizes=dict(self._batch_sizes),
+        )
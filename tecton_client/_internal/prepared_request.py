@@ -0,0 +1,256 @@
+import functools
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Union
+
+from tecton_client._internal.data_types import (
+    BARE_METADATA_OPTIONS,
+    GetFeaturesRequestData,
+    GetFeaturesResponse,
+    MetadataOptions,
+    RequestOptions,
+)
+from tecton_client._internal.deadline import Deadline, get_fallback_response, wait_with_deadline
+from tecton_client._internal.instrumentation import emit_request_timings
+from tecton_client._internal.metadata_registry import REGISTRY_METADATA_OPTIONS
+from tecton_client._internal.stale_store import FALLBACK_ERRORS
+from tecton_client._internal.utils import (
+    build_get_features_request,
+    finish_features_cache_key,
+    get_features_cache_key_hasher,
+    get_features_request_key,
+    get_micro_batch_key,
+    validate_request_args,
+)
+
+if TYPE_CHECKING:
+    from tecton_client._internal.async_tecton_client import AsyncTectonClient
+    from tecton_client._internal.tecton_client import TectonClient
+
+_JOIN_KEY_MAP_PLACEHOLDER = "__tecton_client_join_key_map__"
+_REQUEST_CONTEXT_MAP_PLACEHOLDER = "__tecton_client_request_context_map__"
+
+
+class _PreparedFeatureRequestBase:
+    def __init__(
+        self,
+        client: Union["TectonClient", "AsyncTectonClient"],
+        *,
+        feature_service_name: Optional[str] = None,
+        feature_service_id: Optional[str] = None,
+        metadata_options: Optional[MetadataOptions] = None,
+        workspace_name: Optional[str] = None,
+        request_options: Optional[RequestOptions] = None,
+        allow_partial_results: bool = False,
+    ):
+        validate_request_args(feature_service_id, feature_service_name, workspace_name, client.default_workspace_name)
+        self._client = client
+        self.feature_service_name = feature_service_name
+        self.feature_service_id = feature_service_id
+        self.workspace_name = workspace_name or client.default_workspace_name
+        self.request_options = request_options
+        self.allow_partial_results = allow_partial_results
+
+        cache = client._cache
+        self._read_cache = cache is not None and (request_options is None or request_options.read_from_cache)
+        # partial results may be missing features, so they are never cached
+        self._write_cache = (
+            cache is not None
+            and not allow_partial_results
+            and (request_options is None or request_options.write_to_cache)
+        )
+        # partial results may be missing features, so they are never kept for the stale fallback either
+        self._write_stale = client._stale_store is not None and not allow_partial_results
+        self._needs_key = self._read_cache or self._write_cache or client._stale_store is not None
+        # the key of the cache ttl and request limits of the feature service
+        self._feature_service_key = feature_service_name or feature_service_id
+        self._cache_key_hasher = get_features_cache_key_hasher(
+            self.workspace_name, feature_service_name, feature_service_id, metadata_options
+        )
+
+        # metadata pre-warmed in the client's registry is looked up again on every call to pick up refreshes
+        self._registry_key = None
+        if metadata_options is None and client._bare_responses:
+            metadata_options = BARE_METADATA_OPTIONS
+        elif metadata_options is None:
+            registry_key = (self.workspace_name, feature_service_name, feature_service_id)
+            if client.metadata_registry.get_features_metadata(registry_key) is not None:
+                self._registry_key = registry_key
+                metadata_options = REGISTRY_METADATA_OPTIONS
+
+        self._parse_response = GetFeaturesResponse.get_parser(metadata_options)
+
+        # the request body is encoded once with placeholders, and split around them into static byte fragments
+        codec = client._codec
+        self._encode = codec.encode
+        self._request_args = dict(
+            feature_service_id=feature_service_id,
+            feature_service_name=feature_service_name,
+            workspace_name=self.workspace_name,
+            metadata_options=metadata_options,
+            allow_partial_results=allow_partial_results,
+            request_options=request_options,
+        )
+        template = codec.encode(
+            build_get_features_request(
+                join_key_map=_JOIN_KEY_MAP_PLACEHOLDER,
+                request_context_map=_REQUEST_CONTEXT_MAP_PLACEHOLDER,
+                **self._request_args,
+            )
+        )
+        self._prefix, rest = template.split(codec.encode(_JOIN_KEY_MAP_PLACEHOLDER))
+        self._middle, self._suffix = rest.split(codec.encode(_REQUEST_CONTEXT_MAP_PLACEHOLDER))
+        self._empty_request_context_suffix = self._middle + codec.encode({}) + self._suffix
+
+    def encode_request(
+        self,
+        join_key_map: Optional[Dict[str, Optional[Union[int, str]]]] = None,
+        request_context_map: Optional[Dict[str, Any]] = None,
+    ) -> bytes:
+        """The encoded get-features request body for the given join keys and request context"""
+        if not request_context_map:
+            return self._prefix + self._encode(join_key_map or {}) + self._empty_request_context_suffix
+        return b"".join(
+            (
+                self._prefix,
+                self._encode(join_key_map or {}),
+                self._middle,
+                self._encode(request_context_map),
+                self._suffix,
+            )
+        )
+
+    def _get_cached(self, join_key_map, request_context_map):
+        if not self._needs_key:
+            return None, None
+        cache_key = finish_features_cache_key(self._cache_key_hasher, join_key_map, request_context_map)
+        if self._read_cache:
+            return cache_key, self._client._cache.get(cache_key)
+        return cache_key, None
+
+    def _finish(self, response: GetFeaturesResponse, cache_key: Optional[bytes]) -> GetFeaturesResponse:
+        if self._registry_key is not None:
+            response.metadata = self._client.metadata_registry.get_features_metadata(self._registry_key)
+        if self._write_cache:
+            self._client._cache.put(cache_key, response, self._feature_service_key)
+        if self._write_stale:
+            self._client._stale_store.put(cache_key, response)
+        return response
+
+
+class PreparedFeatureRequest(_PreparedFeatureRequestBase):
+    """A get_features request for a fixed feature service and options, created by TectonClient.prepare.
+
+    The arguments are validated and the static parts of the request body are encoded once, so each call to get only
+    encodes the join keys and request context.
+    """
+
+    def get(
+        self,
+        join_key_map: Optional[Dict[str, Optional[Union[int, str]]]] = None,
+        request_context_map: Optional[Dict[str, Any]] = None,
+        timeout_budget: Union[None, float, Deadline] = None,
+        fallback: Optional[GetFeaturesResponse] = None,
+    ) -> GetFeaturesResponse:
+        """Retrieve the features for the join keys and request context, as TectonClient.get_features does"""
+        timings = self._client._start_timings("get_features", self._feature_service_key)
+        deadline = Deadline.from_budget(timeout_budget)
+        cache_key, cached = self._get_cached(join_key_map, request_context_map)
+        if cached is not None:
+            if timings is not None:
+                timings.cache_hit = True
+                emit_request_timings(self._client._request_hooks, timings)
+            return cached
+        content = self.encode_request(join_key_map, request_context_map)
+        if timings is not None:
+            # the request is built and encoded in one step
+            timings.encode_seconds = time.perf_counter() - timings.started_at
+        try:
+            response = self._client._send_and_parse(
+                "get_features",
+                content,
+                self._parse_response,
+                deadline,
+                self._client._get_limiter(self._feature_service_key),
+                timings,
+            )
+        except FALLBACK_ERRORS as exc:
+            client = self._client
+            response = get_fallback_response(exc, client._cache, client._stale_store, cache_key, fallback)
+            if response is None:
+                raise
+            if response.is_stale:
+                client._refresh_stale(cache_key, functools.partial(self.get, join_key_map, request_context_map))
+            return response
+        return self._finish(response, cache_key)
+
+
+class AsyncPreparedFeatureRequest(_PreparedFeatureRequestBase):
+    """A get_features request for a fixed feature service and options, created by AsyncTectonClient.prepare.
+
+    The arguments are validated and the static parts of the request body are encoded once, so each call to get only
+    encodes the join keys and request context.
+    """
+
+    def __init__(self, client: "AsyncTectonClient", **kwargs):
+        super().__init__(client, **kwargs)
+        # coalescing concurrent calls needs the canonical key of the request even without a cache
+        self._needs_key = self._needs_key or client._single_flight is not None
+        self._micro_batch_key = get_micro_batch_key(**self._request_args)
+        self._send_micro_batch = functools.partial(client._get_features_micro_batch, **self._request_args)
+
+    async def get(
+        self,
+        join_key_map: Optional[Dict[str, Optional[Union[int, str]]]] = None,
+        request_context_map: Optional[Dict[str, Any]] = None,
+        timeout_budget: Union[None, float, Deadline] = None,
+        fallback: Optional[GetFeaturesResponse] = None,
+    ) -> GetFeaturesResponse:
+        """Retrieve the features for the join keys and request context, as AsyncTectonClient.get_features does"""
+        timings = self._client._start_timings("get_features", self._feature_service_key)
+        deadline = Deadline.from_budget(timeout_budget)
+        cache_key, cached = self._get_cached(join_key_map, request_context_map)
+        if cached is not None:
+            if timings is not None:
+                timings.cache_hit = True
+                emit_request_timings(self._client._request_hooks, timings)
+            return cached
+
+        single_flight = self._client._single_flight
+        # a coalesced request is shared with callers with other budgets, so only the callers' waits are bounded
+        request_deadline = deadline if single_flight is None else None
+
+        async def fetch() -> GetFeaturesResponse:
+            micro_batcher = self._client._micro_batcher
+            if micro_batcher is not None:
+                row = GetFeaturesRequestData(join_key_map, request_context_map)
+                response = await micro_batcher.submit(self._micro_batch_key, row, self._send_micro_batch)
+            else:
+                content = self.encode_request(join_key_map, request_context_map)
+                if timings is not None:
+                    # the request is built and encoded in one step
+                    timings.encode_seconds = time.perf_counter() - timings.started_at
+                response = await self._client._send_and_parse(
+                    "get_features",
+                    content,
+                    self._parse_response,
+                    request_deadline,
+                    self._client._get_limiter(self._feature_service_key),
+                    timings,
+                )
+            return self._finish(response, cache_key)
+
+        if single_flight is None:
+            call = fetch()
+        else:
+            request_key = get_features_request_key(cache_key, self.request_options, self.allow_partial_results)
+            call = single_flight.do(request_key, fetch)
+        try:
+            return await wait_with_deadline(call, deadline)
+        except FALLBACK_ERRORS as exc:
+            client = self._client
+            response = get_fallback_response(exc, client._cache, client._stale_store, cache_key, fallback)
+            if response is None:
+                raise
+            if response.is_stale:
+                client._refresh_stale(cache_key, functools.partial(self.get, join_key_map, request_context_map))
+            return response
@@ -0,0 +1,376 @@
+import asyncio
+import contextlib
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Deque, Dict, Iterator, Optional, Tuple, Union
+
+import httpx
+
+from tecton_client._internal.concurrency_limit import AdaptiveConcurrency, AimdConcurrencyLimit, FixedConcurrencyLimit
+from tecton_client._internal.deadline import Deadline
+from tecton_client.exceptions import (
+    DeadlineExceededError,
+    GatewayTimeoutError,
+    RequestLimitExceededError,
+    ResourceExhaustedError,
+    ServiceUnavailableError,
+)
+
+ConcurrencyLimit = Union[FixedConcurrencyLimit, AimdConcurrencyLimit]
+
+# errors which show that the feature server is overloaded, and cut an adaptive concurrency limit
+_OVERLOAD_ERRORS = (ResourceExhaustedError, ServiceUnavailableError, GatewayTimeoutError, httpx.TimeoutException)
+
+
+class RequestLimits:
+    def __init__(
+        self,
+        max_in_flight: Optional[int] = None,
+        requests_per_second: Optional[float] = None,
+        burst: Optional[int] = None,
+        max_wait_seconds: Optional[float] = None,
+        adaptive_concurrency: Optional[AdaptiveConcurrency] = None,
+    ):
+        """Limits on the get_features requests a client sends to the feature server
+
+        Args:
+            max_in_flight: The maximum number of requests waiting for a response at any time.
+            requests_per_second: The maximum sustained rate of requests, enforced with a token bucket.
+            burst: The number of requests which can be sent at once after a quiet period. Defaults to
+                requests_per_second, i.e. a second's worth of requests.
+            max_wait_seconds: How long a request may be queued for a limit before it fails with a
+                RequestLimitExceededError. 0 fails fast instead of queueing; None (default) queues until the request
+                can be sent, or until the timeout budget of the call runs out.
+            adaptive_concurrency: If set, the maximum number of requests in flight adapts to the latency and overload
+                errors of the feature server, instead of being fixed by max_in_flight.
+        """
+        if max_in_flight is not None and max_in_flight < 1:
+            msg = "max_in_flight must be at least 1"
+            raise ValueError(msg)
+        if max_in_flight is not None and adaptive_concurrency is not None:
+            msg = "set either max_in_flight or adaptive_concurrency, not both"
+            raise ValueError(msg)
+        if requests_per_second is not None and requests_per_second <= 0:
+            msg = "requests_per_second must be positive"
+            raise ValueError(msg)
+        self.max_in_flight = max_in_flight
+        self.requests_per_second = requests_per_second
+        self.burst = burst if burst is not None else max(1, int(requests_per_second or 1))
+        self.max_wait_seconds = max_wait_seconds
+        self.adaptive_concurrency = adaptive_concurrency
+
+    def get_concurrency_limit(self) -> Optional[ConcurrencyLimit]:
+        if self.adaptive_concurrency is not None:
+            return AimdConcurrencyLimit(self.adaptive_concurrency)
+        if self.max_in_flight is not None:
+            return FixedConcurrencyLimit(self.max_in_flight)
+        return None
+
+
+@dataclass
+class RequestLimitStats:
+    in_flight: int = 0
+    # requests currently queued for a limit
+    queued: int = 0
+    admitted: int = 0
+    rejected: int = 0
+    # the time admitted requests were queued for
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    # the current maximum number of requests in flight, if limited
+    concurrency_limit: Optional[int] = None
+
+    @property
+    def mean_wait_seconds(self) -> float:
+        return self.total_wait_seconds / self.admitted if self.admitted else 0.0
+
+
+class TokenBucket:
+    """A token bucket which hands out reservations, so that queued requests are admitted in order"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait_seconds: Optional[float]) -> Optional[float]:
+        """Take a token and return how long to wait until it is due, or None if that is longer than max_wait_seconds"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if max_wait_seconds is not None and wait > max_wait_seconds:
+                return None
+            # tokens go negative while requests are queued for them
+            self._tokens -= 1
+            return wait
+
+
+class _ConcurrencyGate:
+    """Admits requests while fewer than the limit are in flight, for requests sent from any number of threads"""
+
+    def __init__(self, limit: ConcurrencyLimit):
+        self.limit = limit
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: Optional[float]) -> bool:
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.in_flight < self.limit.limit, timeout):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            # an adaptive limit may have grown by more than the one request which completed
+            self._condition.notify(max(1, self.limit.limit - self.in_flight))
+
+
+class _AsyncConcurrencyGate:
+    """Admits requests in order while fewer than the limit are in flight, for requests sent from one event loop"""
+
+    def __init__(self, limit: ConcurrencyLimit):
+        self.limit = limit
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def locked(self) -> bool:
+        return self.in_flight >= self.limit.limit or bool(self._waiters)
+
+    async def acquire(self) -> None:
+        if not self.locked():
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.cancelled():
+                # a cancelled waiter may already have been skipped by release
+                with contextlib.suppress(ValueError):
+                    self._waiters.remove(waiter)
+            else:
+                # the request was admitted just as it was cancelled, so the slot goes to the next one
+                self.release()
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < self.limit.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+
+class _RequestLimiterBase:
+    def __init__(self, limits: RequestLimits):
+        self.limits = limits
+        self._bucket = (
+            TokenBucket(limits.requests_per_second, limits.burst) if limits.requests_per_second is not None else None
+        )
+        self._stats = RequestLimitStats()
+        self._stats_lock = threading.Lock()
+        self._gate = None
+
+    def _get_max_wait(self, deadline: Optional[Deadline]) -> Tuple[Optional[float], bool]:
+        """The longest a request may be queued, and whether that is set by the deadline rather than the limits"""
+        max_wait = self.limits.max_wait_seconds
+        if deadline is not None:
+            remaining = deadline.remaining()
+            if max_wait is None or remaining < max_wait:
+                return remaining, True
+        return max_wait, False
+
+    def _queued(self, delta: int) -> None:
+        with self._stats_lock:
+            self._stats.queued += delta
+
+    def _admitted(self, wait_seconds: float) -> None:
+        with self._stats_lock:
+            self._stats.in_flight += 1
+            self._stats.admitted += 1
+            self._stats.total_wait_seconds += wait_seconds
+            self._stats.max_wait_seconds = max(self._stats.max_wait_seconds, wait_seconds)
+
+    def _released(self) -> None:
+        with self._stats_lock:
+            self._stats.in_flight -= 1
+
+    def _reject(self, by_deadline: bool) -> None:
+        with self._stats_lock:
+            self._stats.rejected += 1
+        if by_deadline:
+            msg = "the timeout budget ran out while the request was queued for the client's request limits"
+            raise DeadlineExceededError(msg)
+        msg = "the request exceeded the client's request limits"
+        raise RequestLimitExceededError(msg)
+
+    def _completed(self, sent_at: float, error: Optional[BaseException]) -> None:
+        """Feed back how a request went to the concurrency limit.
+
+        Errors other than overload errors, e.g. the cancellation of the losing request of a hedge, say nothing about
+        the capacity of the feature server.
+        """
+        if isinstance(error, _OVERLOAD_ERRORS):
+            self._gate.limit.on_overload(sent_at)
+        elif error is None:
+            self._gate.limit.on_success(sent_at, time.monotonic() - sent_at, self._gate.in_flight - 1)
+
+    @property
+    def stats(self) -> RequestLimitStats:
+        with self._stats_lock:
+            stats = RequestLimitStats(**vars(self._stats))
+        if self._gate is not None:
+            stats.concurrency_limit = self._gate.limit.limit
+        return stats
+
+
+class RequestLimiter(_RequestLimiterBase):
+    """Enforces RequestLimits on requests sent from any number of threads"""
+
+    def __init__(self, limits: RequestLimits):
+        super().__init__(limits)
+        concurrency_limit = limits.get_concurrency_limit()
+        self._gate = _ConcurrencyGate(concurrency_limit) if concurrency_limit is not None else None
+
+    @contextlib.contextmanager
+    def limit(self, deadline: Optional[Deadline] = None) -> Iterator[None]:
+        """Wait until a request can be sent within the limits, and count it as in flight until the block exits"""
+        start = time.monotonic()
+        max_wait, by_deadline = self._get_max_wait(deadline)
+        self._queued(1)
+        try:
+            if self._gate is not None and not self._gate.acquire(max_wait):
+                self._reject(by_deadline)
+            if self._bucket is not None:
+                wait = self._bucket.reserve(None if max_wait is None else max_wait - (time.monotonic() - start))
+                if wait is None:
+                    if self._gate is not None:
+                        self._gate.release()
+                    self._reject(by_deadline)
+                time.sleep(wait)
+        finally:
+            self._queued(-1)
+
+        sent_at = time.monotonic()
+        self._admitted(sent_at - start)
+        error = None
+        try:
+            yield
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            self._released()
+            if self._gate is not None:
+                self._completed(sent_at, error)
+                self._gate.release()
+
+
+class AsyncRequestLimiter(_RequestLimiterBase):
+    """Enforces RequestLimits on requests sent from a single event loop"""
+
+    def __init__(self, limits: RequestLimits):
+        super().__init__(limits)
+        concurrency_limit = limits.get_concurrency_limit()
+        self._gate = _AsyncConcurrencyGate(concurrency_limit) if concurrency_limit is not None else None
+
+    @contextlib.asynccontextmanager
+    async def limit(self, deadline: Optional[Deadline] = None) -> AsyncIterator[None]:
+        """Wait until a request can be sent within the limits, and count it as in flight until the block exits"""
+        start = time.monotonic()
+        max_wait, by_deadline = self._get_max_wait(deadline)
+        self._queued(1)
+        try:
+            if self._gate is not None:
+                if max_wait == 0:
+                    if self._gate.locked():
+                        self._reject(by_deadline)
+                    await self._gate.acquire()
+                else:
+                    try:
+                        await asyncio.wait_for(self._gate.acquire(), max_wait)
+                    except asyncio.TimeoutError:
+                        self._reject(by_deadline)
+            if self._bucket is not None:
+                wait = self._bucket.reserve(None if max_wait is None else max_wait - (time.monotonic() - start))
+                if wait is None:
+                    if self._gate is not None:
+                        self._gate.release()
+                    self._reject(by_deadline)
+                try:
+                    await asyncio.sleep(wait)
+                except asyncio.CancelledError:
+                    if self._gate is not None:
+                        self._gate.release()
+                    raise
+        finally:
+            self._queued(-1)
+
+        sent_at = time.monotonic()
+        self._admitted(sent_at - start)
+        error = None
+        try:
+            yield
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            self._released()
+            if self._gate is not None:
+                self._completed(sent_at, error)
+                self._gate.release()
+
+
+class RequestLimiters:
+    """The request limiters of a client: one per feature service with its own limits, and one shared by the others.
+
+    Limiters are created on first use, so that async limiters are created in the event loop they are used in.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[RequestLimits],
+        limits_by_feature_service: Optional[Dict[str, RequestLimits]],
+        limiter_class: type,
+    ):
+        self._limits = limits
+        self._limits_by_feature_service = limits_by_feature_service or {}
+        self._limiter_class = limiter_class
+        self._limiters: Dict[Optional[str], Union[RequestLimiter, AsyncRequestLimiter]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, feature_service: Optional[str]) -> Optional[Union[RequestLimiter, AsyncRequestLimiter]]:
+        """The limiter for requests to the feature service, with the given name or id, or None if it has no limits"""
+        if feature_service not in self._limits_by_feature_service:
+            if self._limits is None:
+                return None
+            # feature services without their own limits share the default limiter
+            feature_service = None
+        limiter = self._limiters.get(feature_service)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.get(feature_service)
+                if limiter is None:
+                    limits = self._limits_by_feature_service.get(feature_service, self._limits)
+                    limiter = self._limiters[feature_service] = self._limiter_class(limits)
+        return limiter
+
+    def reset_after_fork(self) -> None:
+        """Drop the limiters in a forked process: their slots may be held by requests of the parent's threads, and the
+        waiters of async limiters belong to the parent's event loop"""
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self) -> Dict[Optional[str], RequestLimitStats]:
+        return {feature_service: limiter.stats for feature_service, limiter in list(self._limiters.items())}
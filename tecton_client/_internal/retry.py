@@ -0,0 +1,155 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Collection, Optional
+
+import httpx
+
+from tecton_client.exceptions import TectonHttpException
+
+DEFAULT_RETRYABLE_STATUS_CODES = frozenset({429, 503, 504})
+
+
+class RetryBudget:
+    """Limits retries to a fraction of the requests sent, so that retries cannot multiply load during an outage.
+
+    Every request deposits ratio tokens and every retry withdraws one. To allow retries at low traffic, tokens are
+    also added at min_retries_per_second. The budget can be shared between clients.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries_per_second: float = 10.0, max_tokens: float = 100.0):
+        """Constructor for the budget
+
+        Args:
+            ratio: The number of retries allowed per request sent.
+            min_retries_per_second: The rate of retries allowed regardless of traffic.
+            max_tokens: The maximum number of retries which can be saved up.
+        """
+        self.ratio = ratio
+        self.min_retries_per_second = min_retries_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._tokens = min(self.max_tokens, self._tokens + elapsed * self.min_retries_per_second)
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        retryable_status_codes: Collection[int] = DEFAULT_RETRYABLE_STATUS_CODES,
+        retry_transport_errors: bool = True,
+        initial_backoff_seconds: float = 0.05,
+        max_backoff_seconds: float = 1.0,
+        backoff_multiplier: float = 2.0,
+        respect_retry_after: bool = True,
+        max_retry_after_seconds: float = 5.0,
+        total_deadline_seconds: Optional[float] = None,
+        budget: Optional[RetryBudget] = None,
+    ):
+        """Options for retrying failed requests to the feature server
+
+        Args:
+            max_attempts: The maximum number of attempts per request, including the first one.
+            retryable_status_codes: The http status codes which are retried.
+            retry_transport_errors: Whether to retry connection errors and timeouts (httpx.TransportError).
+            initial_backoff_seconds: The maximum delay before the first retry. Delays are drawn uniformly between 0
+                and the exponential backoff ("full jitter").
+            max_backoff_seconds: The cap on the exponential backoff.
+            backoff_multiplier: The growth factor of the backoff per attempt.
+            respect_retry_after: Whether to wait for the delay in a Retry-After response header instead of the backoff.
+            max_retry_after_seconds: Responses asking to wait longer than this are not retried.
+            total_deadline_seconds: The time after the first attempt after which no more retries are started.
+            budget: The RetryBudget shared by all requests of the client. Defaults to a RetryBudget with default
+                settings per client.
+        """
+        if max_attempts < 1:
+            msg = "max_attempts must be at least 1"
+            raise ValueError(msg)
+        self.max_attempts = max_attempts
+        self.retryable_status_codes = frozenset(retryable_status_codes)
+        self.retry_transport_errors = retry_transport_errors
+        self.initial_backoff_seconds = initial_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.backoff_multiplier = backoff_multiplier
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after_seconds = max_retry_after_seconds
+        self.total_deadline_seconds = total_deadline_seconds
+        self.budget = budget if budget is not None else RetryBudget()
+
+    def is_retryable(self, exc: Exception) -> bool:
+        if isinstance(exc, TectonHttpException):
+            return exc.status_code in self.retryable_status_codes
+        return self.retry_transport_errors and isinstance(exc, httpx.TransportError)
+
+    def backoff(self, attempt: int) -> float:
+        """The delay before retrying after the given (1-based) attempt failed, with full jitter"""
+        cap = min(self.max_backoff_seconds, self.initial_backoff_seconds * self.backoff_multiplier ** (attempt - 1))
+        return random.uniform(0, cap)
+
+    def get_retry_delay(
+        self, exc: Exception, attempt: int, elapsed_seconds: float, remaining_seconds: Optional[float] = None
+    ) -> Optional[float]:
+        """How long to wait before retrying after the given attempt failed with exc, or None to not retry
+
+        remaining_seconds is the time left in the timeout budget of the call, if it has one.
+        """
+        if attempt >= self.max_attempts or not self.is_retryable(exc):
+            return None
+        delay = self.backoff(attempt)
+        if self.respect_retry_after:
+            retry_after = get_retry_after_seconds(exc)
+            if retry_after is not None:
+                if retry_after > self.max_retry_after_seconds:
+                    return None
+                delay = retry_after
+        if self.total_deadline_seconds is not None and elapsed_seconds + delay >= self.total_deadline_seconds:
+            return None
+        if remaining_seconds is not None and delay >= remaining_seconds:
+            return None
+        if not self.budget.try_withdraw():
+            return None
+        return delay
+
+
+def get_retry_after_seconds(exc: Exception) -> Optional[float]:
+    """The delay requested by the Retry-After header of the response which caused exc, if any"""
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    retry_after = response.headers.get("Retry-After")
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
@@ -0,0 +1,281 @@
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Hashable, Iterator, Optional, Tuple
+
+from tecton_client._internal.cache import DEFAULT_CACHE_MAX_SIZE, DEFAULT_CACHE_TTL_SECONDS, CacheStats
+from tecton_client._internal.codec import get_codec
+from tecton_client._internal.data_types import GetFeaturesResponse, GetFeaturesResult
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+DEFAULT_SLOT_SIZE_BYTES = 2048
+
+# the number of slots a key may be stored in; a full set evicts the entry which expires first
+_WAYS = 8
+_MAX_LOCK_STRIPES = 64
+# serialized responses above this size are compressed if that makes them smaller
+_COMPRESS_THRESHOLD_BYTES = 512
+# how often a read is retried while a writer is updating the slot, before it counts as a miss
+_READ_ATTEMPTS = 3
+
+# the file starts with a header page: the layout of the slots, then one byte per lock stripe for the file locks
+_HEADER = struct.Struct("<8sIIQQ")
+_MAGIC = b"TECTNFC\x00"
+_VERSION = 1
+_LOCKS_OFFSET = 64
+_SLOTS_OFFSET = 4096
+# a slot is a sequence number, the key, the wall clock expiry time, the payload length and flags, then the payload.
+# The sequence number is odd while a writer is updating the slot, so readers need no lock.
+_SLOT_HEADER = struct.Struct("<Q16sdII")
+_SEQUENCE = struct.Struct("<Q")
+_COMPRESSED = 1
+_EMPTY_KEY = bytes(16)
+
+
+def _require_fcntl():
+    if fcntl is None:
+        msg = "SharedFeatureCache requires a POSIX platform with fcntl file locks"
+        raise ImportError(msg)
+
+
+def _slot_key(key: Hashable) -> bytes:
+    # the clients' cache keys are 16 byte digests already
+    if key.__class__ is bytes and len(key) == 16:
+        return key
+    data = key if isinstance(key, bytes) else repr(key).encode("utf8")
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class SharedFeatureCache:
+    """A cache of GetFeaturesResponses in a memory mapped file, shared by all processes on a host which open it.
+
+    A drop-in replacement for FeatureCache for pre-fork servers (gunicorn, uWSGI): a response retrieved by one worker
+    process is served to all others, so hit rates grow with the traffic of the host rather than of each worker. Open
+    the same path in every worker, or create the cache without a path before the workers are forked, and pass it to
+    each worker's client.
+
+    The file is a fixed size hash table of max_size slots of slot_size_bytes each. Responses are stored as json,
+    compressed when large, and responses which don't fit in a slot are not cached. Reads take no locks; writes lock
+    one of a fixed set of stripes, across threads and processes. Expired entries are replaced first, then the entry
+    which expires soonest. Expiry times are wall clock times, as they are shared between processes.
+
+    The hit, miss, eviction and expiration counters of stats are those of the current process, size is the number of
+    live entries in the file.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_size: int = DEFAULT_CACHE_MAX_SIZE,
+        default_ttl_seconds: float = DEFAULT_CACHE_TTL_SECONDS,
+        ttl_seconds_by_feature_service: Optional[Dict[str, float]] = None,
+        slot_size_bytes: int = DEFAULT_SLOT_SIZE_BYTES,
+    ):
+        """Constructor for the cache
+
+        Args:
+            path: The file backing the cache, created if it doesn't exist, else opened with the same max_size and
+                slot_size_bytes. If None, an anonymous temporary file is used, shared with the processes forked
+                after the cache is created.
+            max_size: The number of responses the file has room for. It is rounded up to a multiple of 8.
+            default_ttl_seconds: How long a response is served from the cache after it was retrieved.
+            ttl_seconds_by_feature_service: Overrides of default_ttl_seconds, keyed by feature service name or id.
+                A ttl of 0 disables caching for that feature service.
+            slot_size_bytes: The size of a slot, which bounds the size of a cached response.
+        """
+        _require_fcntl()
+        if max_size < 1:
+            msg = "max_size must be at least 1"
+            raise ValueError(msg)
+        if slot_size_bytes <= _SLOT_HEADER.size:
+            msg = f"slot_size_bytes must be more than {_SLOT_HEADER.size}"
+            raise ValueError(msg)
+        self.path = path
+        self.default_ttl_seconds = default_ttl_seconds
+        self.ttl_seconds_by_feature_service = dict(ttl_seconds_by_feature_service or {})
+        self.slot_size_bytes = slot_size_bytes
+        self._buckets = -(-max_size // _WAYS)
+        self.max_size = self._buckets * _WAYS
+        self._capacity = slot_size_bytes - _SLOT_HEADER.size
+        self._codec = get_codec()
+
+        if path is None:
+            self._file = tempfile.TemporaryFile()
+            self._fd = self._file.fileno()
+        else:
+            self._file = None
+            self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            self._init_file()
+            self._mmap = mmap.mmap(self._fd, _SLOTS_OFFSET + self.max_size * slot_size_bytes)
+        except BaseException:
+            self._close_file()
+            raise
+
+        self._stripes = min(self._buckets, _MAX_LOCK_STRIPES)
+        # file locks are held by the process, so the threads of a process also take a lock of their own
+        self._thread_locks = [threading.Lock() for _ in range(self._stripes)]
+        self._stats_lock = threading.Lock()
+        self._stats = CacheStats()
+
+    def _init_file(self) -> None:
+        header = _HEADER.pack(_MAGIC, _VERSION, _WAYS, self._buckets, self.slot_size_bytes)
+        # the first process to open a new file sizes it and writes the header, the others check they agree
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, 0)
+        try:
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, _SLOTS_OFFSET + self._buckets * _WAYS * self.slot_size_bytes)
+                os.pwrite(self._fd, header, 0)
+            elif os.pread(self._fd, _HEADER.size, 0) != header:
+                msg = (
+                    f"{self.path} is not a SharedFeatureCache file with max_size {self.max_size} and "
+                    f"slot_size_bytes {self.slot_size_bytes}"
+                )
+                raise ValueError(msg)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, 0)
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        else:
+            os.close(self._fd)
+
+    def get_ttl_seconds(self, feature_service: str) -> float:
+        return self.ttl_seconds_by_feature_service.get(feature_service, self.default_ttl_seconds)
+
+    def _bucket(self, key: bytes) -> int:
+        return int.from_bytes(key[:8], "little") % self._buckets
+
+    def _slot_offsets(self, bucket: int) -> range:
+        start = _SLOTS_OFFSET + bucket * _WAYS * self.slot_size_bytes
+        return range(start, start + _WAYS * self.slot_size_bytes, self.slot_size_bytes)
+
+    @contextmanager
+    def _locked(self, bucket: int) -> Iterator[None]:
+        stripe = bucket % self._stripes
+        with self._thread_locks[stripe]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, _LOCKS_OFFSET + stripe)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, _LOCKS_OFFSET + stripe)
+
+    def _read(self, offset: int, key: bytes) -> Optional[Tuple[float, int, bytes]]:
+        """The expiry time, flags and payload of the slot at offset if it holds key"""
+        mm = self._mmap
+        for _ in range(_READ_ATTEMPTS):
+            sequence, slot_key, expires_at, length, flags = _SLOT_HEADER.unpack_from(mm, offset)
+            if sequence & 1:
+                continue
+            if slot_key != key:
+                return None
+            start = offset + _SLOT_HEADER.size
+            payload = mm[start : start + min(length, self._capacity)]
+            # a writer which updated the slot in the meantime may have torn the read
+            if _SEQUENCE.unpack_from(mm, offset)[0] == sequence:
+                return expires_at, flags, payload
+        return None
+
+    def get(self, key: Hashable) -> Optional[GetFeaturesResponse]:
+        key = _slot_key(key)
+        entry = None
+        for offset in self._slot_offsets(self._bucket(key)):
+            entry = self._read(offset, key)
+            if entry is not None:
+                break
+        expired = entry is not None and entry[0] <= time.time()
+        with self._stats_lock:
+            if entry is None or expired:
+                self._stats.misses += 1
+                self._stats.expirations += expired
+                return None
+            self._stats.hits += 1
+        _, flags, payload = entry
+        if flags & _COMPRESSED:
+            payload = zlib.decompress(payload)
+        features, metadata = self._codec.decode(payload)
+        return GetFeaturesResponse(GetFeaturesResult(features), metadata)
+
+    def put(self, key: Hashable, response: GetFeaturesResponse, feature_service: str) -> None:
+        ttl_seconds = self.get_ttl_seconds(feature_service)
+        if ttl_seconds <= 0:
+            return
+        payload = self._codec.encode([response.result.features, response.metadata])
+        flags = 0
+        if len(payload) > _COMPRESS_THRESHOLD_BYTES:
+            compressed = zlib.compress(payload, 1)
+            if len(compressed) < len(payload):
+                payload, flags = compressed, _COMPRESSED
+        if len(payload) > self._capacity:
+            return
+
+        key = _slot_key(key)
+        bucket = self._bucket(key)
+        mm = self._mmap
+        now = time.time()
+        with self._locked(bucket):
+            # the slot holding key, else an empty or expired slot, else the one which expires soonest
+            target, target_expires_at = None, None
+            for offset in self._slot_offsets(bucket):
+                _, slot_key, expires_at, _, _ = _SLOT_HEADER.unpack_from(mm, offset)
+                if slot_key == key:
+                    target, target_expires_at = offset, 0.0
+                    break
+                if target is None or expires_at < target_expires_at:
+                    target, target_expires_at = offset, expires_at
+            sequence = _SEQUENCE.unpack_from(mm, target)[0]
+            _SEQUENCE.pack_into(mm, target, sequence + 1)
+            start = target + _SLOT_HEADER.size
+            mm[start : start + len(payload)] = payload
+            _SLOT_HEADER.pack_into(mm, target, sequence + 1, key, now + ttl_seconds, len(payload), flags)
+            _SEQUENCE.pack_into(mm, target, sequence + 2)
+        if target_expires_at > now:
+            with self._stats_lock:
+                self._stats.evictions += 1
+
+    def clear(self) -> None:
+        mm = self._mmap
+        for bucket in range(self._buckets):
+            with self._locked(bucket):
+                for offset in self._slot_offsets(bucket):
+                    sequence = _SEQUENCE.unpack_from(mm, offset)[0]
+                    _SEQUENCE.pack_into(mm, offset, sequence + 1)
+                    _SLOT_HEADER.pack_into(mm, offset, sequence + 2, _EMPTY_KEY, 0.0, 0, 0)
+
+    def close(self) -> None:
+        """Unmap and close the file. Entries stay in the file for the other processes which have it open."""
+        self._mmap.close()
+        self._close_file()
+
+    @property
+    def stats(self) -> CacheStats:
+        """A snapshot of the hit, miss and eviction counters of this process, and the size of the cache"""
+        size = len(self)
+        with self._stats_lock:
+            return CacheStats(
+                hits=self._stats.hits,
+                misses=self._stats.misses,
+                evictions=self._stats.evictions,
+                expirations=self._stats.expirations,
+                size=size,
+            )
+
+    def __len__(self) -> int:
+        now = time.time()
+        mm = self._mmap
+        return sum(
+            1
+            for offset in range(_SLOTS_OFFSET, len(mm), self.slot_size_bytes)
+            if _SLOT_HEADER.unpack_from(mm, offset)[2] > now
+        )
@@ -0,0 +1,35 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into a single call whose result, or exception, all callers share.
+
+    Must only be used from a single event loop.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self.deduplicated = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._in_flight.get(key)
+        if task is None:
+            # the call runs in its own task so that cancelling the caller which started it doesn't fail the others
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._done(key, done))
+        else:
+            self.deduplicated += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: "asyncio.Future[Any]") -> None:
+        del self._in_flight[key]
+        if not task.cancelled():
+            # mark the exception as retrieved, in case every caller was cancelled before it was raised
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable, Optional, Set, Tuple
+
+import httpx
+
+from tecton_client._internal.data_types import GetFeaturesResponse
+from tecton_client.exceptions import DeadlineExceededError, GatewayTimeoutError, ServiceUnavailableError
+
+DEFAULT_STALE_MAX_SIZE = 100_000
+DEFAULT_MAX_STALENESS_SECONDS = 300.0
+
+# the errors of a get_features call which are answered from a StaleFallbackStore: the feature server or the network
+# path to it is down or overloaded, or the timeout budget ran out
+FALLBACK_ERRORS = (ServiceUnavailableError, GatewayTimeoutError, DeadlineExceededError, httpx.TransportError)
+
+
+@dataclass
+class StaleFallbackStats:
+    hits: int = 0
+    misses: int = 0
+    refreshes: int = 0
+    evictions: int = 0
+    size: int = 0
+
+
+class StaleFallbackStore:
+    """Keeps the last good get_features response of each request, to be served while the feature server is failing.
+
+    Unlike a FeatureCache, the store is never read while the feature server answers. When a get_features call fails
+    with a ServiceUnavailableError, a GatewayTimeoutError, a transport error or runs out of its timeout budget, the
+    client returns the stored response, flagged with is_stale=True, if it is at most max_staleness_seconds old, and
+    retrieves the features again in the background to refresh the store. Entries are keyed like the cache entries.
+    The store is safe to share between threads and between clients.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_STALE_MAX_SIZE,
+        max_staleness_seconds: float = DEFAULT_MAX_STALENESS_SECONDS,
+    ):
+        """Constructor for the store
+
+        Args:
+            max_size: The maximum number of responses to keep. The least recently stored response is evicted first.
+            max_staleness_seconds: The age after which a response is no longer served.
+        """
+        if max_size < 1:
+            msg = "max_size must be at least 1"
+            raise ValueError(msg)
+        self.max_size = max_size
+        self.max_staleness_seconds = max_staleness_seconds
+        # key -> (time stored, response), ordered from least to most recently stored
+        self._entries: "OrderedDict[Hashable, Tuple[float, GetFeaturesResponse]]" = OrderedDict()
+        # the keys with a refresh in flight
+        self._refreshing: Set[Hashable] = set()
+        self._lock = threading.Lock()
+        self._stats = StaleFallbackStats()
+
+    def put(self, key: Hashable, response: GetFeaturesResponse) -> None:
+        stored_at = time.monotonic()
+        with self._lock:
+            self._entries[key] = (stored_at, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+
+    def get(self, key: Hashable) -> Optional[GetFeaturesResponse]:
+        """The stored response for key flagged as stale, or None if there is none younger than max_staleness_seconds"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] > self.max_staleness_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            self._stats.hits += 1
+        response = entry[1]
+        # the stored response is shared by every call which falls back to it, so the flag goes on a copy
+        return GetFeaturesResponse(response.result, response._metadata, is_stale=True)
+
+    def start_refresh(self, key: Hashable) -> bool:
+        """Whether the caller should refresh the response for key, i.e. no other refresh of it is in flight. The caller
+        calls finish_refresh when it is done."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self._stats.refreshes += 1
+            return True
+
+    def finish_refresh(self, key: Hashable) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def reset_after_fork(self) -> None:
+        """Forget the refreshes in flight in the parent process, which never finish in a forked process"""
+        self._lock = threading.Lock()
+        self._refreshing = set()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self) -> StaleFallbackStats:
+        """A snapshot of the hit, miss, refresh and eviction counters"""
+        with self._lock:
+            return StaleFallbackStats(
+                hits=self._stats.hits,
+                misses=self._stats.misses,
+                refreshes=self._stats.refreshes,
+                evictions=self._stats.evictions,
+                size=len(self._entries),
+            )
+
+    def __len__(self) -> int:
+        return len(self._entries)
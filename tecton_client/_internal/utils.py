@@ -1,14 +1,28 @@
-from typing import Any, Dict, Optional, Union
+import hashlib
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar, Union
 
 import httpx
 
 from tecton_client.__about__ import __version__ as tecton_version
-from tecton_client._internal.data_types import MetadataOptions, RequestOptions
+from tecton_client._internal.data_types import GetFeaturesRequestData, MetadataOptions, RequestOptions
+
+T = TypeVar("T")
+
+DEFAULT_MICRO_BATCH_SIZE = 5
+
+# the default number of requests in flight of the bulk apis of AsyncTectonClient
+DEFAULT_MAX_CONCURRENCY = 16
 
 
 def get_default_headers(api_key):
     return httpx.Headers(
-        {"Authorization": "Tecton-key " + api_key, "User-Agent": "tecton-http-python-client " + tecton_version}
+        {
+            "Authorization": "Tecton-key " + api_key,
+            "User-Agent": "tecton-http-python-client " + tecton_version,
+            # request bodies are encoded by the client's codec and sent as raw content
+            "Content-Type": "application/json",
+        }
     )
 
 
@@ -42,6 +56,47 @@ def build_get_features_request(
     return request_data
 
 
+def build_get_features_batch_request(
+    feature_service_id: str,
+    feature_service_name: str,
+    request_data: List[GetFeaturesRequestData],
+    metadata_options: Optional[MetadataOptions] = None,
+    workspace_name: Optional[str] = None,
+    request_options: Optional[Dict[str, bool]] = None,
+    allow_partial_results: bool = False,
+):
+    request = build_get_features_request(
+        feature_service_id=feature_service_id,
+        feature_service_name=feature_service_name,
+        metadata_options=metadata_options,
+        workspace_name=workspace_name,
+        request_options=request_options,
+        allow_partial_results=allow_partial_results,
+    )
+    params = request["params"]
+    # the batch api takes a list of rows in place of a single join key map and request context map
+    del params["joinKeyMap"]
+    del params["requestContextMap"]
+    params["requestData"] = [row.to_request() for row in request_data]
+    return request
+
+
+def split_into_micro_batches(items: Sequence[T], micro_batch_size: int) -> List[Sequence[T]]:
+    if micro_batch_size < 1:
+        msg = "micro_batch_size must be at least 1"
+        raise ValueError(msg)
+    return [items[i : i + micro_batch_size] for i in range(0, len(items), micro_batch_size)]
+
+
+async def as_async_iterator(items: Union[Iterable[T], AsyncIterable[T]]) -> AsyncIterator[T]:
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
 def build_get_feature_service_metadata_request(
     feature_service_name: Optional[str] = None,
     feature_service_id: Optional[str] = None,
@@ -56,6 +111,76 @@ def build_get_feature_service_metadata_request(
     }
 
 
+def _canonical_json(obj: Any) -> bytes:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str).encode("utf8")
+
+
+def get_features_cache_key_hasher(
+    workspace_name: str,
+    feature_service_name: Optional[str],
+    feature_service_id: Optional[str],
+    metadata_options: Optional[MetadataOptions] = None,
+) -> "hashlib.blake2b":
+    """A hasher over the parts of a get_features cache key which do not change between join keys"""
+    if not metadata_options:
+        metadata_options = MetadataOptions()
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(
+        _canonical_json([workspace_name, feature_service_name, feature_service_id, metadata_options.to_request()])
+    )
+    return hasher
+
+
+def finish_features_cache_key(
+    hasher: "hashlib.blake2b",
+    join_key_map: Optional[Dict[str, Optional[Union[int, str]]]] = None,
+    request_context_map: Optional[Dict[str, Any]] = None,
+) -> bytes:
+    hasher = hasher.copy()
+    hasher.update(_canonical_json([join_key_map or {}, request_context_map or {}]))
+    return hasher.digest()
+
+
+def get_features_cache_key(
+    workspace_name: str,
+    feature_service_name: Optional[str],
+    feature_service_id: Optional[str],
+    join_key_map: Optional[Dict[str, Optional[Union[int, str]]]] = None,
+    request_context_map: Optional[Dict[str, Any]] = None,
+    metadata_options: Optional[MetadataOptions] = None,
+) -> bytes:
+    """A canonical key for a get_features request, independent of the order of the join keys and request context"""
+    hasher = get_features_cache_key_hasher(workspace_name, feature_service_name, feature_service_id, metadata_options)
+    return finish_features_cache_key(hasher, join_key_map, request_context_map)
+
+
+def get_features_request_key(
+    cache_key: bytes, request_options: Optional[RequestOptions], allow_partial_results: bool
+) -> Tuple[bytes, Optional[Tuple[bool, bool]], bool]:
+    """A canonical key for everything that affects the result of a get_features request"""
+    options = None if request_options is None else (request_options.read_from_cache, request_options.write_to_cache)
+    return cache_key, options, allow_partial_results
+
+
+def get_micro_batch_key(
+    feature_service_id: Optional[str],
+    feature_service_name: Optional[str],
+    workspace_name: str,
+    metadata_options: Optional[MetadataOptions] = None,
+    request_options: Optional[RequestOptions] = None,
+    allow_partial_results: bool = False,
+) -> tuple:
+    """A key which is equal for get_features requests that can be sent together in one batch request"""
+    return (
+        feature_service_id,
+        feature_service_name,
+        workspace_name,
+        tuple((metadata_options or MetadataOptions()).to_request().values()),
+        tuple((request_options or RequestOptions()).to_request().values()),
+        allow_partial_results,
+    )
+
+
 def validate_request_args(
     feature_service_name: Optional[str] = None,
     feature_service_id: Optional[str] = None,
@@ -1,3 +1,5 @@
+from typing import Optional
+
 import httpx
 
 
@@ -6,10 +8,12 @@ class TectonHttpException(Exception):
 
     STATUS_CODE = 0
 
-    def __init__(self, status_code: int, reason_phrase: str, message: str):
+    def __init__(self, status_code: int, reason_phrase: str, message: str, response: Optional[httpx.Response] = None):
         """Create a TectonHttpException"""
-        self.status_code: int
+        self.status_code = status_code
         self.message = f"{status_code} {reason_phrase}: {message}"
+        # the error response, e.g. for its Retry-After header
+        self.response = response
         super().__init__(self.message)
 
 
@@ -55,17 +59,30 @@ class GatewayTimeoutError(TectonHttpException):
     STATUS_CODE = 504
 
 
+class DeadlineExceededError(TimeoutError):
+    """Raised when the timeout budget of a call runs out before the Tecton API responds."""
+
+
+class RequestLimitExceededError(Exception):
+    """Raised when a request cannot be sent within the client's request limits in time, without contacting Tecton."""
+
+
 _HTTP_ERRORS: dict = {error.STATUS_CODE: error for error in TectonHttpException.__subclasses__()}
 
 
 def convert_exception(httpx_exception: httpx.HTTPStatusError) -> TectonHttpException:
     """Convert a httpx.HTTPStatusError into a TectonHttpException for better message formatting"""
-    status_code = httpx_exception.response.status_code
+    response = httpx_exception.response
+    status_code = response.status_code
     exception_class = _HTTP_ERRORS.get(status_code)
     if exception_class:
-        message = httpx_exception.response.json().get("message")
+        try:
+            message = response.json().get("message")
+        except ValueError:
+            # e.g. an html error page from a load balancer in front of the feature server
+            message = response.text
         return exception_class(
-            status_code=status_code, reason_phrase=httpx_exception.response.reason_phrase, message=message
+            status_code=status_code, reason_phrase=response.reason_phrase, message=message, response=response
         )
     else:
-        return TectonHttpException(status_code, httpx_exception.response.reason_phrase, "")
+        return TectonHttpException(status_code, response.reason_phrase, "", response=response)
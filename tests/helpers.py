@@ -0,0 +1,32 @@
+"""Clients and responses shared by the tests"""
+
+import httpx
+
+from tecton_client import AsyncTectonClient, GetFeaturesResponse, TectonClient
+from tecton_client._internal.data_types import GetFeaturesResult
+
+
+def make_client(handler, **kwargs) -> TectonClient:
+    """A client whose requests are answered by handler, as by httpx.MockTransport"""
+    return TectonClient(
+        url="https://fake.tecton.ai",
+        api_key="fake-api-key",
+        default_workspace_name="workspace",
+        client=httpx.Client(transport=httpx.MockTransport(handler)),
+        **kwargs,
+    )
+
+
+def make_async_client(server, **kwargs) -> AsyncTectonClient:
+    """An async client whose requests are answered by a StandInFeatureServer"""
+    return AsyncTectonClient(
+        url="https://fake.tecton.ai",
+        api_key="fake-api-key",
+        default_workspace_name="workspace",
+        client=server.async_client(),
+        **kwargs,
+    )
+
+
+def make_response(features, metadata=None) -> GetFeaturesResponse:
+    return GetFeaturesResponse(result=GetFeaturesResult(features=features), metadata=metadata)
@@ -0,0 +1,302 @@
+"""Stand-in Tecton feature servers for the tests and the benchmarks.
+
+StandInFeatureServer scripts the latency and capacity of each request in-process, StandInServer answers with
+pre-encoded responses of a configurable size and latency distribution, and LoopbackFeatureServer and LoopbackServer
+serve over HTTP on 127.0.0.1, from a thread and from a child process respectively.
+
+Latency distributions of StandInConfig are given as strings:
+    constant:SECONDS, uniform:LOW:HIGH, exponential:MEAN, lognormal:MEDIAN:SIGMA
+"""
+
+import asyncio
+import json
+import math
+import multiprocessing
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Optional, Tuple
+
+import httpx
+
+
+class StandInFeatureServer:
+    """An in-process stand-in for the feature server's get-features api with injected latency and capacity limits.
+
+    Args:
+        latency: Returns the latency in seconds of the n-th (0-based) request.
+        capacity: Returns the number of requests the server can handle concurrently at the given time since the
+            server was created. Requests beyond the capacity are answered with a 429.
+    """
+
+    def __init__(
+        self,
+        latency: Callable[[int], float] = lambda n: 0.0,
+        capacity: Optional[Callable[[float], int]] = None,
+    ):
+        self.latency = latency
+        self.capacity = capacity
+        self.requests: List[dict] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.cancelled = 0
+        self.rejected = 0
+        self._started = time.monotonic()
+
+    def _admit(self, request: httpx.Request) -> Optional[httpx.Response]:
+        self.requests.append(json.loads(request.content.decode("utf8")))
+        if self.capacity is not None and self.in_flight >= self.capacity(time.monotonic() - self._started):
+            self.rejected += 1
+            return httpx.Response(429, json={"message": "resources exhausted"})
+        return None
+
+    def _response(self, request_number: int) -> httpx.Response:
+        request_data = self.requests[request_number]["params"].get("requestData")
+        if request_data is not None:
+            return httpx.Response(200, json={"result": [{"features": [request_number]} for _ in request_data]})
+        return httpx.Response(200, json={"result": {"features": [request_number]}})
+
+    async def handle_async(self, request: httpx.Request) -> httpx.Response:
+        rejected = self._admit(request)
+        if rejected is not None:
+            return rejected
+        request_number = len(self.requests) - 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency(request_number))
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        return self._response(request_number)
+
+    def async_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handle_async))
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """A function drawing a latency in seconds from the distribution described by spec"""
+    kind, *params = spec.split(":")
+    values = [float(param) for param in params]
+    if kind == "constant" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "exponential" and len(values) == 1:
+        return lambda rng: rng.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    msg = f"unknown latency distribution {spec!r}"
+    raise ValueError(msg)
+
+
+@dataclass
+class StandInConfig:
+    """How the stand-in feature server answers.
+
+    Args:
+        latency: The distribution of the server-side latency of each request, see parse_latency.
+        num_features: The number of features in each response.
+        value_size: The length of the string features; every third feature is a string.
+        include_metadata: Whether responses include the names and data types of the features.
+        error_rate: The fraction of requests answered with a 503.
+        seed: The seed of the latency and error draws.
+    """
+
+    latency: str = "constant:0"
+    num_features: int = 50
+    value_size: int = 16
+    include_metadata: bool = True
+    error_rate: float = 0.0
+    seed: int = 0
+
+
+class StandInServer:
+    """Pre-encodes the responses of a StandInConfig and answers get-features, get-features-batch and metadata
+    requests"""
+
+    def __init__(self, config: StandInConfig):
+        self.config = config
+        self._latency = parse_latency(config.latency)
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        features = [
+            "x" * config.value_size if i % 3 == 0 else (i if i % 3 == 1 else 0.5 * i)
+            for i in range(config.num_features)
+        ]
+        types = ["string", "int64", "float64"]
+        metadata = {
+            "features": [
+                {"name": f"fv_{i // 10}.feature_{i}", "dataType": {"type": types[i % 3]}}
+                for i in range(config.num_features)
+            ]
+        }
+        self._features = features
+        self._metadata = metadata if config.include_metadata else None
+        self.response_body = self._encode({"features": features}, self._metadata)
+        self.metadata_body = json.dumps(
+            {
+                "featureServiceType": "DEFAULT",
+                "inputJoinKeys": [{"name": "user_id", "dataType": {"type": "string"}}],
+                "inputRequestContextKeys": [],
+                "featureValues": metadata["features"],
+            }
+        ).encode("utf8")
+        self._batch_bodies = {}
+
+    @staticmethod
+    def _encode(result, metadata) -> bytes:
+        body = {"result": result}
+        if metadata is not None:
+            body["metadata"] = metadata
+        return json.dumps(body).encode("utf8")
+
+    def _draw(self) -> Tuple[float, bool]:
+        with self._lock:
+            return self._latency(self._rng), self._rng.random() < self.config.error_rate
+
+    def _body(self, path: str, request_body: bytes) -> bytes:
+        if path.endswith("metadata"):
+            return self.metadata_body
+        if not path.endswith("batch"):
+            return self.response_body
+        rows = len(json.loads(request_body)["params"]["requestData"])
+        body = self._batch_bodies.get(rows)
+        if body is None:
+            body = self._batch_bodies[rows] = self._encode([{"features": self._features}] * rows, self._metadata)
+        return body
+
+    def respond(self, path: str, request_body: bytes) -> Tuple[float, int, bytes]:
+        """The latency, status code and body of the response to a request"""
+        latency, failed = self._draw()
+        if failed:
+            return latency, 503, b'{"message": "service unavailable"}'
+        return latency, 200, self._body(path, request_body)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        latency, status_code, body = self.respond(request.url.path, request.read())
+        if latency > 0:
+            time.sleep(latency)
+        return httpx.Response(status_code, content=body)
+
+    async def handle_async(self, request: httpx.Request) -> httpx.Response:
+        latency, status_code, body = self.respond(request.url.path, await request.aread())
+        if latency > 0:
+            await asyncio.sleep(latency)
+        return httpx.Response(status_code, content=body)
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    def async_transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle_async)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # the headers and the body are separate writes, which Nagle's algorithm would hold back for a delayed ack
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        request_body = self.rfile.read(int(self.headers["Content-Length"]))
+        latency, status_code, body = self.server.respond(self.path, request_body)
+        if latency > 0:
+            time.sleep(latency)
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.server.head_requests.append(self.path)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    """Answers POST requests with respond(path, body), which returns the latency, status code and body of the response,
+    and HEAD requests with an empty 200"""
+
+    daemon_threads = True
+    # the default backlog of 5 drops connections of concurrent clients, which then retry after a second
+    request_queue_size = 1024
+
+    def __init__(self, respond: Callable[[str, bytes], Tuple[float, int, bytes]]):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.respond = respond
+        self.connections = 0
+        self.head_requests: List[str] = []
+        self.url = f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class LoopbackFeatureServer:
+    """A get-features api served over HTTP on 127.0.0.1 from a background thread, answering every request after a
+    fixed latency with the given status code, and HEAD requests with an empty 200. Use as a context manager; url is the
+    server's base url."""
+
+    def __init__(self, latency: float = 0.0, status_code: int = 200):
+        self.latency = latency
+        self.status_code = status_code
+        self.requests = 0
+        self._server = _HTTPServer(self._respond)
+        self.url = self._server.url
+
+    def _respond(self, path: str, request_body: bytes) -> Tuple[float, int, bytes]:
+        self.requests += 1
+        return self.latency, self.status_code, json.dumps({"result": {"features": [self.url]}}).encode("utf8")
+
+    @property
+    def connections(self) -> int:
+        return self._server.connections
+
+    @property
+    def head_requests(self) -> List[str]:
+        return self._server.head_requests
+
+    def __enter__(self) -> "LoopbackFeatureServer":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _serve(config: StandInConfig, port_queue: multiprocessing.Queue) -> None:
+    http_server = _HTTPServer(StandInServer(config).respond)
+    port_queue.put(http_server.server_address[1])
+    http_server.serve_forever()
+
+
+class LoopbackServer:
+    """Runs a StandInServer over HTTP on 127.0.0.1 in a child process, so that its CPU time is not counted as the
+    client's. Use as a context manager; url is the server's base url."""
+
+    def __init__(self, config: StandInConfig):
+        self.config = config
+        self.url: Optional[str] = None
+        self._process: Optional[multiprocessing.Process] = None
+
+    def __enter__(self) -> "LoopbackServer":
+        port_queue = multiprocessing.Queue()
+        self._process = multiprocessing.Process(target=_serve, args=(self.config, port_queue), daemon=True)
+        self._process.start()
+        self.url = f"http://127.0.0.1:{port_queue.get(timeout=10)}"
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._process.terminate()
+        self._process.join()
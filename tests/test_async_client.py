@@ -1,13 +1,27 @@
+import asyncio
 import json
-from unittest import TestCase
+import time
+from unittest import IsolatedAsyncioTestCase, TestCase
 from unittest.mock import MagicMock, patch
 
 import httpx
+from helpers import make_async_client
 from httpx import Headers
 from pytest import mark
+from stand_in_server import StandInFeatureServer
 
-from tecton_client import AsyncTectonClient, MetadataOptions, RequestOptions
-from tecton_client.exceptions import NotFoundError
+from tecton_client import (
+    AsyncTectonClient,
+    FeatureCache,
+    GetFeaturesRequestData,
+    HedgingPolicy,
+    HedgingStats,
+    MetadataOptions,
+    MicroBatchingOptions,
+    RequestOptions,
+    RetryPolicy,
+)
+from tecton_client.exceptions import NotFoundError, ServiceUnavailableError
 
 
 class TestTectonClient(TestCase):
@@ -32,7 +46,11 @@ class TestTectonClient(TestCase):
         AsyncTectonClient(url="https://fake.tecton.ai", api_key="fake-api-key", default_workspace_name="workspace")
         mock_httpx_constructor.assert_called_once_with(
             headers=Headers(
-                {"authorization": "Tecton-key fake-api-key", "user-agent": "tecton-http-python-client 0.1.0test"}
+                {
+                    "authorization": "Tecton-key fake-api-key",
+                    "user-agent": "tecton-http-python-client 0.1.0test",
+                    "content-type": "application/json",
+                }
             )
         )
 
@@ -47,7 +65,11 @@ class TestTectonClient(TestCase):
         mock_httpx_constructor.assert_not_called()
         self.assertEquals(
             mock_client.headers,
-            {"authorization": "Tecton-key fake-api-key", "user-agent": "tecton-http-python-client 0.1.0test"},
+            {
+                "authorization": "Tecton-key fake-api-key",
+                "user-agent": "tecton-http-python-client 0.1.0test",
+                "content-type": "application/json",
+            },
         )
 
     @mark.asyncio
@@ -100,7 +122,7 @@ class TestTectonClient(TestCase):
     async def test_get_features_encode(self):
         # using just magic_mock here in order to assert on client.post.assert_called_with
         mock_http_client = MagicMock()
-        mock_http_client.post.return_value.json.return_value = {"result": {"features": []}}
+        mock_http_client.post.return_value.content = b'{"result": {"features": []}}'
         client = AsyncTectonClient(
             url="https://fake.tecton.ai",
             api_key="fake-api-key",
@@ -113,9 +135,11 @@ class TestTectonClient(TestCase):
             metadata_options=MetadataOptions(include_effective_times=True, include_data_types=False),
             request_options=RequestOptions(read_from_cache=False),
         )
-        mock_http_client.post.assert_called_with(
-            "https://fake.tecton.ai/api/v1/feature-service/get-features",
-            json={
+        (url,), kwargs = mock_http_client.post.call_args
+        self.assertEqual(url, "https://fake.tecton.ai/api/v1/feature-service/get-features")
+        self.assertEqual(
+            json.loads(kwargs["content"]),
+            {
                 "params": {
                     "workspaceName": "workspace",
                     "featureServiceName": "fake-feature-service",
@@ -156,3 +180,404 @@ class TestTectonClient(TestCase):
         )
         with self.assertRaises(NotFoundError):
             await client.get_features(feature_service_name="fake-feature-service", join_key_map={"user_id": "id123"})
+
+
+class TestGetFeaturesBatch(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.request_log = []
+
+        def handler(request):
+            params = json.loads(request.content.decode("utf8"))["params"]
+            self.request_log.append(params)
+            if any(row["joinKeyMap"].get("user_id") == "bad" for row in params["requestData"]):
+                return httpx.Response(503, json={"message": "unavailable"})
+            return httpx.Response(
+                200, json={"result": [{"features": [row["joinKeyMap"]["user_id"]]} for row in params["requestData"]]}
+            )
+
+        self.client = AsyncTectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+
+    async def test_micro_batches_in_order(self):
+        rows = [GetFeaturesRequestData(join_key_map={"user_id": f"user_{i}"}) for i in range(12)]
+        resp = await self.client.get_features_batch(
+            feature_service_name="fake-feature-service", request_data=rows, micro_batch_size=5
+        )
+        self.assertEqual([r.result.features for r in resp.responses], [[f"user_{i}"] for i in range(12)])
+        self.assertEqual(resp.errors, [None] * 12)
+        self.assertEqual([len(params["requestData"]) for params in self.request_log], [5, 5, 2])
+
+    async def test_partial_results(self):
+        rows = [GetFeaturesRequestData(join_key_map={"user_id": user_id}) for user_id in ["a", "b", "bad", "c"]]
+        resp = await self.client.get_features_batch(
+            feature_service_name="fake-feature-service",
+            request_data=rows,
+            micro_batch_size=2,
+            allow_partial_results=True,
+        )
+        self.assertEqual([r.result.features for r in resp.responses[:2]], [["a"], ["b"]])
+        self.assertEqual(resp.responses[2:], [None, None])
+        self.assertIsInstance(resp.errors[3], ServiceUnavailableError)
+
+        with self.assertRaises(ServiceUnavailableError):
+            await self.client.get_features_batch(
+                feature_service_name="fake-feature-service", request_data=rows, micro_batch_size=2
+            )
+
+
+class TestCache(IsolatedAsyncioTestCase):
+    async def test_cache(self):
+        request_log = []
+
+        def handler(request):
+            request_log.append(json.loads(request.content.decode("utf8")))
+            return httpx.Response(200, json={"result": {"features": []}})
+
+        cache = FeatureCache()
+        client = AsyncTectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+            cache=cache,
+        )
+        for _ in range(3):
+            await client.get_features(feature_service_name="fake-feature-service", join_key_map={"user_id": "id123"})
+        self.assertEqual(len(request_log), 1)
+        self.assertEqual((cache.stats.hits, cache.stats.misses), (2, 1))
+
+        await client.get_features(
+            feature_service_name="fake-feature-service",
+            join_key_map={"user_id": "id123"},
+            request_options=RequestOptions(read_from_cache=False),
+        )
+        self.assertEqual(len(request_log), 2)
+
+
+class TestMetadataRegistry(IsolatedAsyncioTestCase):
+    async def test_warm_up_metadata(self):
+        request_log = []
+
+        def handler(request):
+            request_log.append(json.loads(request.content.decode("utf8"))["params"])
+            if request.url.path.endswith("/metadata"):
+                return httpx.Response(
+                    200,
+                    json={
+                        "featureServiceType": "DEFAULT",
+                        "inputJoinKeys": [{"name": "user_id", "dataType": {"type": "string"}}],
+                        "inputRequestContextKeys": [],
+                        "featureValues": [{"name": "fv.count", "dataType": {"type": "int64"}}],
+                    },
+                )
+            return httpx.Response(200, json={"result": {"features": ["12"]}})
+
+        client = AsyncTectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+        await client.warm_up_metadata(["fs_1"])
+        resp = await client.get_features(feature_service_name="fs_1", join_key_map={"user_id": "id123"})
+        self.assertFalse(request_log[-1]["metadataOptions"]["includeNames"])
+        self.assertEqual(resp.get_features_dict(), {"fv.count": 12})
+
+        client.start_metadata_refresh(interval_seconds=0.01)
+        await asyncio.sleep(0.05)
+        client.stop_metadata_refresh()
+        self.assertGreaterEqual(len(request_log), 3)
+
+
+class TestPreparedFeatureRequest(IsolatedAsyncioTestCase):
+    async def test_same_request_as_get_features(self):
+        request_log = []
+
+        def handler(request):
+            request_log.append(json.loads(request.content.decode("utf8")))
+            return httpx.Response(200, json={"result": {"features": [1]}})
+
+        client = AsyncTectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+        prepared = client.prepare(feature_service_name="fake-feature-service")
+        resp = await prepared.get({"user_id": "id123"}, {"amount": 1.5})
+        self.assertEqual(resp.result.features, [1])
+        await client.get_features(
+            feature_service_name="fake-feature-service",
+            join_key_map={"user_id": "id123"},
+            request_context_map={"amount": 1.5},
+        )
+        self.assertEqual(request_log[0], request_log[1])
+
+
+class TestCoalesceRequests(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.request_log = []
+
+        async def handler(request):
+            params = json.loads(request.content.decode("utf8"))["params"]
+            self.request_log.append(params)
+            await asyncio.sleep(0.01)
+            if params["joinKeyMap"]["user_id"] == "missing":
+                return httpx.Response(404, json={"message": "not found"})
+            return httpx.Response(200, json={"result": {"features": [params["joinKeyMap"]["user_id"]]}})
+
+        self.client = AsyncTectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+            coalesce_requests=True,
+        )
+
+    async def test_concurrent_calls_share_a_request(self):
+        responses = await asyncio.gather(
+            *(
+                self.client.get_features(feature_service_name="fs", join_key_map={"user_id": user_id})
+                for user_id in ["a", "a", "b", "a", "b"]
+            )
+        )
+        self.assertEqual([r.result.features for r in responses], [["a"], ["a"], ["b"], ["a"], ["b"]])
+        self.assertEqual(len(self.request_log), 2)
+        self.assertEqual(self.client.deduplicated_requests, 3)
+
+        # calls which are not concurrent are not coalesced
+        await self.client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"})
+        self.assertEqual(len(self.request_log), 3)
+
+    async def test_prepared_requests_are_coalesced(self):
+        prepared = self.client.prepare(feature_service_name="fs")
+        await asyncio.gather(
+            prepared.get({"user_id": "a"}),
+            self.client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"}),
+        )
+        self.assertEqual(len(self.request_log), 1)
+
+    async def test_shared_exception(self):
+        results = await asyncio.gather(
+            *(
+                self.client.get_features(feature_service_name="fs", join_key_map={"user_id": "missing"})
+                for _ in range(3)
+            ),
+            return_exceptions=True,
+        )
+        self.assertEqual(len(self.request_log), 1)
+        self.assertIsInstance(results[0], NotFoundError)
+        self.assertIs(results[0], results[1])
+        self.assertIs(results[0], results[2])
+
+    async def test_cancelling_first_caller(self):
+        first = asyncio.ensure_future(
+            self.client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"})
+        )
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(
+            self.client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"})
+        )
+        await asyncio.sleep(0)
+        first.cancel()
+        self.assertEqual((await second).result.features, ["a"])
+        self.assertEqual(len(self.request_log), 1)
+
+
+class TestMicroBatching(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.request_log = []
+
+        def handler(request):
+            params = json.loads(request.content.decode("utf8"))["params"]
+            self.request_log.append((request.url.path, params))
+            if any(row["joinKeyMap"]["user_id"] == "bad" for row in params["requestData"]):
+                return httpx.Response(503, json={"message": "unavailable"})
+            return httpx.Response(
+                200, json={"result": [{"features": [row["joinKeyMap"]["user_id"]]} for row in params["requestData"]]}
+            )
+
+        self.client = AsyncTectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+            micro_batching=MicroBatchingOptions(window_ms=20, max_rows=3),
+        )
+
+    async def test_concurrent_calls_are_batched(self):
+        user_ids = [f"user_{i}" for i in range(7)]
+        responses = await asyncio.gather(
+            *(self.client.get_features(feature_service_name="fs", join_key_map={"user_id": u}) for u in user_ids)
+        )
+        self.assertEqual([r.result.features for r in responses], [[u] for u in user_ids])
+        self.assertTrue(all(path.endswith("/get-features-batch") for path, _ in self.request_log))
+        self.assertEqual([len(params["requestData"]) for _, params in self.request_log], [3, 3, 1])
+        stats = self.client.micro_batch_stats
+        self.assertEqual((stats.batches, stats.rows, stats.batch_sizes), (3, 7, {3: 2, 1: 1}))
+
+    async def test_only_compatible_calls_are_batched(self):
+        await asyncio.gather(
+            self.client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"}),
+            self.client.get_features(feature_service_name="other_fs", join_key_map={"user_id": "b"}),
+            self.client.prepare(feature_service_name="fs").get({"user_id": "c"}),
+        )
+        batches = sorted((params["featureServiceName"], len(params["requestData"])) for _, params in self.request_log)
+        self.assertEqual(batches, [("fs", 2), ("other_fs", 1)])
+
+    async def test_batch_errors_are_raised_for_every_call(self):
+        results = await asyncio.gather(
+            *(
+                self.client.get_features(feature_service_name="fs", join_key_map={"user_id": u})
+                for u in ["a", "bad", "c", "d"]
+            ),
+            return_exceptions=True,
+        )
+        self.assertIsInstance(results[0], ServiceUnavailableError)
+        self.assertIsInstance(results[2], ServiceUnavailableError)
+        self.assertEqual(results[3].result.features, ["d"])
+
+
+class TestRetry(IsolatedAsyncioTestCase):
+    async def test_retries_until_success(self):
+        attempts = []
+
+        def handler(request):
+            attempts.append(request)
+            if len(attempts) < 3:
+                return httpx.Response(503, json={"message": "unavailable"})
+            return httpx.Response(200, json={"result": {"features": [1]}})
+
+        client = AsyncTectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+            retry_policy=RetryPolicy(initial_backoff_seconds=0.001),
+        )
+        resp = await client.get_features(feature_service_name="fs", join_key_map={"user_id": "id123"})
+        self.assertEqual(resp.result.features, [1])
+        self.assertEqual(len(attempts), 3)
+
+
+class TestHedging(IsolatedAsyncioTestCase):
+    async def test_hedge_wins_against_slow_replica(self):
+        # the first request hits a slow replica, the hedge a fast one
+        server = StandInFeatureServer(latency=lambda n: 1.0 if n == 0 else 0.005)
+        client = make_async_client(server, hedging_policy=HedgingPolicy(delay_seconds=0.02))
+
+        start = time.monotonic()
+        resp = await client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"})
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(resp.result.features, [1])
+        self.assertEqual(client.hedging_stats, HedgingStats(requests=1, hedges=1, hedge_wins=1))
+        await asyncio.sleep(0)
+        self.assertEqual(server.cancelled, 1)
+
+    async def test_fast_requests_are_not_hedged(self):
+        server = StandInFeatureServer(latency=lambda n: 0.001)
+        client = make_async_client(server, hedging_policy=HedgingPolicy(delay_seconds=0.05))
+        for _ in range(3):
+            await client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"})
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(client.hedging_stats.hedges, 0)
+
+    async def test_hedge_rate_budget(self):
+        server = StandInFeatureServer(latency=lambda n: 0.03)
+        client = make_async_client(server, hedging_policy=HedgingPolicy(delay_seconds=0.01, max_hedge_rate=0.25))
+        for _ in range(8):
+            await client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"})
+        # one hedge from the initial token, then one per 4 requests
+        self.assertEqual(client.hedging_stats.hedges, 2)
+        self.assertEqual(client.hedging_stats.hedge_wins, 0)
+
+    async def test_percentile_delay(self):
+        server = StandInFeatureServer(latency=lambda n: 0.002 if n < 20 else (1.0 if n == 20 else 0.002))
+        client = make_async_client(
+            server, hedging_policy=HedgingPolicy(percentile=90, min_samples=20, max_hedge_rate=1)
+        )
+        for _ in range(20):
+            await client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"})
+        self.assertEqual(client.hedging_stats.hedges, 0)
+
+        start = time.monotonic()
+        await client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"})
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(client.hedging_stats.hedge_wins, 1)
+
+
+class TestIterFeatures(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        async def handler(request):
+            user_id = json.loads(request.content.decode("utf8"))["params"]["joinKeyMap"]["user_id"]
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            # later rows complete first
+            await asyncio.sleep(0.05 if user_id == "user_0" else 0.001)
+            self.in_flight -= 1
+            if user_id == "bad":
+                return httpx.Response(503, json={"message": "unavailable"})
+            return httpx.Response(200, json={"result": {"features": [user_id]}})
+
+        self.client = AsyncTectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+        self.consumed = 0
+
+    async def rows(self, user_ids):
+        for user_id in user_ids:
+            self.consumed += 1
+            yield GetFeaturesRequestData(join_key_map={"user_id": user_id})
+
+    async def test_ordered(self):
+        user_ids = [f"user_{i}" for i in range(200)]
+        results = []
+        async for row, response in self.client.iter_features(
+            self.rows(user_ids), feature_service_name="fs", max_in_flight=5
+        ):
+            self.assertLessEqual(self.consumed, len(results) + 5)
+            results.append((row.join_key_map["user_id"], response.result.features[0]))
+        self.assertEqual(results, [(user_id, user_id) for user_id in user_ids])
+        self.assertEqual(self.max_in_flight, 5)
+
+    async def test_unordered_from_a_list(self):
+        user_ids = [f"user_{i}" for i in range(10)]
+        rows = [GetFeaturesRequestData(join_key_map={"user_id": user_id}) for user_id in user_ids]
+        results = [
+            response.result.features[0]
+            async for _, response in self.client.iter_features(rows, feature_service_name="fs", ordered=False)
+        ]
+        self.assertEqual(sorted(results), sorted(user_ids))
+        self.assertEqual(results[-1], "user_0")
+
+    async def test_errors(self):
+        results = [
+            response
+            async for _, response in self.client.iter_features(
+                self.rows(["a", "bad"]), feature_service_name="fs", return_errors=True
+            )
+        ]
+        self.assertIsInstance(results[1], ServiceUnavailableError)
+        with self.assertRaises(ServiceUnavailableError):
+            async for _ in self.client.iter_features(self.rows(["a", "bad"]), feature_service_name="fs"):
+                pass
+
+    async def test_close_early(self):
+        stream = self.client.iter_features(
+            self.rows(f"user_{i}" for i in range(1000)), feature_service_name="fs", max_in_flight=3
+        )
+        await stream.__anext__()
+        await stream.aclose()
+        self.assertLessEqual(self.consumed, 4)
+        await asyncio.sleep(0.06)
+        self.assertEqual(self.in_flight, 0)
@@ -0,0 +1,53 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from helpers import make_response
+
+from tecton_client import FeatureCache, MetadataOptions
+from tecton_client._internal.utils import get_features_cache_key
+
+
+class TestFeatureCache(TestCase):
+    def test_lru_eviction(self):
+        cache = FeatureCache(max_size=2)
+        cache.put("a", make_response([1]), "fs")
+        cache.put("b", make_response([2]), "fs")
+        # touch "a" so that "b" is the least recently used
+        self.assertEqual(cache.get("a").result.features, [1])
+        cache.put("c", make_response([3]), "fs")
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a").result.features, [1])
+        self.assertEqual(cache.get("c").result.features, [3])
+        stats = cache.stats
+        self.assertEqual((stats.hits, stats.misses, stats.evictions, stats.size), (3, 1, 1, 2))
+
+    @patch("tecton_client._internal.cache.time.monotonic")
+    def test_ttl_by_feature_service(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        cache = FeatureCache(default_ttl_seconds=10, ttl_seconds_by_feature_service={"short": 1, "disabled": 0})
+        cache.put("default", make_response([1]), "other")
+        cache.put("short", make_response([2]), "short")
+        cache.put("disabled", make_response([3]), "disabled")
+        self.assertIsNone(cache.get("disabled"))
+
+        mock_monotonic.return_value = 105.0
+        self.assertIsNone(cache.get("short"))
+        self.assertIsNotNone(cache.get("default"))
+
+        mock_monotonic.return_value = 111.0
+        self.assertIsNone(cache.get("default"))
+        self.assertEqual(cache.stats.expirations, 2)
+        self.assertEqual(len(cache), 0)
+
+    def test_cache_key_is_canonical(self):
+        key = get_features_cache_key("ws", "fs", None, {"a": 1, "b": "2"}, {"x": 1.5})
+        self.assertEqual(key, get_features_cache_key("ws", "fs", None, {"b": "2", "a": 1}, {"x": 1.5}))
+        self.assertNotEqual(key, get_features_cache_key("other", "fs", None, {"a": 1, "b": "2"}, {"x": 1.5}))
+        self.assertNotEqual(key, get_features_cache_key("ws", "fs", None, {"a": 1, "b": "2"}, {"x": 2.5}))
+        self.assertNotEqual(
+            key,
+            get_features_cache_key(
+                "ws", "fs", None, {"a": 1, "b": "2"}, {"x": 1.5}, MetadataOptions(include_effective_times=True)
+            ),
+        )
@@ -0,0 +1,72 @@
+import json
+from unittest import TestCase
+from unittest.mock import patch
+
+import httpx
+
+from tecton_client import JsonCodec, TectonClient
+from tecton_client._internal import codec as codec_module
+from tecton_client._internal.codec import MsgspecCodec, OrjsonCodec, get_codec
+from tecton_client._internal.utils import build_get_features_request
+
+
+class TestCodec(TestCase):
+    def test_round_trip(self):
+        request = build_get_features_request(
+            feature_service_id=None,
+            feature_service_name="fs",
+            join_key_map={"user_id": "ü123"},
+            request_context_map={"amount": 1.5},
+            workspace_name="ws",
+        )
+        for codec in [get_codec("json"), get_codec("orjson"), get_codec("msgspec")]:
+            encoded = codec.encode(request)
+            self.assertIsInstance(encoded, bytes)
+            self.assertEqual(json.loads(encoded), request)
+            self.assertEqual(codec.decode(encoded), request)
+
+    def test_auto(self):
+        # msgspec decodes the metadata of get-features responses lazily
+        self.assertIsInstance(get_codec("auto"), MsgspecCodec)
+        with patch.object(codec_module, "msgspec", None):
+            self.assertIsInstance(get_codec("auto"), OrjsonCodec)
+            with patch.object(codec_module, "orjson", None):
+                self.assertEqual(type(get_codec("auto")), JsonCodec)
+                with self.assertRaisesRegex(ImportError, "orjson is not installed"):
+                    get_codec("orjson")
+
+    def test_unknown_codec(self):
+        with self.assertRaisesRegex(ValueError, "unknown codec"):
+            get_codec("yaml")
+
+    def test_custom_codec(self):
+        class CountingCodec(JsonCodec):
+            def __init__(self):
+                self.calls = []
+
+            def encode(self, obj):
+                self.calls.append("encode")
+                return super().encode(obj)
+
+            def decode(self, data):
+                self.calls.append("decode")
+                return super().decode(data)
+
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, content=b'{"result": {"features": [1]}}')
+
+        codec = CountingCodec()
+        client = TectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.Client(transport=httpx.MockTransport(handler)),
+            codec=codec,
+        )
+        resp = client.get_features(feature_service_name="fs", join_key_map={"user_id": "id123"})
+        self.assertEqual(resp.result.features, [1])
+        self.assertEqual(codec.calls, ["encode", "decode"])
+        self.assertEqual(requests[0].headers["content-type"], "application/json")
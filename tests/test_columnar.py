@@ -0,0 +1,81 @@
+import json
+import pathlib
+from unittest import TestCase
+
+import numpy as np
+from helpers import make_response
+
+from tecton_client import GetFeaturesResponse, features_to_matrix, features_to_numpy
+from tecton_client._internal.data_types import GetFeatureServiceMetadataResponse
+
+TEST_DATA_DIR = pathlib.Path(__file__).parent.joinpath("test_data")
+
+METADATA = {
+    "features": [
+        {"name": "fv.count", "dataType": {"type": "int64"}},
+        {"name": "fv.ratio", "dataType": {"type": "float64"}},
+        {"name": "fv.flag", "dataType": {"type": "boolean"}},
+        {"name": "fv.city", "dataType": {"type": "string"}},
+    ]
+}
+
+
+class TestColumnar(TestCase):
+    def setUp(self):
+        self.responses = [
+            make_response(["12", 0.5, True, "nyc"], METADATA),
+            make_response([None, None, False, None], METADATA),
+            make_response(["-3", 1.25, None, "sf"], METADATA),
+        ]
+
+    def test_scalar_columns(self):
+        columns = features_to_numpy(self.responses)
+        self.assertEqual(list(columns), ["fv.count", "fv.ratio", "fv.flag", "fv.city"])
+
+        count = columns["fv.count"]
+        self.assertEqual(count.dtype, np.int64)
+        self.assertEqual(count.mask.tolist(), [False, True, False])
+        self.assertEqual(count.compressed().tolist(), [12, -3])
+        self.assertEqual(columns["fv.ratio"].dtype, np.float64)
+        self.assertEqual(columns["fv.flag"].tolist(), [True, False, None])
+        self.assertEqual(columns["fv.city"].tolist(), ["nyc", None, "sf"])
+
+    def test_missing_rows_are_masked(self):
+        columns = features_to_numpy([self.responses[0], None], metadata=METADATA)
+        self.assertEqual(columns["fv.count"].tolist(), [12, None])
+
+    def test_array_columns(self):
+        with open(TEST_DATA_DIR.joinpath("sample_response.json")) as f:
+            sample = GetFeaturesResponse.from_response(json.load(f))
+        other = make_response([["1", None, "3"], ["rain"], [1.0]], sample.metadata)
+
+        columns = features_to_numpy([sample, other])
+        counts = columns["average_rain.rain_in_last_24_hrs"]
+        self.assertEqual(counts.dtype, np.int64)
+        self.assertEqual(counts.tolist(), [[0, None, None], [1, None, 3]])
+        self.assertEqual(columns["average_rain.cloud_type"].tolist(), [[None], ["rain"]])
+        temperatures = columns["average_rain.average_temperate_6hrs"]
+        self.assertEqual(temperatures.shape, (2, 6))
+        self.assertEqual(temperatures.count(axis=1).tolist(), [5, 1])
+
+    def test_matrix(self):
+        matrix = features_to_matrix(self.responses[:1] + [None], metadata={"features": METADATA["features"][:3]})
+        np.testing.assert_array_equal(matrix, [[12.0, 0.5, 1.0], [np.nan, np.nan, np.nan]])
+
+        with self.assertRaisesRegex(ValueError, "fv.city of type string"):
+            features_to_matrix(self.responses)
+
+    def test_metadata_response(self):
+        metadata = GetFeatureServiceMetadataResponse(
+            feature_service_type="DEFAULT",
+            input_join_keys=[],
+            input_request_context_keys=[],
+            feature_values=[{"name": "fv.count", "dataType": {"type": "int64"}}],
+        )
+        matrix = features_to_matrix(make_response(["7"]), metadata=metadata, dtype=np.float32)
+        self.assertEqual(matrix.dtype, np.float32)
+        self.assertEqual(matrix.tolist(), [[7.0]])
+
+    def test_requires_names(self):
+        with self.assertRaisesRegex(ValueError, "feature names are not available"):
+            features_to_numpy(make_response([1]))
@@ -0,0 +1,153 @@
+import gzip
+import json
+import zlib
+from unittest import IsolatedAsyncioTestCase, TestCase, skipUnless
+
+import httpx
+
+from tecton_client import (
+    AsyncTectonClient,
+    CompressionOptions,
+    GetFeaturesRequestData,
+    TectonClient,
+)
+from tecton_client._internal.compression import Compression, zstandard
+
+FEATURES = ["x" * 20 for _ in range(500)]
+REQUEST = httpx.Request("POST", "https://fake.tecton.ai/api/v1/feature-service/get-features")
+RESPONSE_BODY = json.dumps({"result": {"features": FEATURES}}).encode("utf8")
+
+
+def decompress_request(request: httpx.Request) -> bytes:
+    encoding = request.headers.get("Content-Encoding")
+    if encoding == "gzip":
+        return gzip.decompress(request.content)
+    if encoding == "zstd":
+        return zstandard.ZstdDecompressor().decompressobj().decompress(request.content)
+    return request.content
+
+
+class TestCompression(TestCase):
+    def test_request_threshold(self):
+        compression = Compression(CompressionOptions(request_threshold_bytes=100))
+        body, headers = compression.encode_request(b"{}")
+        self.assertEqual(body, b"{}")
+        self.assertNotIn("Content-Encoding", headers)
+
+        content = json.dumps({"rows": ["user"] * 100}).encode("utf8")
+        body, headers = compression.encode_request(content)
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(body), content)
+        self.assertLess(len(body), len(content))
+
+        stats = compression.stats
+        self.assertEqual((stats.requests, stats.compressed_requests), (2, 1))
+        self.assertEqual(stats.request_bytes, len(content) + 2)
+        self.assertEqual(stats.request_wire_bytes, len(body) + 2)
+
+    def test_decode_response(self):
+        compression = Compression(CompressionOptions(accept_encodings=("gzip", "deflate")))
+        self.assertEqual(compression.accept_encoding, "gzip, deflate")
+        for encoding, body in (
+            ("gzip", gzip.compress(RESPONSE_BODY)),
+            ("deflate", zlib.compress(RESPONSE_BODY)),
+            ("identity", RESPONSE_BODY),
+        ):
+            resp = httpx.Response(200, headers={"Content-Encoding": encoding}, content=body, request=REQUEST)
+            decoded = compression.decode_response(resp, body)
+            self.assertEqual(decoded.content, RESPONSE_BODY)
+            self.assertNotIn("Content-Encoding", decoded.headers)
+        self.assertEqual(compression.stats.response_bytes, 3 * len(RESPONSE_BODY))
+
+        with self.assertRaises(httpx.DecodingError):
+            compression.decode_response(
+                httpx.Response(200, headers={"Content-Encoding": "gzip"}, request=REQUEST), b"not gzip"
+            )
+        with self.assertRaises(httpx.DecodingError):
+            compression.decode_response(httpx.Response(200, headers={"Content-Encoding": "br"}, request=REQUEST), b"")
+
+    def test_invalid_options(self):
+        with self.assertRaises(ValueError):
+            CompressionOptions(request_encoding="br")
+        with self.assertRaises(ValueError):
+            CompressionOptions(accept_encodings=("gzip", "br"))
+
+
+class TestCompressedClient(TestCase):
+    def test_get_features_batch(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            rows = json.loads(decompress_request(request))["params"]["requestData"]
+            body = json.dumps({"result": [{"features": FEATURES} for _ in rows]}).encode("utf8")
+            # a stream, unlike content, is read by the client as it would be from the network
+            return httpx.Response(
+                200, headers={"Content-Encoding": "gzip"}, stream=httpx.ByteStream(gzip.compress(body))
+            )
+
+        timings = []
+        client = TectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.Client(transport=httpx.MockTransport(handler)),
+            compression=CompressionOptions(request_threshold_bytes=1000),
+        )
+        client.add_request_hook(timings.append)
+        rows = [GetFeaturesRequestData(join_key_map={"user_id": f"user_{i}"}) for i in range(100)]
+        resp = client.get_features_batch(feature_service_name="fs", request_data=rows, micro_batch_size=100)
+        self.assertEqual(resp.responses[99].result.features, FEATURES)
+
+        self.assertEqual(requests[0].headers["Accept-Encoding"], "gzip")
+        self.assertEqual(requests[0].headers["Content-Encoding"], "gzip")
+        stats = client.compression_stats
+        self.assertEqual(stats.compressed_requests, 1)
+        self.assertLess(stats.request_wire_bytes, stats.request_bytes)
+        self.assertLess(stats.response_wire_bytes * 10, stats.response_bytes)
+        self.assertEqual(timings[0].response_bytes, stats.response_bytes)
+        self.assertEqual(timings[0].response_wire_bytes, stats.response_wire_bytes)
+        self.assertEqual(timings[0].request_wire_bytes, stats.request_wire_bytes)
+
+    def test_uncompressed_response(self):
+        client = TectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.Client(
+                transport=httpx.MockTransport(lambda request: httpx.Response(200, content=RESPONSE_BODY))
+            ),
+            compression=CompressionOptions(accept_encodings=()),
+        )
+        resp = client.get_features(feature_service_name="fs", join_key_map={"user_id": "1"})
+        self.assertEqual(resp.result.features, FEATURES)
+        self.assertEqual(client.compression_stats.response_bytes, len(RESPONSE_BODY))
+        self.assertEqual(client.compression_stats.compressed_requests, 0)
+
+    def test_without_compression(self):
+        client = TectonClient(url="https://fake.tecton.ai", api_key="fake-api-key")
+        self.assertIsNone(client.compression_stats)
+
+
+@skipUnless(zstandard is not None, "requires zstandard")
+class TestAsyncZstd(IsolatedAsyncioTestCase):
+    async def test_zstd(self):
+        async def handler(request):
+            self.assertEqual(request.headers["Accept-Encoding"], "zstd, gzip")
+            json.loads(decompress_request(request))
+            body = zstandard.ZstdCompressor().compress(RESPONSE_BODY)
+            return httpx.Response(200, headers={"Content-Encoding": "zstd"}, stream=httpx.ByteStream(body))
+
+        client = AsyncTectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+            compression=CompressionOptions(
+                request_encoding="zstd", request_threshold_bytes=0, accept_encodings=("zstd", "gzip")
+            ),
+        )
+        resp = await client.get_features(feature_service_name="fs", join_key_map={"user_id": "1"})
+        self.assertEqual(resp.result.features, FEATURES)
+        self.assertEqual(client.compression_stats.compressed_requests, 1)
+        self.assertEqual(client.compression_stats.response_bytes, len(RESPONSE_BODY))
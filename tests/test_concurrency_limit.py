@@ -0,0 +1,125 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import patch
+
+from stand_in_server import StandInFeatureServer
+
+from tecton_client import AdaptiveConcurrency, AsyncTectonClient, RequestLimits
+from tecton_client._internal.concurrency_limit import AimdConcurrencyLimit
+from tecton_client.exceptions import ResourceExhaustedError
+
+
+@patch("tecton_client._internal.concurrency_limit.time.monotonic", return_value=100.0)
+class TestAimdConcurrencyLimit(TestCase):
+    def test_additive_increase(self, mock_monotonic):
+        limit = AimdConcurrencyLimit(AdaptiveConcurrency(initial_limit=10))
+        for _ in range(10):
+            limit.on_success(sent_at=0, latency_seconds=0.01, in_flight=9)
+        self.assertEqual(limit.limit, 10)
+        limit.on_success(sent_at=0, latency_seconds=0.01, in_flight=9)
+        self.assertEqual(limit.limit, 11)
+
+    def test_no_increase_while_unused(self, mock_monotonic):
+        limit = AimdConcurrencyLimit(AdaptiveConcurrency(initial_limit=10))
+        for _ in range(100):
+            limit.on_success(sent_at=0, latency_seconds=0.01, in_flight=0)
+        self.assertEqual(limit.limit, 10)
+
+    def test_multiplicative_decrease(self, mock_monotonic):
+        limit = AimdConcurrencyLimit(AdaptiveConcurrency(initial_limit=10, min_limit=4, backoff_ratio=0.5))
+        limit.on_overload(sent_at=99.0)
+        self.assertEqual(limit.limit, 5)
+        # requests sent before the decrease were sent at the old limit
+        limit.on_overload(sent_at=99.0)
+        self.assertEqual(limit.limit, 5)
+        limit.on_overload(sent_at=100.0)
+        self.assertEqual(limit.limit, 4)
+
+    def test_decrease_on_latency(self, mock_monotonic):
+        limit = AimdConcurrencyLimit(AdaptiveConcurrency(initial_limit=10, latency_tolerance=2.0))
+        for _ in range(20):
+            limit.on_success(sent_at=100.0, latency_seconds=0.01, in_flight=9)
+        self.assertEqual(limit.limit, 11)
+        for _ in range(5):
+            limit.on_success(sent_at=100.0, latency_seconds=0.05, in_flight=9)
+        self.assertLess(limit.limit, 11)
+
+
+class TestAimdSimulation(TestCase):
+    """Drives AimdConcurrencyLimit with a simulated feature server and clock, one round trip at a time"""
+
+    def setUp(self):
+        self.now = 0.0
+        patcher = patch("tecton_client._internal.concurrency_limit.time.monotonic", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_rounds(self, limit, rounds, capacity=None, latency=lambda in_flight: 0.01):
+        """Send limit.limit requests per round trip, of which the feature server rejects those beyond capacity.
+
+        Returns the limit after each round trip.
+        """
+        limits = []
+        for _ in range(rounds):
+            sent_at = self.now
+            in_flight = limit.limit
+            latency_seconds = latency(in_flight)
+            self.now += latency_seconds
+            for i in range(in_flight):
+                if capacity is not None and i >= capacity:
+                    limit.on_overload(sent_at)
+                else:
+                    limit.on_success(sent_at, latency_seconds, in_flight=in_flight - i - 1)
+            limits.append(limit.limit)
+        return limits
+
+    def test_grows_while_latency_is_flat(self):
+        limit = AimdConcurrencyLimit(AdaptiveConcurrency(initial_limit=4, max_limit=64))
+        limits = self.run_rounds(limit, rounds=30)
+        self.assertEqual(limits, sorted(limits))
+        self.assertGreaterEqual(limits[-1], 12)
+        self.assertEqual(self.run_rounds(limit, rounds=500)[-1], 64)
+
+    def test_follows_changing_capacity(self):
+        limit = AimdConcurrencyLimit(AdaptiveConcurrency(initial_limit=4))
+        # the limit grows towards the capacity while the feature server keeps up, and hovers just below it
+        limits = self.run_rounds(limit, rounds=60, capacity=16)
+        self.assertGreaterEqual(max(limits), 14)
+        self.assertTrue(all(limit <= 17 for limit in limits))
+        # and is cut back once the capacity drops
+        limits = self.run_rounds(limit, rounds=30, capacity=4)
+        self.assertTrue(all(4 <= limit <= 5 for limit in limits[-20:]))
+
+    def test_backs_off_when_latency_rises(self):
+        # the feature server queues requests beyond 4 in flight, so their latency rises
+        limit = AimdConcurrencyLimit(AdaptiveConcurrency(initial_limit=4, max_limit=64))
+        limits = self.run_rounds(limit, rounds=200, latency=lambda in_flight: 0.002 * max(1, in_flight - 3))
+        self.assertNotEqual(limits, sorted(limits))
+        self.assertTrue(all(limit <= 6 for limit in limits))
+
+
+class TestAdaptiveConcurrency(IsolatedAsyncioTestCase):
+    async def test_limits_requests(self):
+        server = StandInFeatureServer(latency=lambda n: 0.005, capacity=lambda t: 8)
+        client = AsyncTectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=server.async_client(),
+            request_limits=RequestLimits(adaptive_concurrency=AdaptiveConcurrency(initial_limit=4, max_limit=64)),
+        )
+        outcomes = []
+
+        async def worker():
+            for _ in range(20):
+                try:
+                    await client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"})
+                    outcomes.append(True)
+                except ResourceExhaustedError:
+                    outcomes.append(False)
+                    await asyncio.sleep(0.005)
+
+        await asyncio.gather(*(worker() for _ in range(16)))
+        self.assertEqual(len(outcomes), 320)
+        self.assertIn(True, outcomes)
+        self.assertTrue(1 <= client.request_limit_stats[None].concurrency_limit <= 64)
@@ -0,0 +1,238 @@
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from unittest import IsolatedAsyncioTestCase, TestCase, skipIf, skipUnless
+
+import httpx
+from stand_in_server import LoopbackFeatureServer
+
+from tecton_client import AsyncTectonClient, ConnectionOptions, RequestLimits, StaleFallbackStore, TectonClient
+
+try:
+    import h2
+except ImportError:
+    h2 = None
+
+
+class TestConnections(TestCase):
+    def test_warm_up(self):
+        with LoopbackFeatureServer(latency=0.02) as server:
+            client = TectonClient(url=server.url, api_key="fake-api-key", default_workspace_name="workspace")
+            self.assertEqual(client.warm_up(connections=4), 4)
+            self.assertEqual(server.connections, 4)
+            # the warm-up requests don't reach the feature server apis
+            self.assertEqual((server.requests, server.head_requests), (0, ["/"] * 4))
+
+            connect_seconds = []
+            client.add_request_hook(lambda timings: connect_seconds.append(timings.connect_seconds))
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                for i in range(4):
+                    executor.submit(client.get_features, feature_service_name="fs", join_key_map={"user_id": str(i)})
+            # the requests use the warm connections
+            self.assertEqual(server.connections, 4)
+            self.assertEqual(connect_seconds, [0.0] * 4)
+
+    def test_warm_up_endpoints(self):
+        with LoopbackFeatureServer() as first, LoopbackFeatureServer() as second:
+            client = TectonClient(url=[first.url, second.url], api_key="fake-api-key")
+            self.assertEqual(client.warm_up(connections=2), 4)
+            self.assertEqual((first.connections, second.connections), (2, 2))
+
+    def test_warm_up_failure(self):
+        client = TectonClient(url="http://127.0.0.1:1", api_key="fake-api-key")
+        with self.assertLogs("tecton_client._internal.connections", "WARNING"):
+            self.assertEqual(client.warm_up(), 0)
+
+    def test_warm_up_connections(self):
+        client = TectonClient(url="https://fake.tecton.ai", api_key="fake-api-key")
+        with self.assertRaisesRegex(ValueError, "connections must be at least 1"):
+            client.warm_up(connections=0)
+
+    def test_connection_options(self):
+        client = TectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            connection_options=ConnectionOptions(max_connections=8, keepalive_expiry_seconds=60, timeout_seconds=1),
+        )
+        pool = client._client._transport._pool
+        self.assertEqual((pool._max_connections, pool._keepalive_expiry), (8, 60))
+        self.assertEqual(client._client.timeout, httpx.Timeout(1))
+        self.assertEqual(client._client.headers["authorization"], "Tecton-key fake-api-key")
+
+        with self.assertRaises(ValueError):
+            TectonClient(
+                url="https://fake.tecton.ai",
+                api_key="fake-api-key",
+                client=httpx.Client(),
+                connection_options=ConnectionOptions(),
+            )
+
+    def test_close(self):
+        with TectonClient(url=["https://a.tecton.ai", "https://b.tecton.ai"], api_key="fake-api-key") as client:
+            executor = client._get_executor()
+            http_clients = [endpoint.client for endpoint in client._load_balancer.endpoints]
+        self.assertTrue(all(http_client.is_closed for http_client in http_clients))
+        self.assertIsNone(client._executor)
+        self.assertTrue(executor._shutdown)
+
+        # a client passed to the constructor belongs to the caller
+        http_client = httpx.Client()
+        TectonClient(url="https://fake.tecton.ai", api_key="fake-api-key", client=http_client).close()
+        self.assertFalse(http_client.is_closed)
+
+    @skipUnless(hasattr(os, "fork"), "requires fork")
+    def test_fork(self):
+        with LoopbackFeatureServer() as server:
+            client = TectonClient(
+                url=server.url,
+                api_key="fake-api-key",
+                default_workspace_name="workspace",
+                connection_options=ConnectionOptions(warm_up_connections_after_fork=2),
+            )
+            self.assertEqual(client.warm_up(), 1)
+            parent_client = client._client
+            pid = os.fork()
+            if pid == 0:
+                status = 1
+                try:
+                    for thread in threading.enumerate():
+                        if thread.name == "tecton-client-warm-up":
+                            thread.join()
+                    if client._client is not parent_client:
+                        status = 0
+                finally:
+                    os._exit(status)
+            _, status = os.waitpid(pid, 0)
+            self.assertEqual(status, 0)
+            # the child opened connections of its own instead of sharing the parent's
+            self.assertEqual(server.connections, 3)
+            client.close()
+
+    @skipUnless(hasattr(os, "fork"), "requires fork")
+    def test_fork_with_request_in_flight(self):
+        with LoopbackFeatureServer(latency=0.3) as first, LoopbackFeatureServer(latency=0.3) as second:
+            store = StaleFallbackStore()
+            client = TectonClient(
+                url=[first.url, second.url],
+                api_key="fake-api-key",
+                default_workspace_name="workspace",
+                request_limits=RequestLimits(max_in_flight=1, max_wait_seconds=0.1),
+                stale_store=store,
+            )
+            in_flight = threading.Thread(target=client.get_features, kwargs={"feature_service_name": "fs"})
+            in_flight.start()
+            while not client.request_limit_stats or not client.request_limit_stats[None].in_flight:
+                time.sleep(0.001)
+            self.assertTrue(store.start_refresh(b"key"))
+
+            pid = os.fork()
+            if pid == 0:
+                status = 1
+                try:
+                    # the parent's request holds neither the limiter slot, nor an endpoint, nor the refresh
+                    self.assertEqual(client.request_limit_stats, {})
+                    self.assertEqual([stats.outstanding for stats in client.endpoint_stats], [0, 0])
+                    self.assertTrue(store.start_refresh(b"key"))
+                    client.get_features(feature_service_name="fs")
+                    status = 0
+                except BaseException:
+                    traceback.print_exc()
+                finally:
+                    os._exit(status)
+            _, status = os.waitpid(pid, 0)
+            in_flight.join()
+            self.assertEqual(status, 0)
+            client.close()
+
+    @skipUnless(hasattr(os, "fork"), "requires fork")
+    def test_fork_with_injected_client(self):
+        with LoopbackFeatureServer(latency=0.3) as server:
+            http_client = httpx.Client()
+            client = TectonClient(
+                url=server.url,
+                api_key="fake-api-key",
+                default_workspace_name="workspace",
+                client=http_client,
+                request_limits=RequestLimits(max_in_flight=1, max_wait_seconds=0),
+            )
+            in_flight = threading.Thread(target=client.get_features, kwargs={"feature_service_name": "fs"})
+            in_flight.start()
+            while not client.request_limit_stats or not client.request_limit_stats[None].in_flight:
+                time.sleep(0.001)
+
+            pid = os.fork()
+            if pid == 0:
+                status = 1
+                try:
+                    # the limiter slot of the parent's request is released, and the injected client is kept
+                    self.assertIs(client._client, http_client)
+                    client.get_features(feature_service_name="fs")
+                    status = 0
+                except BaseException:
+                    traceback.print_exc()
+                finally:
+                    os._exit(status)
+            _, status = os.waitpid(pid, 0)
+            in_flight.join()
+            self.assertEqual(status, 0)
+            client.close()
+            http_client.close()
+
+    @skipIf(h2 is not None, "h2 is installed")
+    def test_http2_requires_h2(self):
+        with self.assertRaisesRegex(ImportError, "pip install tecton-client\\[http2\\]"):
+            TectonClient(
+                url="https://fake.tecton.ai", api_key="fake-api-key", connection_options=ConnectionOptions(http2=True)
+            )
+
+    @skipIf(h2 is None, "h2 is not installed")
+    def test_http2(self):
+        client = AsyncTectonClient(
+            url="https://fake.tecton.ai", api_key="fake-api-key", connection_options=ConnectionOptions(http2=True)
+        )
+        self.assertTrue(client._client._transport._pool._http2)
+
+
+class TestAsyncConnections(IsolatedAsyncioTestCase):
+    async def test_warm_up(self):
+        with LoopbackFeatureServer(latency=0.02) as server:
+            client = AsyncTectonClient(
+                url=server.url,
+                api_key="fake-api-key",
+                connection_options=ConnectionOptions(max_keepalive_connections=3),
+            )
+            self.assertEqual(await client.warm_up(connections=3), 3)
+            self.assertEqual(server.connections, 3)
+            await client.get_features(feature_service_name="fs", workspace_name="workspace")
+            self.assertEqual(server.connections, 3)
+
+    async def test_aclose(self):
+        async with AsyncTectonClient(url="https://fake.tecton.ai", api_key="fake-api-key") as client:
+            http_client = client._client
+        self.assertTrue(http_client.is_closed)
+
+    async def test_after_fork(self):
+        store = StaleFallbackStore()
+        client = AsyncTectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            coalesce_requests=True,
+            request_limits=RequestLimits(max_in_flight=1),
+            stale_store=store,
+        )
+        http_client, single_flight = client._client, client._single_flight
+        limiter = client._get_limiter("fs")
+        store.start_refresh(b"key")
+        client._after_fork()
+        self.assertIsNot(client._client, http_client)
+        self.assertIsNot(client._single_flight, single_flight)
+        self.assertIsNot(client._get_limiter("fs"), limiter)
+        self.assertTrue(store.start_refresh(b"key"))
+        self.assertFalse(http_client.is_closed)
+
+    async def test_warm_up_connections(self):
+        client = AsyncTectonClient(url="https://fake.tecton.ai", api_key="fake-api-key")
+        with self.assertRaisesRegex(ValueError, "connections must be at least 1"):
+            await client.warm_up(connections=0)
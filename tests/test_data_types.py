@@ -1,8 +1,11 @@
 import json
 import pathlib
-from unittest import TestCase
+import pickle
+from unittest import TestCase, skipIf
 
 from tecton_client import GetFeaturesResponse
+from tecton_client._internal.codec import MsgspecCodec, msgspec
+from tecton_client._internal.data_types import GetFeatureServiceMetadataResponse, GetFeaturesResult
 
 TEST_DATA_DIR = pathlib.Path(__file__).parent.joinpath("test_data")
 
@@ -34,3 +37,68 @@ class TestDataTypes(TestCase):
                 ]
             },
         )
+
+    def test_GetFeaturesResponse_get_features_dict(self):
+        file_1 = TEST_DATA_DIR.joinpath("sample_response.json")
+        with open(file_1) as f:
+            resp = GetFeaturesResponse.from_response(json.load(f))
+        self.assertEqual(
+            resp.get_features_dict(),
+            {
+                "average_rain.rain_in_last_24_hrs": [0],
+                "average_rain.cloud_type": None,
+                "average_rain.average_temperate_6hrs": [55.5, 57.88, 58.96, 57.66, None, 55.98],
+            },
+        )
+
+        resp.metadata = None
+        with self.assertRaisesRegex(ValueError, "feature names are not available"):
+            resp.get_features_dict()
+
+    def test_compact_responses(self):
+        resp = GetFeaturesResponse.from_response({"result": {"features": [1]}, "metadata": {"features": []}})
+        self.assertFalse(hasattr(resp, "__dict__"))
+        self.assertFalse(hasattr(resp.result, "__dict__"))
+        self.assertEqual(resp, GetFeaturesResponse(GetFeaturesResult([1]), {"features": []}))
+        self.assertEqual(pickle.loads(pickle.dumps(resp)), resp)
+
+    @skipIf(msgspec is None, "msgspec is not installed")
+    def test_lazy_metadata(self):
+        with open(TEST_DATA_DIR.joinpath("sample_response.json"), "rb") as f:
+            body = f.read()
+        decoded = MsgspecCodec().decode_features_response(body)
+        resp = GetFeaturesResponse.from_response(decoded)
+        self.assertEqual(resp.result.features, [["0"], None, [55.5, 57.88, 58.96, 57.66, None, 55.98]])
+        self.assertIsNot(resp._metadata.__class__, dict)
+        self.assertEqual(resp.metadata, json.loads(body)["metadata"])
+        self.assertEqual(pickle.loads(pickle.dumps(resp)), resp)
+
+        # the rows of a batch response share the metadata, which is decoded once
+        batch = MsgspecCodec().decode_features_response(b'{"result":[{"features":[1]},{"features":[2]}],"metadata":{}}')
+        first, second = GetFeaturesResponse.from_batch_response(batch)
+        self.assertIs(first.metadata, second.metadata)
+        self.assertIsNone(
+            GetFeaturesResponse.from_response(
+                MsgspecCodec().decode_features_response(b'{"result":{"features":[]}}')
+            ).metadata
+        )
+
+    def test_GetFeatureServiceMetadataResponse(self):
+        resp = {
+            "featureServiceType": "DEFAULT",
+            "inputJoinKeys": [{"name": "user_id"}],
+            "inputRequestContextKeys": [],
+            "featureValues": [{"name": "fv.count", "dataType": {"type": "int64"}}],
+        }
+        metadata = GetFeatureServiceMetadataResponse.from_response(resp)
+        self.assertFalse(hasattr(metadata, "__dict__"))
+        self.assertEqual(metadata.input_join_keys, [{"name": "user_id"}])
+        self.assertEqual(
+            metadata.to_features_metadata(), {"features": [{"name": "fv.count", "dataType": {"type": "int64"}}]}
+        )
+        self.assertEqual(
+            metadata, GetFeatureServiceMetadataResponse("DEFAULT", [{"name": "user_id"}], [], resp["featureValues"])
+        )
+        self.assertEqual(pickle.loads(pickle.dumps(metadata)), metadata)
+        with self.assertRaises(KeyError):
+            GetFeatureServiceMetadataResponse.from_response({"featureServiceType": "DEFAULT"})
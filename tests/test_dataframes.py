@@ -0,0 +1,128 @@
+import json
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+import httpx
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from helpers import make_response
+
+from tecton_client import AsyncTectonClient, TectonClient, features_to_arrow, features_to_pandas
+from tecton_client.exceptions import ServiceUnavailableError
+
+METADATA = {
+    "features": [
+        {"name": "fv.count", "dataType": {"type": "int64"}},
+        {"name": "fv.ratio", "dataType": {"type": "float64"}},
+        {"name": "fv.flag", "dataType": {"type": "boolean"}},
+        {"name": "fv.city", "dataType": {"type": "string"}},
+        {"name": "fv.scores", "dataType": {"type": "array", "elementType": {"type": "float64"}}},
+    ]
+}
+
+FEATURE_SERVICE_METADATA = {
+    "featureServiceType": "DEFAULT",
+    "inputJoinKeys": [{"name": "user_id", "dataType": {"type": "string"}}],
+    "inputRequestContextKeys": [{"name": "amount", "dataType": {"type": "float64"}}],
+    "featureValues": [
+        {"name": "fv.user_id", "dataType": {"type": "string"}},
+        {"name": "fv.amount", "dataType": {"type": "float64"}},
+    ],
+}
+
+
+class TestFeaturesToFrames(TestCase):
+    def setUp(self):
+        self.responses = [
+            make_response(["12", 0.5, True, "nyc", [1.0, 2.0]]),
+            make_response([None, None, None, None, None]),
+            None,
+        ]
+
+    def test_pandas(self):
+        df = features_to_pandas(self.responses, METADATA, index=pd.Index(["a", "b", "c"]))
+        self.assertEqual(list(df.columns), [feature["name"] for feature in METADATA["features"]])
+        self.assertEqual(list(df.index), ["a", "b", "c"])
+        self.assertEqual(str(df["fv.count"].dtype), "Int64")
+        self.assertEqual(df["fv.count"].tolist(), [12, pd.NA, pd.NA])
+        self.assertEqual(df["fv.ratio"].dtype, np.float64)
+        self.assertTrue(df["fv.ratio"].iloc[1:].isna().all())
+        self.assertEqual(str(df["fv.flag"].dtype), "boolean")
+        self.assertEqual(str(df["fv.city"].dtype), "string")
+        self.assertEqual(df["fv.city"].isna().tolist(), [False, True, True])
+        self.assertEqual(df["fv.scores"].tolist(), [[1.0, 2.0], None, None])
+
+    def test_arrow(self):
+        table = features_to_arrow(self.responses, METADATA)
+        self.assertEqual(
+            table.schema.types, [pa.int64(), pa.float64(), pa.bool_(), pa.string(), pa.list_(pa.float64())]
+        )
+        self.assertEqual(
+            table.to_pylist()[0],
+            {"fv.count": 12, "fv.ratio": 0.5, "fv.flag": True, "fv.city": "nyc", "fv.scores": [1.0, 2.0]},
+        )
+        self.assertEqual(table.column("fv.count").null_count, 2)
+
+
+def handler(request):
+    if request.url.path.endswith("metadata"):
+        return httpx.Response(200, json=FEATURE_SERVICE_METADATA)
+    params = json.loads(request.content.decode("utf8"))["params"]
+    user_id = params["joinKeyMap"]["user_id"]
+    if user_id == "bad":
+        return httpx.Response(503, json={"message": "unavailable"})
+    return httpx.Response(200, json={"result": {"features": [user_id, params["requestContextMap"].get("amount")]}})
+
+
+class TestGetFeaturesDataFrame(TestCase):
+    def setUp(self):
+        self.client = TectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.Client(transport=httpx.MockTransport(handler)),
+        )
+
+    def test_dataframe(self):
+        data = pd.DataFrame(
+            {"user_id": ["u1", "u2", None], "amount": [1.5, np.nan, 3.0], "label": [0, 1, 0]}, index=[10, 20, 30]
+        )
+        df = self.client.get_features_dataframe(feature_service_name="fs", data=data, max_workers=2)
+        self.assertEqual(list(df.index), [10, 20, 30])
+        self.assertEqual(df["fv.user_id"].tolist(), ["u1", "u2", pd.NA])
+        self.assertEqual(df["fv.amount"].iloc[[0, 2]].tolist(), [1.5, 3.0])
+        self.assertTrue(np.isnan(df["fv.amount"].iloc[1]))
+
+    def test_arrow_table(self):
+        data = pa.table({"user_id": ["u1", "bad"], "amount": [1.0, 2.0]})
+        with self.assertRaises(ServiceUnavailableError):
+            self.client.get_features_dataframe(feature_service_name="fs", data=data)
+        table = self.client.get_features_dataframe(feature_service_name="fs", data=data, null_failed_rows=True)
+        self.assertEqual(table.column_names, ["fv.user_id", "fv.amount"])
+        self.assertEqual(
+            table.to_pylist(), [{"fv.user_id": "u1", "fv.amount": 1.0}, {"fv.user_id": None, "fv.amount": None}]
+        )
+
+    def test_invalid_data(self):
+        with self.assertRaises(TypeError):
+            self.client.get_features_dataframe(feature_service_name="fs", data=[{"user_id": "u1"}])
+        with self.assertRaises(ValueError):
+            self.client.get_features_dataframe(feature_service_name="fs", data=pd.DataFrame({"other": [1]}))
+
+
+class TestAsyncGetFeaturesDataFrame(IsolatedAsyncioTestCase):
+    async def test_dataframe(self):
+        client = AsyncTectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+        data = pd.DataFrame(
+            {"user_id": [f"u{i}" for i in range(20)] + ["bad"], "amount": [float(i) for i in range(21)]}
+        )
+        df = await client.get_features_dataframe(
+            feature_service_name="fs", data=data, max_concurrency=4, null_failed_rows=True
+        )
+        self.assertEqual(df["fv.user_id"].tolist(), [f"u{i}" for i in range(20)] + [pd.NA])
+        self.assertEqual(df["fv.amount"].iloc[:20].tolist(), [float(i) for i in range(20)])
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import time
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import patch
+
+import httpx
+from helpers import make_async_client, make_client
+from stand_in_server import StandInFeatureServer
+
+from tecton_client import (
+    Deadline,
+    FeatureCache,
+    GetFeaturesRequestData,
+    GetFeaturesResponse,
+    RequestOptions,
+    RetryPolicy,
+    TectonClient,
+)
+from tecton_client.exceptions import DeadlineExceededError, ServiceUnavailableError
+
+FALLBACK = GetFeaturesResponse(result={"features": ["default"]})
+
+
+def make_timing_out_client(latency_seconds, **kwargs):
+    """A client whose transport honours the request timeouts like a real one, for a server with the given latency"""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        read_timeout = request.extensions["timeout"]["read"]
+        if request.url.path.endswith("/metadata"):
+            body = {
+                "featureServiceType": "DEFAULT",
+                "inputJoinKeys": [],
+                "inputRequestContextKeys": [],
+                "featureValues": [],
+            }
+        elif request.url.path.endswith("/get-features-batch"):
+            rows = json.loads(request.content)["params"]["requestData"]
+            body = {"result": [{"features": [1]} for _ in rows]}
+        else:
+            body = {"result": {"features": [1]}}
+        if read_timeout is not None and latency_seconds > read_timeout:
+            time.sleep(read_timeout)
+            msg = "timed out"
+            raise httpx.ReadTimeout(msg, request=request)
+        time.sleep(latency_seconds)
+        return httpx.Response(200, json=body)
+
+    return make_client(handler, **kwargs), requests
+
+
+class TestDeadline(TestCase):
+    def test_timeouts_are_capped_at_the_budget(self):
+        client, requests = make_timing_out_client(0)
+        client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"}, timeout_budget=0.5)
+        self.assertTrue(all(0 < timeout <= 0.5 for timeout in requests[0].extensions["timeout"].values()))
+
+        # without a budget the client's timeouts are used
+        client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"})
+        self.assertEqual(set(requests[1].extensions["timeout"].values()), {5})
+
+    def test_deadline_exceeded(self):
+        client, _ = make_timing_out_client(1)
+        start = time.monotonic()
+        with self.assertRaises(DeadlineExceededError):
+            client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"}, timeout_budget=0.05)
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_expired_deadline_sends_no_request(self):
+        client, requests = make_timing_out_client(0)
+        with self.assertRaises(DeadlineExceededError):
+            client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"}, timeout_budget=Deadline(0))
+        self.assertEqual(requests, [])
+
+    def test_fallback(self):
+        client, _ = make_timing_out_client(1)
+        resp = client.get_features(
+            feature_service_name="fs", join_key_map={"user_id": "a"}, timeout_budget=0.05, fallback=FALLBACK
+        )
+        self.assertIs(resp, FALLBACK)
+
+    def test_cache_fallback(self):
+        cache = FeatureCache()
+        client, _ = make_timing_out_client(0.1, cache=cache)
+        fresh = client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"})
+
+        # the cache is bypassed for reads, but serves the response when the budget runs out
+        resp = client.get_features(
+            feature_service_name="fs",
+            join_key_map={"user_id": "a"},
+            request_options=RequestOptions(read_from_cache=False),
+            timeout_budget=0.01,
+            fallback=FALLBACK,
+        )
+        self.assertIs(resp, fresh)
+
+        prepared = client.prepare(feature_service_name="fs", request_options=RequestOptions(read_from_cache=False))
+        self.assertIs(prepared.get({"user_id": "a"}, timeout_budget=0.01), fresh)
+
+    @patch("tecton_client._internal.tecton_client.time.sleep")
+    def test_no_retry_beyond_budget(self, mock_sleep):
+        attempts = []
+
+        def handler(request):
+            attempts.append(request)
+            return httpx.Response(503, json={"message": "unavailable"})
+
+        client = TectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.Client(transport=httpx.MockTransport(handler)),
+            retry_policy=RetryPolicy(max_attempts=5),
+        )
+        with patch("tecton_client._internal.retry.random.uniform", return_value=0.2):
+            with self.assertRaises(ServiceUnavailableError):
+                client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"}, timeout_budget=0.1)
+            self.assertEqual(len(attempts), 1)
+
+            with self.assertRaises(ServiceUnavailableError):
+                client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"}, timeout_budget=1)
+            self.assertEqual(len(attempts), 6)
+        mock_sleep.assert_called_with(0.2)
+
+    def test_metadata_fallback_to_registry(self):
+        client, _ = make_timing_out_client(0.1)
+        with self.assertRaises(DeadlineExceededError):
+            client.get_feature_service_metadata(feature_service_name="fs", timeout_budget=0.01)
+
+        metadata = client.get_feature_service_metadata(feature_service_name="fs")
+        self.assertIs(client.get_feature_service_metadata(feature_service_name="fs", timeout_budget=0.01), metadata)
+
+    def test_batch_partial_results(self):
+        client, _ = make_timing_out_client(0.1, max_workers=2)
+        rows = [GetFeaturesRequestData({"user_id": str(i)}) for i in range(4)]
+        resp = client.get_features_batch(
+            feature_service_name="fs",
+            request_data=rows,
+            micro_batch_size=2,
+            allow_partial_results=True,
+            timeout_budget=0.01,
+        )
+        self.assertEqual(resp.responses, [None] * 4)
+        self.assertTrue(all(isinstance(error, DeadlineExceededError) for error in resp.errors))
+
+        with self.assertRaises(DeadlineExceededError):
+            client.get_features_batch(feature_service_name="fs", request_data=rows, timeout_budget=0.01)
+
+
+class TestAsyncDeadline(IsolatedAsyncioTestCase):
+    async def test_deadline_exceeded(self):
+        server = StandInFeatureServer(latency=lambda n: 1.0)
+        client = make_async_client(server)
+        start = time.monotonic()
+        with self.assertRaises(DeadlineExceededError):
+            await client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"}, timeout_budget=0.05)
+        self.assertLess(time.monotonic() - start, 0.5)
+        # the request which ran out of budget is cancelled
+        await asyncio.sleep(0)
+        self.assertEqual(server.cancelled, 1)
+
+    async def test_fallback(self):
+        server = StandInFeatureServer(latency=lambda n: 1.0)
+        client = make_async_client(server)
+        resp = await client.get_features(
+            feature_service_name="fs", join_key_map={"user_id": "a"}, timeout_budget=0.05, fallback=FALLBACK
+        )
+        self.assertIs(resp, FALLBACK)
+
+        prepared = client.prepare(feature_service_name="fs")
+        self.assertIs(await prepared.get({"user_id": "a"}, timeout_budget=0.05, fallback=FALLBACK), FALLBACK)
+
+    async def test_shared_deadline(self):
+        server = StandInFeatureServer(latency=lambda n: 0.03)
+        client = make_async_client(server)
+        deadline = Deadline(0.05)
+        await client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"}, timeout_budget=deadline)
+        # the second call only has what is left of the shared budget
+        with self.assertRaises(DeadlineExceededError):
+            await client.get_features(feature_service_name="fs", join_key_map={"user_id": "b"}, timeout_budget=deadline)
+
+    async def test_coalesced_callers_have_their_own_budgets(self):
+        server = StandInFeatureServer(latency=lambda n: 0.1)
+        client = make_async_client(server, coalesce_requests=True)
+        short, long = await asyncio.gather(
+            client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"}, timeout_budget=0.01),
+            client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"}, timeout_budget=1),
+            return_exceptions=True,
+        )
+        self.assertIsInstance(short, DeadlineExceededError)
+        self.assertEqual(long.result.features, [0])
+        self.assertEqual(len(server.requests), 1)
+
+    async def test_batch_partial_results(self):
+        server = StandInFeatureServer(latency=lambda n: 1.0)
+        client = make_async_client(server)
+        resp = await client.get_features_batch(
+            feature_service_name="fs",
+            request_data=[GetFeaturesRequestData({"user_id": str(i)}) for i in range(4)],
+            micro_batch_size=2,
+            allow_partial_results=True,
+            timeout_budget=0.05,
+        )
+        self.assertEqual(resp.responses, [None] * 4)
+        self.assertTrue(all(isinstance(error, DeadlineExceededError) for error in resp.errors))
@@ -0,0 +1,170 @@
+import json
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+import httpx
+from helpers import make_async_client, make_client
+from stand_in_server import LoopbackFeatureServer, StandInFeatureServer
+
+from tecton_client import (
+    FeatureCache,
+    GetFeaturesRequestData,
+    LatencyHistogram,
+    LatencyHistograms,
+    TectonClient,
+)
+from tecton_client._internal.instrumentation import PHASES
+from tecton_client.exceptions import NotFoundError
+
+FEATURES_BODY = {"result": {"features": [1, "a"]}}
+
+
+class TestRequestHooks(TestCase):
+    def test_timings(self):
+        timings = []
+        client = make_client(lambda request: httpx.Response(200, json=FEATURES_BODY))
+        client.add_request_hook(timings.append)
+        client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"})
+
+        [recorded] = timings
+        self.assertEqual((recorded.path, recorded.feature_service), ("get_features", "fs"))
+        self.assertEqual((recorded.status_code, recorded.attempts, recorded.cache_hit), (200, 1, False))
+        self.assertGreater(recorded.request_bytes, 0)
+        self.assertEqual(recorded.response_bytes, len(json.dumps(FEATURES_BODY, separators=(",", ":"))))
+        self.assertIsNone(recorded.error)
+        self.assertEqual(list(recorded.phases()), list(PHASES))
+        self.assertGreater(recorded.network_seconds, 0)
+        phases = recorded.phases()
+        self.assertLessEqual(sum(phases.values()) - phases["total"], phases["total"])
+
+    def test_cache_hits_and_errors(self):
+        timings = []
+        client = make_client(
+            lambda request: httpx.Response(404, json={"message": "not found"})
+            if b"missing" in request.content
+            else httpx.Response(200, json=FEATURES_BODY),
+            cache=FeatureCache(default_ttl_seconds=60),
+        )
+        client.add_request_hook(timings.append)
+        client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"})
+        client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"})
+        with self.assertRaises(NotFoundError):
+            client.get_features(feature_service_name="missing", join_key_map={"user_id": "a"})
+
+        self.assertEqual([t.cache_hit for t in timings], [False, True, False])
+        self.assertEqual(timings[1].attempts, 0)
+        self.assertEqual(timings[2].status_code, 404)
+        self.assertIsInstance(timings[2].error, NotFoundError)
+
+    def test_batch_metadata_and_prepared(self):
+        def handler(request):
+            if request.url.path.endswith("metadata"):
+                return httpx.Response(
+                    200,
+                    json={
+                        "featureServiceType": "DEFAULT",
+                        "inputJoinKeys": [],
+                        "inputRequestContextKeys": [],
+                        "featureValues": [],
+                    },
+                )
+            if request.url.path.endswith("batch"):
+                return httpx.Response(200, json={"result": [{"features": [1]}, {"features": [2]}]})
+            return httpx.Response(200, json=FEATURES_BODY)
+
+        timings = []
+        client = make_client(handler)
+        client.add_request_hook(timings.append)
+        client.get_features_batch(
+            feature_service_name="fs", request_data=[GetFeaturesRequestData({"user_id": str(i)}) for i in range(2)]
+        )
+        client.get_feature_service_metadata(feature_service_name="fs")
+        client.prepare(feature_service_name="fs").get({"user_id": "a"})
+        self.assertEqual(
+            [t.path for t in timings], ["get_features_batch", "get_feature_service_metadata", "get_features"]
+        )
+        self.assertTrue(all(t.status_code == 200 for t in timings))
+
+    def test_hooks_are_optional_and_safe(self):
+        def failing_hook(timings):
+            raise RuntimeError("broken hook")
+
+        timings = []
+        client = make_client(lambda request: httpx.Response(200, json=FEATURES_BODY))
+        self.assertIsNone(client._start_timings("get_features", "fs"))
+        client.add_request_hook(failing_hook)
+        client.add_request_hook(timings.append)
+        with self.assertLogs("tecton_client._internal.instrumentation", "ERROR"):
+            client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"})
+        self.assertEqual(len(timings), 1)
+
+        client.remove_request_hook(failing_hook)
+        client.remove_request_hook(timings.append)
+        client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"})
+        self.assertEqual(len(timings), 1)
+
+    def test_connect_time_over_loopback(self):
+        timings = []
+        with LoopbackFeatureServer() as server:
+            client = TectonClient(url=server.url, api_key="fake-api-key", default_workspace_name="workspace")
+            client.add_request_hook(timings.append)
+            for _ in range(2):
+                client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"})
+
+        # the first request opens the connection and the second one reuses it
+        self.assertGreater(timings[0].connect_seconds, 0)
+        self.assertEqual(timings[1].connect_seconds, 0)
+        self.assertGreater(timings[1].network_seconds, 0)
+
+
+class TestLatencyHistogram(TestCase):
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        for micros in range(1, 100001):
+            histogram.record(micros / 1e6)
+        self.assertEqual(histogram.count, 100000)
+        self.assertAlmostEqual(histogram.mean_seconds, 0.05, delta=1e-5)
+        for percentile in (50, 90, 99, 99.9):
+            expected = percentile / 1000
+            self.assertAlmostEqual(histogram.percentile(percentile), expected, delta=expected / 2**7)
+        self.assertEqual(histogram.percentile(100), 0.1)
+        self.assertEqual(LatencyHistogram().percentile(50), 0.0)
+
+    def test_snapshot(self):
+        histogram = LatencyHistogram()
+        histogram.record(0.001)
+        snapshot = histogram.snapshot()
+        histogram.record(1.0)
+        self.assertEqual((snapshot.count, snapshot.max_seconds), (1, 0.001))
+
+    def test_latency_histograms_hook(self):
+        histograms = LatencyHistograms()
+        client = make_client(
+            lambda request: httpx.Response(200, json=FEATURES_BODY), cache=FeatureCache(default_ttl_seconds=60)
+        )
+        client.add_request_hook(histograms)
+        for _ in range(3):
+            client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"})
+        snapshot = histograms.snapshot()
+        self.assertEqual(set(snapshot), {("get_features", phase) for phase in PHASES})
+        # the cache hits are not recorded
+        self.assertEqual(snapshot[("get_features", "total")].count, 1)
+        histograms.reset()
+        self.assertEqual(histograms.snapshot(), {})
+
+
+class TestAsyncRequestHooks(IsolatedAsyncioTestCase):
+    async def test_timings(self):
+        timings = []
+        client = make_async_client(StandInFeatureServer(latency=lambda n: 0.01))
+        client.add_request_hook(timings.append)
+        await client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"})
+        await client.prepare(feature_service_name="fs").get({"user_id": "b"})
+        await client.get_features_batch(
+            feature_service_name="fs",
+            request_data=[GetFeaturesRequestData({"user_id": str(i)}) for i in range(4)],
+            micro_batch_size=2,
+        )
+        self.assertEqual(
+            [t.path for t in timings], ["get_features", "get_features", "get_features_batch", "get_features_batch"]
+        )
+        self.assertTrue(all(t.network_seconds >= 0.009 and t.status_code == 200 for t in timings))
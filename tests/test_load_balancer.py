@@ -0,0 +1,173 @@
+import asyncio
+import collections
+from concurrent.futures import ThreadPoolExecutor
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import patch
+
+import httpx
+from stand_in_server import LoopbackFeatureServer, StandInFeatureServer
+
+from tecton_client import AsyncTectonClient, LoadBalancingPolicy, RetryPolicy, TectonClient
+from tecton_client._internal.load_balancer import Endpoint, LoadBalancer
+from tecton_client.exceptions import DeadlineExceededError, ServiceUnavailableError
+
+
+def make_balancer(n, **kwargs):
+    return LoadBalancer([Endpoint(f"http://endpoint-{i}", None) for i in range(n)], LoadBalancingPolicy(**kwargs))
+
+
+class TestLoadBalancer(TestCase):
+    def test_ewma_prefers_fast_endpoints(self):
+        balancer = make_balancer(2)
+        fast, slow = balancer.endpoints
+        for endpoint, latency in ((fast, 0.001), (slow, 0.01)):
+            endpoint.outstanding += 1
+            balancer.on_success(endpoint, latency)
+
+        # the fast endpoint is picked until its load makes it costlier than the idle slow one
+        self.assertTrue(all(balancer.pick() is fast for _ in range(9)))
+        for _ in range(3):
+            balancer.pick()
+        self.assertGreater(slow.outstanding, 0)
+
+    def test_least_outstanding(self):
+        balancer = make_balancer(3, strategy="least_outstanding")
+        for _ in range(9):
+            balancer.pick()
+        self.assertLessEqual(max(e.outstanding for e in balancer.endpoints), 4)
+        self.assertEqual(sum(e.outstanding for e in balancer.endpoints), 9)
+
+    @patch("tecton_client._internal.load_balancer.time.monotonic", return_value=100.0)
+    def test_ejection(self, mock_monotonic):
+        balancer = make_balancer(4, consecutive_failures=2, ejection_seconds=10, max_ejected_fraction=0.5)
+        first, second, third, _ = balancer.endpoints
+        for endpoint in (first, second, third):
+            for _ in range(2):
+                endpoint.outstanding += 1
+                balancer.on_failure(endpoint, 0.001)
+        # at most half of the endpoints are ejected at a time
+        self.assertEqual([stats.ejected for stats in balancer.stats], [True, True, False, False])
+        self.assertTrue(all(balancer.pick() not in (first, second) for _ in range(20)))
+
+        mock_monotonic.return_value = 111.0
+        self.assertFalse(any(stats.ejected for stats in balancer.stats))
+        # a second ejection lasts longer
+        for _ in range(2):
+            first.outstanding += 1
+            balancer.on_failure(first, 0.001)
+        self.assertEqual(first.ejected_until, 131.0)
+
+    @patch("tecton_client._internal.load_balancer.time.monotonic", return_value=100.0)
+    def test_all_ejected(self, mock_monotonic):
+        balancer = make_balancer(2, consecutive_failures=1, max_ejected_fraction=1.0)
+        first_ejected = balancer.pick()
+        balancer.on_failure(first_ejected, 0.001)
+        mock_monotonic.return_value = 101.0
+        balancer.on_failure(balancer.pick(), 0.001)
+        self.assertTrue(all(stats.ejected for stats in balancer.stats))
+        # the endpoint which comes back first is picked
+        self.assertIs(balancer.pick(), first_ejected)
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            LoadBalancingPolicy(strategy="round_robin")
+
+
+class TestLoadBalancedClient(TestCase):
+    def test_routes_to_faster_endpoints(self):
+        with LoopbackFeatureServer(latency=0.002) as fast, LoopbackFeatureServer(
+            latency=0.02
+        ) as slow, LoopbackFeatureServer(latency=0.05) as slowest:
+            client = TectonClient(
+                url=[fast.url, slow.url, slowest.url], api_key="fake-api-key", default_workspace_name="workspace"
+            )
+            # every endpoint has its own connection pool
+            self.assertEqual(len({id(endpoint.client) for endpoint in client._load_balancer.endpoints}), 3)
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                responses = list(
+                    executor.map(
+                        lambda i: client.get_features(feature_service_name="fs", join_key_map={"user_id": str(i)}),
+                        range(120),
+                    )
+                )
+        served_by = collections.Counter(response.result.features[0] for response in responses)
+        self.assertGreater(served_by[fast.url], served_by[slow.url])
+        self.assertGreater(served_by[slow.url], served_by[slowest.url])
+        stats = {s.url: s for s in client.endpoint_stats}
+        self.assertLess(stats[fast.url].ewma_latency_seconds, stats[slowest.url].ewma_latency_seconds)
+        self.assertEqual(sum(s.outstanding for s in stats.values()), 0)
+
+    def test_ejects_failing_endpoint(self):
+        with LoopbackFeatureServer() as healthy, LoopbackFeatureServer(status_code=503) as failing:
+            client = TectonClient(
+                url=[healthy.url, failing.url],
+                api_key="fake-api-key",
+                default_workspace_name="workspace",
+                load_balancing=LoadBalancingPolicy(consecutive_failures=1),
+                retry_policy=RetryPolicy(max_attempts=3, initial_backoff_seconds=0.001),
+            )
+            for i in range(30):
+                resp = client.get_features(feature_service_name="fs", join_key_map={"user_id": str(i)})
+                self.assertEqual(resp.result.features, [healthy.url])
+
+        stats = {s.url: s for s in client.endpoint_stats}
+        self.assertTrue(stats[failing.url].ejected)
+        self.assertEqual(stats[failing.url].ejections, 1)
+        self.assertEqual(failing.requests, 1)
+
+    def test_deadline_is_not_a_failure(self):
+        with LoopbackFeatureServer(latency=0.1) as slow, LoopbackFeatureServer(latency=0.1) as slower:
+            client = TectonClient(
+                url=[slow.url, slower.url],
+                api_key="fake-api-key",
+                default_workspace_name="workspace",
+                load_balancing=LoadBalancingPolicy(consecutive_failures=1),
+            )
+            for _ in range(2):
+                with self.assertRaises(DeadlineExceededError):
+                    client.get_features(feature_service_name="fs", timeout_budget=0.01)
+        for stats in client.endpoint_stats:
+            self.assertEqual((stats.failures, stats.outstanding, stats.ejected), (0, 0, False))
+
+    def test_single_url(self):
+        client = TectonClient(url="https://fake.tecton.ai", api_key="fake-api-key")
+        self.assertIsNone(client._load_balancer)
+        self.assertEqual(client.endpoint_stats, [])
+
+
+class TestAsyncLoadBalancedClient(IsolatedAsyncioTestCase):
+    async def test_routes_around_slow_and_failing_endpoints(self):
+        servers = {
+            "fast.tecton.ai": StandInFeatureServer(latency=lambda n: 0.005),
+            "slow.tecton.ai": StandInFeatureServer(latency=lambda n: 0.05),
+        }
+
+        async def handler(request):
+            if request.url.host == "failing.tecton.ai":
+                return httpx.Response(503, json={"message": "unavailable"})
+            return await servers[request.url.host].handle_async(request)
+
+        client = AsyncTectonClient(
+            url=[f"https://{host}" for host in (*servers, "failing.tecton.ai")],
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+            load_balancing=LoadBalancingPolicy(consecutive_failures=1, max_ejected_fraction=0.5),
+        )
+        # one request at a time, so that the latency of each endpoint is measured without contention for the event loop
+        failures = 0
+        for i in range(40):
+            try:
+                await client.get_features(feature_service_name="fs", join_key_map={"user_id": str(i)})
+            except ServiceUnavailableError:
+                failures += 1
+        self.assertLessEqual(failures, 1)
+        self.assertGreater(len(servers["fast.tecton.ai"].requests), len(servers["slow.tecton.ai"].requests))
+        self.assertTrue(client.endpoint_stats[2].ejected)
+
+        results = await asyncio.gather(
+            *(client.get_features(feature_service_name="fs", join_key_map={"user_id": str(i)}) for i in range(40)),
+            return_exceptions=True,
+        )
+        self.assertFalse([result for result in results if isinstance(result, Exception)])
+        self.assertEqual(sum(stats.outstanding for stats in client.endpoint_stats), 0)
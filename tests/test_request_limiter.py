@@ -0,0 +1,168 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import patch
+
+import httpx
+from helpers import make_async_client, make_client
+from stand_in_server import StandInFeatureServer
+
+from tecton_client import GetFeaturesRequestData, RequestLimits
+from tecton_client._internal.request_limiter import TokenBucket
+from tecton_client.exceptions import DeadlineExceededError, RequestLimitExceededError
+
+
+class BlockingServer:
+    """A sync transport handler which holds every request until released, tracking the requests in flight"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, request):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.release.wait(5)
+        with self._lock:
+            self.in_flight -= 1
+        return httpx.Response(200, json={"result": {"features": [1]}})
+
+
+class TestRequestLimiter(TestCase):
+    def test_max_in_flight(self):
+        server = BlockingServer()
+        client = make_client(server, request_limits=RequestLimits(max_in_flight=2))
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            futures = [
+                executor.submit(client.get_features, feature_service_name="fs", join_key_map={"user_id": str(i)})
+                for i in range(6)
+            ]
+            time.sleep(0.05)
+            self.assertEqual(client.request_limit_stats[None].queued, 4)
+            server.release.set()
+            for future in futures:
+                future.result()
+        self.assertEqual(server.max_in_flight, 2)
+
+        stats = client.request_limit_stats[None]
+        self.assertEqual((stats.in_flight, stats.queued, stats.admitted, stats.rejected), (0, 0, 6, 0))
+        self.assertGreater(stats.max_wait_seconds, 0.04)
+
+    def test_fail_fast(self):
+        server = BlockingServer()
+        client = make_client(server, request_limits=RequestLimits(max_in_flight=1, max_wait_seconds=0))
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(client.get_features, feature_service_name="fs", join_key_map={"user_id": "a"})
+            time.sleep(0.05)
+            with self.assertRaises(RequestLimitExceededError):
+                client.get_features(feature_service_name="fs", join_key_map={"user_id": "b"})
+            server.release.set()
+            future.result()
+        self.assertEqual(client.request_limit_stats[None].rejected, 1)
+
+    def test_bounded_wait(self):
+        server = BlockingServer()
+        client = make_client(server, request_limits=RequestLimits(max_in_flight=1, max_wait_seconds=0.05))
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(client.get_features, feature_service_name="fs", join_key_map={"user_id": "a"})
+            time.sleep(0.01)
+            start = time.monotonic()
+            with self.assertRaises(RequestLimitExceededError):
+                client.get_features(feature_service_name="fs", join_key_map={"user_id": "b"})
+            self.assertGreaterEqual(time.monotonic() - start, 0.04)
+
+            # a shorter timeout budget bounds the wait instead
+            with self.assertRaises(DeadlineExceededError):
+                client.get_features(feature_service_name="fs", join_key_map={"user_id": "b"}, timeout_budget=0.01)
+            server.release.set()
+            future.result()
+
+    def test_requests_per_second(self):
+        client = make_client(
+            lambda request: httpx.Response(200, json={"result": {"features": [1]}}),
+            request_limits=RequestLimits(requests_per_second=50, burst=2),
+        )
+        start = time.monotonic()
+        for _ in range(5):
+            client.get_features(feature_service_name="fs", join_key_map={"user_id": "a"})
+        # two requests of burst, then one every 20ms
+        self.assertGreaterEqual(time.monotonic() - start, 0.055)
+        self.assertEqual(client.request_limit_stats[None].admitted, 5)
+
+    def test_limits_by_feature_service(self):
+        client = make_client(
+            lambda request: httpx.Response(200, json={"result": {"features": [1]}}),
+            request_limits_by_feature_service={"fs_a": RequestLimits(max_in_flight=1)},
+        )
+        client.get_features(feature_service_name="fs_a", join_key_map={"user_id": "a"})
+        client.get_features(feature_service_name="fs_b", join_key_map={"user_id": "a"})
+        self.assertEqual(list(client.request_limit_stats), ["fs_a"])
+        self.assertEqual(client.request_limit_stats["fs_a"].admitted, 1)
+
+
+class TestTokenBucket(TestCase):
+    @patch("tecton_client._internal.request_limiter.time.monotonic", return_value=0.0)
+    def test_reservations(self, mock_monotonic):
+        bucket = TokenBucket(rate=10, burst=2)
+        self.assertEqual([bucket.reserve(None) for _ in range(2)], [0.0, 0.0])
+        # queued requests are due one after the other
+        self.assertAlmostEqual(bucket.reserve(None), 0.1)
+        self.assertAlmostEqual(bucket.reserve(None), 0.2)
+        self.assertIsNone(bucket.reserve(0.25))
+
+        mock_monotonic.return_value = 1.0
+        self.assertEqual(bucket.reserve(0), 0.0)
+
+
+class TestAsyncRequestLimiter(IsolatedAsyncioTestCase):
+    async def test_max_in_flight(self):
+        server = StandInFeatureServer(latency=lambda n: 0.01)
+        client = make_async_client(server, request_limits=RequestLimits(max_in_flight=3))
+        await asyncio.gather(
+            *(client.get_features(feature_service_name="fs", join_key_map={"user_id": str(i)}) for i in range(10))
+        )
+        self.assertEqual(server.max_in_flight, 3)
+        stats = client.request_limit_stats[None]
+        self.assertEqual((stats.in_flight, stats.queued, stats.admitted), (0, 0, 10))
+        self.assertGreater(stats.mean_wait_seconds, 0)
+
+    async def test_fail_fast(self):
+        server = StandInFeatureServer(latency=lambda n: 0.01)
+        client = make_async_client(server, request_limits=RequestLimits(max_in_flight=2, max_wait_seconds=0))
+        results = await asyncio.gather(
+            *(client.get_features(feature_service_name="fs", join_key_map={"user_id": str(i)}) for i in range(5)),
+            return_exceptions=True,
+        )
+        self.assertEqual(sum(isinstance(result, RequestLimitExceededError) for result in results), 3)
+        self.assertEqual(len(server.requests), 2)
+        self.assertEqual(client.request_limit_stats[None].rejected, 3)
+
+    async def test_requests_per_second_with_bounded_wait(self):
+        server = StandInFeatureServer()
+        client = make_async_client(
+            server, request_limits=RequestLimits(requests_per_second=20, burst=1, max_wait_seconds=0.06)
+        )
+        results = await asyncio.gather(
+            *(client.get_features(feature_service_name="fs", join_key_map={"user_id": str(i)}) for i in range(4)),
+            return_exceptions=True,
+        )
+        # requests are due at 0, 50ms, 100ms and 150ms; the last two would wait too long
+        self.assertEqual(
+            [isinstance(result, RequestLimitExceededError) for result in results], [False, False, True, True]
+        )
+
+    async def test_micro_batches_are_limited(self):
+        server = StandInFeatureServer(latency=lambda n: 0.01)
+        client = make_async_client(server, request_limits=RequestLimits(max_in_flight=1))
+        resp = await client.get_features_batch(
+            feature_service_name="fs",
+            request_data=[GetFeaturesRequestData({"user_id": str(i)}) for i in range(3)],
+            micro_batch_size=1,
+        )
+        self.assertEqual(len(resp.responses), 3)
+        self.assertEqual(server.max_in_flight, 1)
@@ -0,0 +1,103 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+import httpx
+from helpers import make_client
+
+from tecton_client import RetryBudget, RetryPolicy
+from tecton_client.exceptions import NotFoundError, ResourceExhaustedError, ServiceUnavailableError
+
+
+def make_scripted_client(responses, retry_policy):
+    """A client whose transport returns (or raises) the given responses in order"""
+    attempts = []
+
+    def handler(request):
+        response = responses[min(len(attempts), len(responses) - 1)]
+        attempts.append(request)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    return make_client(handler, retry_policy=retry_policy), attempts
+
+
+OK = httpx.Response(200, json={"result": {"features": [1]}})
+UNAVAILABLE = httpx.Response(503, json={"message": "unavailable"})
+
+
+@patch("tecton_client._internal.tecton_client.time.sleep")
+class TestRetry(TestCase):
+    def get_features(self, client):
+        return client.get_features(feature_service_name="fs", join_key_map={"user_id": "id123"})
+
+    def test_retries_until_success(self, mock_sleep):
+        client, attempts = make_scripted_client([UNAVAILABLE, UNAVAILABLE, OK], RetryPolicy(max_attempts=3))
+        self.assertEqual(self.get_features(client).result.features, [1])
+        self.assertEqual(len(attempts), 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    def test_gives_up_after_max_attempts(self, mock_sleep):
+        client, attempts = make_scripted_client([UNAVAILABLE], RetryPolicy(max_attempts=2))
+        with self.assertRaises(ServiceUnavailableError):
+            self.get_features(client)
+        self.assertEqual(len(attempts), 2)
+
+    def test_does_not_retry_other_errors(self, mock_sleep):
+        client, attempts = make_scripted_client([httpx.Response(404, json={"message": "nope"}), OK], RetryPolicy())
+        with self.assertRaises(NotFoundError):
+            self.get_features(client)
+        self.assertEqual(len(attempts), 1)
+
+    def test_retries_transport_errors(self, mock_sleep):
+        client, attempts = make_scripted_client([httpx.ConnectError("refused"), OK], RetryPolicy())
+        self.assertEqual(self.get_features(client).result.features, [1])
+
+        client, attempts = make_scripted_client(
+            [httpx.ConnectError("refused"), OK], RetryPolicy(retry_transport_errors=False)
+        )
+        with self.assertRaises(httpx.ConnectError):
+            self.get_features(client)
+
+    def test_retry_after(self, mock_sleep):
+        throttled = httpx.Response(429, headers={"Retry-After": "2"}, json={"message": "slow down"})
+        client, attempts = make_scripted_client([throttled, OK], RetryPolicy(max_retry_after_seconds=3))
+        self.get_features(client)
+        mock_sleep.assert_called_once_with(2.0)
+
+        client, attempts = make_scripted_client([throttled, OK], RetryPolicy(max_retry_after_seconds=1))
+        with self.assertRaises(ResourceExhaustedError):
+            self.get_features(client)
+        self.assertEqual(len(attempts), 1)
+
+    def test_total_deadline(self, mock_sleep):
+        policy = RetryPolicy(max_attempts=10, initial_backoff_seconds=1, total_deadline_seconds=0.5)
+        with patch("tecton_client._internal.retry.random.uniform", return_value=0.6):
+            client, attempts = make_scripted_client([UNAVAILABLE], policy)
+            with self.assertRaises(ServiceUnavailableError):
+                self.get_features(client)
+        self.assertEqual(len(attempts), 1)
+
+    def test_budget(self, mock_sleep):
+        budget = RetryBudget(ratio=0.5, min_retries_per_second=0, max_tokens=1)
+        client, attempts = make_scripted_client([UNAVAILABLE], RetryPolicy(max_attempts=5, budget=budget))
+        with self.assertRaises(ServiceUnavailableError):
+            self.get_features(client)
+        # the budget starts with a single token, and a request only deposits half a token
+        self.assertEqual(len(attempts), 2)
+        self.assertLess(budget.available, 1)
+
+
+class TestRetryPolicy(TestCase):
+    def test_full_jitter_backoff(self):
+        policy = RetryPolicy(initial_backoff_seconds=0.1, max_backoff_seconds=0.3, backoff_multiplier=2)
+        for attempt, cap in [(1, 0.1), (2, 0.2), (3, 0.3), (10, 0.3)]:
+            with patch("tecton_client._internal.retry.random.uniform") as mock_uniform:
+                policy.backoff(attempt)
+                mock_uniform.assert_called_once_with(0, cap)
+
+    def test_non_json_error_body(self):
+        client, _ = make_scripted_client([httpx.Response(503, text="<html>bad gateway</html>")], None)
+        with self.assertRaisesRegex(ServiceUnavailableError, "bad gateway") as context:
+            client.get_features(feature_service_name="fs", join_key_map={"user_id": "id123"})
+        self.assertEqual(context.exception.status_code, 503)
@@ -0,0 +1,107 @@
+import os
+import tempfile
+import time
+from unittest import TestCase, skipUnless
+
+import httpx
+from helpers import make_response
+
+from tecton_client import SharedFeatureCache, TectonClient
+from tecton_client._internal.shared_cache import fcntl
+
+METADATA = {"features": [{"name": "fv.count", "dataType": {"type": "int64"}}]}
+
+
+@skipUnless(fcntl is not None, "requires fcntl")
+class TestSharedFeatureCache(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "features.cache")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_put_get(self):
+        cache = SharedFeatureCache(self.path)
+        cache.put(b"k" * 16, make_response(["1", 0.5, None], METADATA), "fs")
+        self.assertEqual(cache.get(b"k" * 16), make_response(["1", 0.5, None], METADATA))
+        self.assertIsNone(cache.get(b"other"))
+        self.assertEqual(cache.stats.hits, 1)
+        self.assertEqual(cache.stats.misses, 1)
+        self.assertEqual(len(cache), 1)
+
+        # large responses are compressed to fit the slot
+        features = ["value"] * 1000
+        cache.put("large", make_response(features), "fs")
+        self.assertEqual(cache.get("large").result.features, features)
+
+        # responses which don't fit are not cached
+        cache.put("random", make_response([os.urandom(1024).hex() for _ in range(4)]), "fs")
+        self.assertIsNone(cache.get("random"))
+
+        cache.clear()
+        self.assertIsNone(cache.get(b"k" * 16))
+        self.assertEqual(len(cache), 0)
+
+    def test_ttl(self):
+        cache = SharedFeatureCache(self.path, default_ttl_seconds=0.01, ttl_seconds_by_feature_service={"off": 0})
+        cache.put("key", make_response([1]), "fs")
+        cache.put("off", make_response([1]), "off")
+        self.assertIsNone(cache.get("off"))
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("key"))
+        self.assertEqual(cache.stats.expirations, 1)
+
+    def test_eviction(self):
+        # a single set of 8 slots, so that the 9th entry evicts the one which expires soonest
+        cache = SharedFeatureCache(self.path, max_size=8, ttl_seconds_by_feature_service={"short": 30})
+        cache.put("short", make_response(["short"]), "short")
+        for i in range(8):
+            cache.put(i, make_response([i]), "fs")
+        self.assertEqual(cache.max_size, 8)
+        self.assertIsNone(cache.get("short"))
+        self.assertEqual([cache.get(i).result.features for i in range(8)], [[i] for i in range(8)])
+        self.assertEqual(cache.stats.evictions, 1)
+
+    def test_shared_between_instances(self):
+        writer = SharedFeatureCache(self.path, max_size=100)
+        reader = SharedFeatureCache(self.path, max_size=100)
+        writer.put("key", make_response([1]), "fs")
+        self.assertEqual(reader.get("key").result.features, [1])
+        with self.assertRaises(ValueError):
+            SharedFeatureCache(self.path, max_size=200)
+        writer.close()
+        reader.close()
+
+    @skipUnless(hasattr(os, "fork"), "requires fork")
+    def test_shared_with_forked_process(self):
+        cache = SharedFeatureCache(max_size=100)
+        pid = os.fork()
+        if pid == 0:
+            cache.put("key", make_response(["from child"]), "fs")
+            os._exit(0)
+        os.waitpid(pid, 0)
+        self.assertEqual(cache.get("key").result.features, ["from child"])
+
+    def test_client(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, json={"result": {"features": ["1"]}})
+
+        cache = SharedFeatureCache(self.path)
+        clients = [
+            TectonClient(
+                url="https://fake.tecton.ai",
+                api_key="fake-api-key",
+                default_workspace_name="workspace",
+                client=httpx.Client(transport=httpx.MockTransport(handler)),
+                cache=cache,
+            )
+            for _ in range(2)
+        ]
+        for client in clients:
+            resp = client.get_features(feature_service_name="fs", join_key_map={"user_id": "1"})
+            self.assertEqual(resp.result.features, ["1"])
+        self.assertEqual(len(requests), 1)
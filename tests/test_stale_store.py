@@ -0,0 +1,155 @@
+import json
+import threading
+import time
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+import httpx
+from helpers import make_response
+
+from tecton_client import AsyncTectonClient, StaleFallbackStore, TectonClient
+from tecton_client.exceptions import BadRequestError, DeadlineExceededError, ServiceUnavailableError
+
+
+class FlakyHandler:
+    """Answers with the number of requests so far, or with status while it is set"""
+
+    def __init__(self):
+        self.requests = 0
+        self.status = None
+        self.lock = threading.Lock()
+
+    def response(self, request):
+        with self.lock:
+            self.requests += 1
+            requests = self.requests
+        if self.status is not None:
+            return httpx.Response(self.status, json={"message": "failed"})
+        json.loads(request.content)
+        return httpx.Response(200, json={"result": {"features": [requests]}})
+
+
+class TestStaleFallbackStore(TestCase):
+    def test_get_flags_copy(self):
+        store = StaleFallbackStore()
+        response = make_response([1])
+        store.put("key", response)
+        stale = store.get("key")
+        self.assertTrue(stale.is_stale)
+        self.assertFalse(response.is_stale)
+        self.assertEqual(stale.result.features, [1])
+        self.assertIsNone(store.get("other"))
+        self.assertEqual((store.stats.hits, store.stats.misses), (1, 1))
+
+    def test_max_staleness(self):
+        store = StaleFallbackStore(max_staleness_seconds=0.01)
+        store.put("key", make_response([1]))
+        time.sleep(0.02)
+        self.assertIsNone(store.get("key"))
+        self.assertEqual(len(store), 0)
+
+    def test_eviction(self):
+        store = StaleFallbackStore(max_size=2)
+        for key in ("a", "b", "a", "c"):
+            store.put(key, make_response([key]))
+        self.assertIsNone(store.get("b"))
+        self.assertEqual(store.get("a").result.features, ["a"])
+        self.assertEqual(store.stats.evictions, 1)
+        with self.assertRaises(ValueError):
+            StaleFallbackStore(max_size=0)
+
+    def test_single_refresh(self):
+        store = StaleFallbackStore()
+        self.assertTrue(store.start_refresh("key"))
+        self.assertFalse(store.start_refresh("key"))
+        store.finish_refresh("key")
+        self.assertTrue(store.start_refresh("key"))
+        self.assertEqual(store.stats.refreshes, 2)
+
+
+class TestStaleFallback(TestCase):
+    def setUp(self):
+        self.handler = FlakyHandler()
+        self.store = StaleFallbackStore()
+        self.client = TectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.Client(transport=httpx.MockTransport(self.handler.response)),
+            stale_store=self.store,
+        )
+
+    def get_features(self, **kwargs):
+        return self.client.get_features(feature_service_name="fs", join_key_map={"user_id": "1"}, **kwargs)
+
+    def wait_for_refresh(self):
+        deadline = time.monotonic() + 5
+        while self.store._refreshing and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+    def test_serves_stale_and_refreshes(self):
+        self.assertEqual(self.get_features().result.features, [1])
+
+        self.handler.status = 503
+        stale = self.get_features()
+        self.assertTrue(stale.is_stale)
+        self.assertEqual(stale.result.features, [1])
+        self.wait_for_refresh()
+        self.assertEqual(self.store.stats.refreshes, 1)
+
+        # the refresh succeeds once the feature server recovers, and the store holds its response
+        self.handler.status = None
+        self.assertEqual(self.get_features().result.features, [4])
+        self.handler.status = 503
+        self.assertEqual(self.get_features().result.features, [4])
+
+    def test_deadline(self):
+        self.get_features()
+        stale = self.get_features(timeout_budget=0)
+        self.assertTrue(stale.is_stale)
+        self.wait_for_refresh()
+
+    def test_prepared_request(self):
+        request = self.client.prepare(feature_service_name="fs")
+        request.get({"user_id": "1"})
+        self.handler.status = 503
+        self.assertTrue(request.get({"user_id": "1"}).is_stale)
+        self.wait_for_refresh()
+        with self.assertRaises(ServiceUnavailableError):
+            request.get({"user_id": "2"})
+
+    def test_errors_without_stale_response(self):
+        self.get_features()
+        self.handler.status = 400
+        with self.assertRaises(BadRequestError):
+            self.get_features()
+        self.handler.status = 503
+        with self.assertRaises(ServiceUnavailableError):
+            self.get_features(allow_partial_results=True, workspace_name="other")
+
+
+class TestAsyncStaleFallback(IsolatedAsyncioTestCase):
+    async def test_serves_stale_and_refreshes(self):
+        handler = FlakyHandler()
+        store = StaleFallbackStore()
+        client = AsyncTectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler.response)),
+            stale_store=store,
+        )
+        await client.get_features(feature_service_name="fs", join_key_map={"user_id": "1"})
+        handler.status = 503
+        stale = await client.get_features(feature_service_name="fs", join_key_map={"user_id": "1"})
+        self.assertTrue(stale.is_stale)
+        handler.status = None
+        while client._refresh_tasks:
+            await next(iter(client._refresh_tasks))
+        self.assertEqual(handler.requests, 3)
+        self.assertFalse(store._refreshing)
+
+        handler.status = 503
+        stale = await client.get_features(feature_service_name="fs", join_key_map={"user_id": "1"})
+        self.assertEqual(stale.result.features, [3])
+        with self.assertRaises(DeadlineExceededError):
+            await client.get_features(feature_service_name="fs", join_key_map={"user_id": "2"}, timeout_budget=0)
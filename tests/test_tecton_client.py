@@ -1,12 +1,16 @@
 import json
+import random
+import threading
+import time
 from unittest import TestCase
 from unittest.mock import MagicMock, patch
 
 import httpx
 from httpx import Headers
+from stand_in_server import LoopbackFeatureServer
 
-from tecton_client import MetadataOptions, RequestOptions, TectonClient
-from tecton_client.exceptions import NotFoundError
+from tecton_client import FeatureCache, GetFeaturesRequestData, MetadataOptions, RequestOptions, TectonClient
+from tecton_client.exceptions import NotFoundError, ServiceUnavailableError
 
 
 class TestTectonClient(TestCase):
@@ -31,7 +35,11 @@ class TestTectonClient(TestCase):
         TectonClient(url="https://fake.tecton.ai", api_key="fake-api-key", default_workspace_name="workspace")
         mock_httpx_constructor.assert_called_once_with(
             headers=Headers(
-                {"authorization": "Tecton-key fake-api-key", "user-agent": "tecton-http-python-client 0.1.0test"}
+                {
+                    "authorization": "Tecton-key fake-api-key",
+                    "user-agent": "tecton-http-python-client 0.1.0test",
+                    "content-type": "application/json",
+                }
             )
         )
 
@@ -46,7 +54,11 @@ class TestTectonClient(TestCase):
         mock_httpx_constructor.assert_not_called()
         self.assertEquals(
             mock_client.headers,
-            {"authorization": "Tecton-key fake-api-key", "user-agent": "tecton-http-python-client 0.1.0test"},
+            {
+                "authorization": "Tecton-key fake-api-key",
+                "user-agent": "tecton-http-python-client 0.1.0test",
+                "content-type": "application/json",
+            },
         )
 
     def test_default_workspace_null(self):
@@ -95,7 +107,7 @@ class TestTectonClient(TestCase):
     def test_get_features_encode(self):
         # using just magic_mock here in order to assert on client.post.assert_called_with
         mock_http_client = MagicMock()
-        mock_http_client.post.return_value.json.return_value = {"result": {"features": []}}
+        mock_http_client.post.return_value.content = b'{"result": {"features": []}}'
         client = TectonClient(
             url="https://fake.tecton.ai",
             api_key="fake-api-key",
@@ -108,9 +120,11 @@ class TestTectonClient(TestCase):
             metadata_options=MetadataOptions(include_effective_times=True, include_data_types=False),
             request_options=RequestOptions(read_from_cache=False),
         )
-        mock_http_client.post.assert_called_with(
-            "https://fake.tecton.ai/api/v1/feature-service/get-features",
-            json={
+        (url,), kwargs = mock_http_client.post.call_args
+        self.assertEqual(url, "https://fake.tecton.ai/api/v1/feature-service/get-features")
+        self.assertEqual(
+            json.loads(kwargs["content"]),
+            {
                 "params": {
                     "workspaceName": "workspace",
                     "featureServiceName": "fake-feature-service",
@@ -140,6 +154,35 @@ class TestTectonClient(TestCase):
         resp = client.get_features(feature_service_name="fake-feature-service", join_key_map={"user_id": "id123"})
         self.assertEquals(resp.result.features, [])
 
+    def test_cache(self):
+        cache = FeatureCache()
+        client = TectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=self.mock_client,
+            cache=cache,
+        )
+        for _ in range(3):
+            client.get_features(feature_service_name="fake-feature-service", join_key_map={"user_id": "id123"})
+        self.assertEqual(len(self.mock_client._request_log), 1)
+        self.assertEqual((cache.stats.hits, cache.stats.misses), (2, 1))
+
+        client.get_features(
+            feature_service_name="fake-feature-service",
+            join_key_map={"user_id": "id123"},
+            request_options=RequestOptions(read_from_cache=False),
+        )
+        self.assertEqual(len(self.mock_client._request_log), 2)
+
+        client.get_features(
+            feature_service_name="fake-feature-service",
+            join_key_map={"user_id": "id456"},
+            request_options=RequestOptions(write_to_cache=False),
+        )
+        client.get_features(feature_service_name="fake-feature-service", join_key_map={"user_id": "id456"})
+        self.assertEqual(len(self.mock_client._request_log), 4)
+
     def test_raise_error(self):
         test_client = httpx.Client(
             transport=httpx.MockTransport(lambda request: httpx.Response(404, json={"result": {"features": []}}))
@@ -149,3 +192,347 @@ class TestTectonClient(TestCase):
         )
         with self.assertRaises(NotFoundError):
             client.get_features(feature_service_name="fake-feature-service", join_key_map={"user_id": "id123"})
+
+
+class TestGetFeaturesBatch(TestCase):
+    def setUp(self):
+        self.request_log = []
+
+        def handler(request):
+            params = json.loads(request.content.decode("utf8"))["params"]
+            self.request_log.append(params)
+            if any(row["joinKeyMap"].get("user_id") == "bad" for row in params["requestData"]):
+                return httpx.Response(503, json={"message": "unavailable"})
+            return httpx.Response(
+                200,
+                json={
+                    "result": [{"features": [row["joinKeyMap"]["user_id"]]} for row in params["requestData"]],
+                    "metadata": {"features": [{"name": "fv.user_id"}]},
+                },
+            )
+
+        self.client = TectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.Client(transport=httpx.MockTransport(handler)),
+        )
+
+    def test_micro_batches_in_order(self):
+        rows = [GetFeaturesRequestData(join_key_map={"user_id": f"user_{i}"}) for i in range(12)]
+        resp = self.client.get_features_batch(
+            feature_service_name="fake-feature-service", request_data=rows, micro_batch_size=5
+        )
+        self.assertEqual([r.result.features for r in resp.responses], [[f"user_{i}"] for i in range(12)])
+        self.assertEqual(resp.errors, [None] * 12)
+        self.assertEqual(resp.responses[0].metadata, {"features": [{"name": "fv.user_id"}]})
+        self.assertEqual(sorted(len(params["requestData"]) for params in self.request_log), [2, 5, 5])
+        self.assertEqual(self.request_log[0]["workspaceName"], "workspace")
+        self.assertNotIn("joinKeyMap", self.request_log[0])
+
+    def test_partial_results(self):
+        rows = [GetFeaturesRequestData(join_key_map={"user_id": user_id}) for user_id in ["a", "b", "bad", "c"]]
+        resp = self.client.get_features_batch(
+            feature_service_name="fake-feature-service",
+            request_data=rows,
+            micro_batch_size=2,
+            allow_partial_results=True,
+        )
+        self.assertEqual([r.result.features for r in resp.responses[:2]], [["a"], ["b"]])
+        self.assertEqual(resp.responses[2:], [None, None])
+        self.assertIsInstance(resp.errors[2], ServiceUnavailableError)
+        self.assertIs(resp.errors[2], resp.errors[3])
+
+    def test_raise_error_without_partial_results(self):
+        rows = [GetFeaturesRequestData(join_key_map={"user_id": user_id}) for user_id in ["a", "b", "bad", "c"]]
+        with self.assertRaises(ServiceUnavailableError):
+            self.client.get_features_batch(
+                feature_service_name="fake-feature-service", request_data=rows, micro_batch_size=2
+            )
+
+
+class TestGetFeaturesMany(TestCase):
+    def setUp(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        lock = threading.Lock()
+
+        def handler(request):
+            user_id = json.loads(request.content.decode("utf8"))["params"]["joinKeyMap"]["user_id"]
+            with lock:
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            # random latencies make the responses arrive out of order
+            time.sleep(random.uniform(0.001, 0.01))
+            with lock:
+                self.in_flight -= 1
+            if user_id == "bad":
+                return httpx.Response(503, json={"message": "unavailable"})
+            return httpx.Response(200, json={"result": {"features": [user_id]}})
+
+        self.client = TectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.Client(transport=httpx.MockTransport(handler)),
+            max_workers=8,
+        )
+
+    def test_responses_in_order(self):
+        rows = [GetFeaturesRequestData(join_key_map={"user_id": f"user_{i}"}) for i in range(30)]
+        resp = self.client.get_features_many(feature_service_name="fake-feature-service", request_data=rows)
+        self.assertEqual([r.result.features for r in resp.responses], [[f"user_{i}"] for i in range(30)])
+        self.assertEqual(resp.errors, [None] * 30)
+        self.assertGreater(self.max_in_flight, 1)
+
+    def test_max_workers(self):
+        rows = [GetFeaturesRequestData(join_key_map={"user_id": f"user_{i}"}) for i in range(20)]
+        self.client.get_features_many(feature_service_name="fake-feature-service", request_data=rows, max_workers=3)
+        self.assertLessEqual(self.max_in_flight, 3)
+        with self.assertRaises(ValueError):
+            self.client.get_features_many(feature_service_name="fake-feature-service", request_data=rows, max_workers=0)
+
+    def test_errors(self):
+        rows = [GetFeaturesRequestData(join_key_map={"user_id": user_id}) for user_id in ["a", "bad", "c"]]
+        resp = self.client.get_features_many(
+            feature_service_name="fake-feature-service", request_data=rows, return_errors=True
+        )
+        self.assertEqual([r.result.features if r else None for r in resp.responses], [["a"], None, ["c"]])
+        self.assertEqual([type(error) for error in resp.errors], [type(None), ServiceUnavailableError, type(None)])
+        with self.assertRaises(ServiceUnavailableError):
+            self.client.get_features_many(feature_service_name="fake-feature-service", request_data=rows)
+
+    def test_from_the_thread_pool(self):
+        client = TectonClient(
+            url="https://fake.tecton.ai", api_key="fake-api-key", client=self.client._client, max_workers=1
+        )
+        rows = [GetFeaturesRequestData(join_key_map={"user_id": f"user_{i}"}) for i in range(5)]
+        # the only thread of the pool makes the call, which must not wait for a thread of the pool
+        future = client._get_executor().submit(
+            client.get_features_many, feature_service_name="fs", workspace_name="workspace", request_data=rows
+        )
+        self.assertEqual(len(future.result(timeout=5).responses), 5)
+
+    def test_shares_the_connection_pool_across_threads(self):
+        with LoopbackFeatureServer(latency=0.005) as server:
+            client = TectonClient(url=server.url, api_key="fake-api-key", default_workspace_name="workspace")
+            rows = [GetFeaturesRequestData(join_key_map={"user_id": str(i)}) for i in range(40)]
+
+            def get_many():
+                return client.get_features_many(feature_service_name="fs", request_data=rows, max_workers=4)
+
+            # two callers on different threads share the client and its connections
+            threads = [threading.Thread(target=get_many) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            resp = get_many()
+            for thread in threads:
+                thread.join()
+        self.assertEqual([r.result.features for r in resp.responses], [[server.url]] * 40)
+        self.assertEqual(server.requests, 120)
+        self.assertLessEqual(server.connections, 12)
+
+
+class TestIterFeatures(TestGetFeaturesMany):
+    def rows(self, user_ids):
+        self.consumed = 0
+        for user_id in user_ids:
+            self.consumed += 1
+            yield GetFeaturesRequestData(join_key_map={"user_id": user_id})
+
+    def test_ordered(self):
+        user_ids = [f"user_{i}" for i in range(1000)]
+        stream = self.client.iter_features(self.rows(user_ids), feature_service_name="fs", max_in_flight=4)
+        results = []
+        for row, response in stream:
+            # the input is consumed lazily, with at most max_in_flight rows ahead of the output
+            self.assertLessEqual(self.consumed, len(results) + 4)
+            results.append((row.join_key_map["user_id"], response.result.features[0]))
+        self.assertEqual(results, [(user_id, user_id) for user_id in user_ids])
+        self.assertLessEqual(self.max_in_flight, 4)
+
+    def test_unordered(self):
+        user_ids = [f"user_{i}" for i in range(50)]
+        results = [
+            (row.join_key_map["user_id"], response.result.features[0])
+            for row, response in self.client.iter_features(
+                self.rows(user_ids), feature_service_name="fs", max_in_flight=8, ordered=False
+            )
+        ]
+        self.assertEqual(sorted(results), sorted((user_id, user_id) for user_id in user_ids))
+
+    def test_errors(self):
+        stream = self.client.iter_features(self.rows(["a", "bad", "c"]), feature_service_name="fs", return_errors=True)
+        results = [response for _, response in stream]
+        self.assertEqual(results[0].result.features, ["a"])
+        self.assertIsInstance(results[1], ServiceUnavailableError)
+        with self.assertRaises(ServiceUnavailableError):
+            list(self.client.iter_features(self.rows(["a", "bad", "c"]), feature_service_name="fs"))
+
+    def test_close_early(self):
+        stream = self.client.iter_features(
+            self.rows(f"user_{i}" for i in range(1000)), feature_service_name="fs", max_in_flight=2
+        )
+        next(stream)
+        stream.close()
+        self.assertLessEqual(self.consumed, 3)
+
+
+class TestMetadataRegistry(TestCase):
+    def setUp(self):
+        self.request_log = []
+
+        def handler(request):
+            body = json.loads(request.content.decode("utf8"))
+            self.request_log.append((request.url.path, body["params"]))
+            if request.url.path.endswith("/metadata"):
+                return httpx.Response(
+                    200,
+                    json={
+                        "featureServiceType": "DEFAULT",
+                        "inputJoinKeys": [{"name": "user_id", "dataType": {"type": "string"}}],
+                        "inputRequestContextKeys": [],
+                        "featureValues": [
+                            {"name": "fv.count", "dataType": {"type": "int64"}},
+                            {"name": "fv.ratio", "dataType": {"type": "float64"}},
+                        ],
+                    },
+                )
+            return httpx.Response(200, json={"result": {"features": ["12", 0.5]}})
+
+        self.client = TectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.Client(transport=httpx.MockTransport(handler)),
+        )
+
+    def test_warm_up_metadata(self):
+        self.client.warm_up_metadata(["fs_1", "fs_2"])
+        self.assertEqual(len(self.client.metadata_registry), 2)
+
+        resp = self.client.get_features(feature_service_name="fs_1", join_key_map={"user_id": "id123"})
+        path, params = self.request_log[-1]
+        self.assertEqual(path, "/api/v1/feature-service/get-features")
+        self.assertFalse(params["metadataOptions"]["includeNames"])
+        self.assertFalse(params["metadataOptions"]["includeDataTypes"])
+        self.assertEqual(resp.get_features_dict(), {"fv.count": 12, "fv.ratio": 0.5})
+
+        # explicit metadata options are sent as is
+        self.client.get_features(
+            feature_service_name="fs_1", join_key_map={"user_id": "id123"}, metadata_options=MetadataOptions()
+        )
+        self.assertTrue(self.request_log[-1][1]["metadataOptions"]["includeNames"])
+
+        # feature services which were not warmed up request names and data types from the feature server
+        self.client.get_features(feature_service_name="fs_3", join_key_map={"user_id": "id123"})
+        self.assertTrue(self.request_log[-1][1]["metadataOptions"]["includeNames"])
+
+    def test_bare_responses(self):
+        self.client = TectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=self.client._client,
+            bare_responses=True,
+        )
+        self.client.warm_up_metadata(["fs_1"])
+        for resp in (
+            self.client.get_features(feature_service_name="fs_1", join_key_map={"user_id": "id123"}),
+            self.client.prepare(feature_service_name="fs_1").get({"user_id": "id123"}),
+        ):
+            self.assertFalse(self.request_log[-1][1]["metadataOptions"]["includeNames"])
+            self.assertEqual(resp.result.features, ["12", 0.5])
+            self.assertIsNone(resp.metadata)
+
+        # explicit metadata options are still sent as is
+        self.client.get_features(
+            feature_service_name="fs_1", join_key_map={"user_id": "id123"}, metadata_options=MetadataOptions()
+        )
+        self.assertTrue(self.request_log[-1][1]["metadataOptions"]["includeNames"])
+
+    def test_bare_responses_drop_metadata(self):
+        metadata = {"features": [{"name": "fv.count"}], "sloInfo": {"sloEligible": True}}
+
+        def handler(request):
+            if request.url.path.endswith("batch"):
+                rows = json.loads(request.content)["params"]["requestData"]
+                return httpx.Response(200, json={"result": [{"features": ["1"]} for _ in rows], "metadata": metadata})
+            return httpx.Response(200, json={"result": {"features": ["1"]}, "metadata": metadata})
+
+        client = TectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.Client(transport=httpx.MockTransport(handler)),
+            bare_responses=True,
+        )
+        rows = [GetFeaturesRequestData(join_key_map={"user_id": "id123"})] * 2
+        for resp in (
+            client.get_features(feature_service_name="fs_1", join_key_map={"user_id": "id123"}),
+            client.prepare(feature_service_name="fs_1").get({"user_id": "id123"}),
+            *client.get_features_batch(feature_service_name="fs_1", request_data=rows).responses,
+        ):
+            self.assertEqual(resp.result.features, ["1"])
+            self.assertIsNone(resp.metadata)
+
+        # explicit metadata options keep the metadata
+        resp = client.get_features(
+            feature_service_name="fs_1", join_key_map={"user_id": "id123"}, metadata_options=MetadataOptions()
+        )
+        self.assertEqual(resp.metadata, metadata)
+
+    def test_metadata_refresh(self):
+        self.client.warm_up_metadata(["fs_1"])
+        self.client.start_metadata_refresh(interval_seconds=0.01)
+        try:
+            for _ in range(100):
+                if len(self.request_log) >= 3:
+                    break
+                time.sleep(0.01)
+        finally:
+            self.client.stop_metadata_refresh()
+        self.assertGreaterEqual(len(self.request_log), 3)
+        self.assertTrue(all(path.endswith("/metadata") for path, _ in self.request_log))
+
+
+class TestPreparedFeatureRequest(TestCase):
+    def setUp(self):
+        self.request_log = []
+
+        def handler(request):
+            self.request_log.append(json.loads(request.content.decode("utf8")))
+            return httpx.Response(200, json={"result": {"features": [1]}})
+
+        self.client = TectonClient(
+            url="https://fake.tecton.ai",
+            api_key="fake-api-key",
+            default_workspace_name="workspace",
+            client=httpx.Client(transport=httpx.MockTransport(handler)),
+            cache=FeatureCache(),
+        )
+
+    def test_same_request_as_get_features(self):
+        options = dict(
+            feature_service_name="fake-feature-service",
+            metadata_options=MetadataOptions(include_effective_times=True),
+            request_options=RequestOptions(read_from_cache=False, write_to_cache=False),
+            allow_partial_results=True,
+        )
+        prepared = self.client.prepare(**options)
+        for join_key_map, request_context_map in [({"user_id": "id123"}, {"amount": 1.5}), ({"user_id": "ü"}, None)]:
+            resp = prepared.get(join_key_map, request_context_map)
+            self.assertEqual(resp.result.features, [1])
+            self.client.get_features(join_key_map=join_key_map, request_context_map=request_context_map, **options)
+            self.assertEqual(self.request_log[-2], self.request_log[-1])
+
+    def test_validates_once(self):
+        with self.assertRaisesRegex(ValueError, "exactly one of feature_service_name or feature_service_id"):
+            self.client.prepare()
+
+    def test_shares_cache_with_get_features(self):
+        prepared = self.client.prepare(feature_service_name="fake-feature-service")
+        prepared.get({"user_id": "id123"})
+        self.client.get_features(feature_service_name="fake-feature-service", join_key_map={"user_id": "id123"})
+        prepared.get({"user_id": "id123"})
+        self.assertEqual(len(self.request_log), 1)